@@ -0,0 +1,570 @@
+## Benchmark buku kontak (tanpa layar)
+# Times cold startup, refresh_contact_list, per-keystroke search, per-mutation save, theme switches and peak
+# memory on synthetic contact books, and writes the results as JSON so runs can be compared.
+#
+#   python benchmark_contact_book.py                                  # 1k, 10k, 100k and 1M contacts
+#   python benchmark_contact_book.py --sizes 1000 10000 --output before.json
+#   python benchmark_contact_book.py --output after.json --compare before.json
+#
+# Every book size runs in its own Python process, so startup is cold and peak memory is per size.
+# A second process then only starts the app again, now with the first screen cached by the first one's exit.
+# The app runs against a headless stand-in for tkinter by default (works without a display),
+# use --tk real to drive a real (hidden) Tk window instead.
+# With --server the book is served by a contact server process and the app runs as one of its clients.
+import argparse
+import heapq
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from contact_store import STORAGE_BACKENDS, ContactClient, ContactStore
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+PINNED = 5  # Pinned contacts in every generated book (the app allows up to 5)
+SEARCH_TERMS = ("sitorus", "+62812", "gmail.com", "nurdi")  # Typed one keystroke at a time
+TAGS = (("kantor", 0.3), ("keluarga", 0.1), ("arisan", 0.01))  # Tag and the share of contacts that have it
+TAG_FILTERS = (  # (include, exclude, search term) picked in the tag filter
+    (("arisan",), (), ""), (("kantor",), ("keluarga",), ""), ((), ("kantor",), ""), (("keluarga",), (), "sitorus"),
+)
+TAG_FILTER_REPEATS = 5
+REFRESH_REPEATS = 50
+MUTATIONS = 20  # Adds, edits, pin toggles and deletes, each one saved to storage
+SAVE_REPEATS = 3  # Full snapshots (save_contacts)
+THEME_WIDGETS = 2000  # Extra labels registered with the theme engine, like a window with many panels
+THEME_ROUNDS = 3  # Switches through every theme
+SERVER_CLIENTS = 100  # Other clients subscribed to the server's changes with --server
+PUSH_REPEATS = 20  # Changes timed until every subscribed client has received them
+SLOWER_RATIO = 1.2  # --compare flags medians that got this much slower
+
+FIRST_NAMES = (
+    "Aisyah", "Balamantri", "Cahya", "Dewi", "Eko", "Fajar", "Gilang", "Harsana", "Imam", "Jinawi",
+    "Kartika", "Lestari", "Mutia", "Nanda", "Oki", "Patricia", "Putri", "Rahmi", "Rizky", "Sari",
+    "Taufik", "Upik", "Vivi", "Wahyu", "Yogi", "Zulfa", "Agus", "Budi", "Citra", "Dimas",
+    "Endah", "Fitri", "Galih", "Hendra", "Indah", "Joko", "Kurnia", "Lukman", "Maya", "Nur",
+)
+LAST_NAMES = (
+    "Anggriawan", "Hariyah", "Mansur", "Nurdiyanti", "Prakasa", "Prasetya", "Purwanti", "Sitorus",
+    "Suartini", "Zulaika", "Wicaksono", "Affan", "Winata", "Fadlan", "Saputra", "Hidayat",
+    "Siregar", "Nasution", "Simanjuntak", "Wibowo", "Kusuma", "Setiawan", "Lubis", "Hutapea",
+    "Rahayu", "Susanto", "Gunawan", "Halim", "Pratama", "Utami",
+)
+TITLES_BEFORE = ("dr.", "Dt.", "H.", "Hj.", "Ir.", "Drs.", "Cut", "R.")
+TITLES_AFTER = ("S.Ked", "S.E.I", "M.TI.", "S.Kom", "S.H.", "M.M.", "S.Pd", "S.T.")
+EMAIL_DOMAINS = ("gmail.com", "yahoo.co.id", "mail.com", "usa.net", "outlook.com", "musician.com", "index.ua")
+
+## Generator buku kontak sintetis
+def generate_contacts(count, seed=0, pinned=PINNED): # The same count and seed always give the same book
+    rng = random.Random(seed)
+    contacts = {}
+    while len(contacts) < count:
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        name = f"{first} {last}"
+        roll = rng.random()
+        if roll < 0.1:
+            name = f"{rng.choice(TITLES_BEFORE)} {name}"
+        elif roll < 0.2:
+            name = f"{name}, {rng.choice(TITLES_AFTER)}"
+        if name in contacts:
+            # Real books have many people with the same name, keep them apart like a user would
+            name = f"{name} {len(contacts)}"
+
+        phone = "+628" + "".join(rng.choice("0123456789") for _ in range(rng.randint(8, 11)))
+        if rng.random() < 0.1:
+            email = ""
+        else:
+            separator = rng.choice((".", "_", ""))
+            number = str(rng.randint(1, 99)) if rng.random() < 0.5 else ""
+            email = f"{first.lower()}{separator}{last.lower()}{number}@{rng.choice(EMAIL_DOMAINS)}"
+        contacts[name] = {'phone': phone, 'email': email}
+
+    pinned_contacts = set(rng.sample(sorted(contacts), min(pinned, count)))
+    # Own generator, so the names and numbers stay the same as in books generated before tags existed
+    tag_rng = random.Random(f"tags-{seed}")
+    for details in contacts.values():
+        tags = [tag for tag, share in TAGS if tag_rng.random() < share]
+        if tags:
+            details['tags'] = tags
+    return contacts, pinned_contacts
+
+def write_book(data_dir, count, seed=0, storage_backend="JSON", server=None): # contacts.json (or .db, .bin) and settings in data_dir
+    contacts, pinned = generate_contacts(count, seed)
+    storage = STORAGE_BACKENDS[storage_backend](os.path.join(data_dir, "contacts.json"))
+    try:
+        storage.save_snapshot(contacts, pinned)
+    finally:
+        storage.close()
+    settings = {'theme': "Default Blue", 'storage': storage_backend}
+    if server:
+        settings['server'] = server
+    with open(os.path.join(data_dir, "contact_book_settings.json"), 'w') as f:
+        json.dump(settings, f, indent=4)
+
+## Tk tanpa layar
+class HeadlessWidget: # Accepts every option and method the app uses, draws nothing
+    OPTIONS = {'height': 10, 'borderwidth': 1, 'highlightthickness': 1}
+
+    def __init__(self, master=None, **options):
+        self.options = dict(self.OPTIONS, **options)
+        self.bindings = {}
+
+    def __getattr__(self, name): # pack, grid, add_command, ... are no-ops
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return lambda *args, **options: None
+
+    def config(self, **options):
+        self.options.update(options)
+
+    configure = config
+
+    def cget(self, option):
+        return self.options.get(option, '')
+
+    def bind(self, sequence, func, add=None):
+        self.bindings.setdefault(sequence, []).append(func)
+
+    def event_generate(self, sequence):
+        for func in self.bindings.get(sequence, []):
+            func(types.SimpleNamespace(widget=self))
+
+class HeadlessListbox(HeadlessWidget): # Keeps the rendered rows so the text formatting cost is real
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.items = []
+        self.selection = ()
+
+    def delete(self, first, last=None):
+        self.items = []
+        self.selection = ()
+
+    def insert(self, index, *items):
+        self.items.extend(items)
+
+    def get(self, index):
+        return self.items[index]
+
+    def curselection(self):
+        return self.selection
+
+    def selection_set(self, index):
+        self.selection = (index,)
+
+    def selection_clear(self, first, last=None):
+        self.selection = ()
+
+class HeadlessRoot(HeadlessWidget): # Runs after() callbacks from run_until() instead of a mainloop
+    def __init__(self):
+        super().__init__()
+        self.timers = []  # Heap of (due time, sequence number, callback, args)
+        self.cancelled = set()
+        self.sequence = 0
+
+    def after(self, ms, func=None, *args):
+        self.sequence += 1
+        heapq.heappush(self.timers, (time.perf_counter() + ms / 1000, self.sequence, func, args))
+        return self.sequence
+
+    def after_cancel(self, timer_id):
+        self.cancelled.add(timer_id)
+
+    def run_until(self, done, timeout=600): # Process timers until done() is true
+        deadline = time.perf_counter() + timeout
+        while not done():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("The app did not finish in time")
+            if not self.timers:
+                time.sleep(0.001)
+                continue
+            due, sequence, func, args = self.timers[0]
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(min(wait, 0.01))
+                continue
+            heapq.heappop(self.timers)
+            if sequence in self.cancelled:
+                self.cancelled.discard(sequence)
+                continue
+            func(*args)
+
+class HeadlessVar: # StringVar with trace support
+    def __init__(self, master=None, value=''):
+        self.value = value
+        self.callbacks = []
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+        for callback in self.callbacks:
+            callback('', '', 'w')
+
+    def trace(self, mode, callback):
+        self.callbacks.append(callback)
+
+class HeadlessFont:
+    def __init__(self, *args, **options):
+        pass
+
+    def metrics(self, option):
+        return 15
+
+def install_headless_tkinter(gui): # Give the GUI module stand-ins for tkinter, records message boxes
+    messages = []
+
+    def message(kind):
+        def show(title, text, **options):
+            messages.append((kind, title, text))
+            return True  # askyesno: always confirm
+        return show
+
+    gui.tk = types.SimpleNamespace(
+        Tk=HeadlessRoot, Frame=HeadlessWidget, Label=HeadlessWidget, Button=HeadlessWidget, Entry=HeadlessWidget,
+        Checkbutton=HeadlessWidget, Menubutton=HeadlessWidget, Menu=HeadlessWidget, Scrollbar=HeadlessWidget, Listbox=HeadlessListbox,
+        StringVar=HeadlessVar, BooleanVar=HeadlessVar,
+        END='end', BOTH='both', X='x', Y='y', LEFT='left', RIGHT='right', SINGLE='single', RAISED='raised',
+        NORMAL='normal', DISABLED='disabled'
+    )
+    gui.ttk = types.SimpleNamespace(Progressbar=HeadlessWidget)
+    gui.tkfont = types.SimpleNamespace(Font=HeadlessFont)
+    gui.messagebox = types.SimpleNamespace(
+        showinfo=message('showinfo'), showerror=message('showerror'), askyesno=message('askyesno')
+    )
+    gui.filedialog = types.SimpleNamespace(askopenfilename=lambda **options: '', asksaveasfilename=lambda **options: '')
+    gui.load_tkinter = lambda: None
+    return messages
+
+class RealTkRoot: # Hidden real Tk window with the same run_until() as HeadlessRoot
+    def __init__(self, gui):
+        gui.load_tkinter()
+        self.root = gui.tk.Tk()
+        self.root.withdraw()
+
+    def run_until(self, done, timeout=600):
+        deadline = time.perf_counter() + timeout
+        while not done():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("The app did not finish in time")
+            self.root.update()
+            time.sleep(0.001)
+
+## Pengukuran
+def summarize(samples): # Milliseconds, so different runs can be compared key by key
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'min_ms': ordered[0] * 1000,
+        'median_ms': ordered[len(ordered) // 2] * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        'max_ms': ordered[-1] * 1000,
+        'mean_ms': sum(ordered) / len(ordered) * 1000,
+    }
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def peak_memory_mb(): # Peak resident memory of this process, None where the resource module is missing (Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def select_contact(app, name): # Search for a contact and click it, like a user would
+    app.show_search_results([name])
+    app.contact_listbox.selected = name
+    app.on_contact_select(None)
+
+def check_reload(data_dir, store): # Load the saved book in a second store like the next start would, returns the problems found
+    reloaded = ContactStore(data_dir, store.storage_backend)
+    try:
+        reloaded.load()  # Replays the journal, including the tagged contacts added by the benchmark
+        problems = []
+        if len(reloaded.contacts) != len(store.contacts) or reloaded.pinned != store.pinned:
+            problems.append(f"The saved book has {len(reloaded.contacts)} contacts, the app {len(store.contacts)}")
+        if reloaded.tag_counts() != store.tag_counts():
+            problems.append(f"The saved book has tags {reloaded.tag_counts()}, the app {store.tag_counts()}")
+        return problems
+    except Exception as e:
+        return [f"The saved book could not be loaded again: {e!r}"]
+    finally:
+        reloaded.close(compact=False)
+
+def measure_push(app): # Time until a change made in the app has reached every subscribed client
+    clients = [ContactClient(app.store.storage.address) for _ in range(SERVER_CLIENTS)]
+    try:
+        for client in clients:
+            client.call('subscribe')
+        samples = []
+        for i in range(PUSH_REPEATS):
+            start = time.perf_counter()
+            app.store.add(f"Push Contact {i:03d}", f"+62811111{i:04d}", "")
+            app.store.flush()
+            for client in clients:
+                client.events.get(timeout=60)
+            samples.append(time.perf_counter() - start)
+        return summarize(samples)
+    finally:
+        for client in clients:
+            client.close()
+
+def measure_book(data_dir, tk_mode="headless", startup_only=False): # Runs in the child process, returns the result dict
+    start = time.perf_counter()
+    import contact_book_v1b_sc as gui
+    import_seconds = time.perf_counter() - start
+
+    if tk_mode == "real":
+        messages = []
+        root = RealTkRoot(gui)
+        app = gui.ContactBookApp(root.root, data_dir)
+    else:
+        messages = install_headless_tkinter(gui)
+        root = HeadlessRoot()
+        app = gui.ContactBookApp(root, data_dir)
+    window_seconds = time.perf_counter() - start
+    first_rows = len(app.contact_listbox.rows)  # Already there if the first screen was cached
+    root.run_until(lambda: not app.loading)
+    startup_seconds = time.perf_counter() - start
+    count = len(app.store.contacts)
+    if startup_only:
+        app.exit_app()
+        return {
+            'contacts': count,
+            'import_s': import_seconds,
+            'window_s': window_seconds,
+            'first_rows': first_rows,
+            'startup_s': startup_seconds,
+            'startup_phases': app.startup_phases,
+        }
+
+    refresh = [timed(app.refresh_contact_list) for _ in range(REFRESH_REPEATS)]
+
+    # Every keystroke searches from the previous (narrower) term with a cancel check, as the debounced worker does
+    keystrokes = []
+    for term in SEARCH_TERMS:
+        for length in range(1, len(term) + 1):
+            keystroke_start = time.perf_counter()
+            app.show_search_results(app.store.search(term[:length], lambda: False))
+            keystrokes.append(time.perf_counter() - keystroke_start)
+        app.search_var.set('')
+
+    tag_filters = []
+    for include, exclude, term in TAG_FILTERS:
+        for _ in range(TAG_FILTER_REPEATS):
+            tag_filters.append(timed(
+                lambda: app.show_search_results(app.store.search(term, include_tags=include, exclude_tags=exclude))
+            ))
+
+    mutations = {'add': [], 'edit': [], 'pin': [], 'delete': [], 'undo': [], 'redo': []}
+    for i in range(MUTATIONS):
+        name = f"Benchmark Contact {i:03d}"
+        app.name_var.set(name)
+        app.phone_var.set(f"+62800000{i:04d}")
+        app.email_var.set(f"benchmark{i}@example.com")
+        app.tags_var.set("benchmark")
+        mutations['add'].append(timed(app.add_contact))
+
+        select_contact(app, name)
+        app.phone_var.set(f"+62899999{i:04d}")
+        mutations['edit'].append(timed(app.edit_contact))
+
+    # Unpin and pin again, the book already has the maximum number of pinned contacts
+    for name in sorted(app.store.pinned):
+        for _ in range(2):
+            select_contact(app, name)
+            mutations['pin'].append(timed(app.toggle_pin_contact))
+
+    for i in range(MUTATIONS):
+        select_contact(app, f"Benchmark Contact {i:03d}")
+        mutations['delete'].append(timed(app.delete_contact))
+
+    # Bring the deleted contacts back and delete them again, the list is patched instead of rebuilt
+    for kind, step in (('undo', app.undo_change), ('redo', app.redo_change)):
+        for _ in range(MUTATIONS):
+            mutations[kind].append(timed(step))
+
+    # Theme switches with many registered widgets (engine only, without the settings write and message box)
+    panel = app.theme_engine.register(gui.tk.Frame(app.root), 'panel')
+    for i in range(THEME_WIDGETS):
+        app.theme_engine.register(gui.tk.Label(panel, text=f"Label {i}"), 'label')
+    themed_widgets = sum(len(widgets) for widgets in app.theme_engine.widgets.values())
+    theme_switches = [
+        timed(app.theme_engine.apply, theme_name) for _ in range(THEME_ROUNDS) for theme_name in app.themes
+    ]
+    app.theme_engine.apply(app.current_theme)
+
+    # Mutations only reach the disk when the writer thread flushes, time writing the last batch here
+    flush_seconds = timed(app.store.flush)
+    server_push = measure_push(app) if app.store.storage_backend == "Server" else None
+    reload_problems = check_reload(data_dir, app.store) if app.store.storage_backend != "Server" else []
+    saves = [timed(app.save_contacts) for _ in range(SAVE_REPEATS)]
+    exit_seconds = timed(app.exit_app)
+
+    return {
+        'contacts': count,
+        'import_s': import_seconds,
+        'window_s': window_seconds,
+        'startup_s': startup_seconds,
+        'startup_phases': app.startup_phases,
+        'refresh_contact_list': summarize(refresh),
+        'search_keystroke': summarize(keystrokes),
+        'tag_filter': summarize(tag_filters),
+        'mutation_save': {kind: summarize(samples) for kind, samples in mutations.items()},
+        'flush_s': flush_seconds,
+        'server_push': server_push,
+        'save_contacts': summarize(saves),
+        'theme_switch': summarize(theme_switches),
+        'themed_widgets': themed_widgets,
+        'exit_s': exit_seconds,
+        'peak_memory_mb': peak_memory_mb(),
+        'hot_paths': app.store.stats.snapshot()['paths'],  # The app's own instrumentation for the whole run
+        'errors': [text for kind, title, text in messages if kind == 'showerror'] + reload_problems,
+    }
+
+## Menjalankan benchmark
+def free_address(): # A localhost TCP address nothing listens on right now
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{sock.getsockname()[1]}"
+
+def run_size(count, seed, storage_backend, tk_mode, server=False): # Generate a book and measure it in a fresh process
+    data_dir = tempfile.mkdtemp(prefix="contact_book_bench_")
+    server_process = None
+    try:
+        generate_start = time.perf_counter()
+        address = free_address() if server else None
+        write_book(data_dir, count, seed, storage_backend, address)
+        generate_seconds = time.perf_counter() - generate_start
+        if server:
+            # Loading the book is part of the server's startup, not the app's
+            server_process = subprocess.Popen(
+                [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "contact_store.py"),
+                 "--data-dir", data_dir, "serve", "--address", address],
+                stdout=subprocess.PIPE, universal_newlines=True
+            )
+            if not server_process.stdout.readline():
+                raise RuntimeError(f"The contact server for {count} contacts did not start")
+
+        result = run_child(count, data_dir, tk_mode)
+        # The first run wrote the first screen cache on exit
+        result['warm_startup'] = run_child(count, data_dir, tk_mode, "--startup-only")
+        result['generate_s'] = generate_seconds
+        result['file_bytes'] = sum(
+            os.path.getsize(os.path.join(data_dir, f)) for f in os.listdir(data_dir) if f.startswith("contacts.")
+        )
+        return result
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.wait()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def run_child(count, data_dir, tk_mode, *options): # measure_book() in a fresh process
+    child = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", data_dir, "--tk", tk_mode, *options],
+        stdout=subprocess.PIPE, universal_newlines=True
+    )
+    if child.returncode != 0:
+        raise RuntimeError(f"Benchmark of {count} contacts failed (exit code {child.returncode})")
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+def medians(result, prefix=""): # Flatten a result into {"search_keystroke": median_ms, "startup_s": seconds, ...}
+    values = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            if 'median_ms' in value:
+                values[prefix + key] = value['median_ms']
+            else:
+                values.update(medians(value, prefix + key + "."))
+        elif isinstance(value, float) and key.endswith('_s'):
+            values[prefix + key] = value
+    return values
+
+def compare(previous, current): # Print every metric side by side, slower ones are flagged
+    old_runs = {run['size']: run for run in previous.get('runs', [])}
+    for run in current['runs']:
+        old = old_runs.get(run['size'])
+        if old is None:
+            continue
+        print(f"\n{run['size']} contacts (previous -> current)")
+        old_values = medians(old)
+        for key, value in medians(run).items():
+            if key not in old_values:
+                continue
+            ratio = value / old_values[key] if old_values[key] else 1.0
+            flag = "  SLOWER" if ratio > SLOWER_RATIO else ""
+            print(f"  {key:32} {old_values[key]:12.3f} -> {value:12.3f}  x{ratio:.2f}{flag}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the contact book on synthetic books.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Book sizes to measure")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic books")
+    parser.add_argument("--storage", choices=sorted(STORAGE_BACKENDS), default="JSON")
+    parser.add_argument("--server", action="store_true", help="serve the book from a contact server, the app is its client")
+    parser.add_argument("--tk", choices=("headless", "real"), default="headless", help="real needs a display")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--child", help=argparse.SUPPRESS)  # Internal: measure the book in this folder
+    parser.add_argument("--startup-only", action="store_true", help=argparse.SUPPRESS)  # Internal: with --child
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_book(args.child, args.tk, args.startup_only)))
+        return 0
+
+    results = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'storage': args.storage,
+        'server': args.server,
+        'tk': args.tk,
+        'seed': args.seed,
+        'runs': [],
+    }
+    for size in args.sizes:
+        print(f"Measuring {size} contacts...", flush=True)
+        run = run_size(size, args.seed, args.storage, args.tk, args.server)
+        run['size'] = size
+        results['runs'].append(run)
+        print(
+            f"  startup {run['startup_s']:.2f}s, keystroke median {run['search_keystroke']['median_ms']:.2f}ms, "
+            f"add median {run['mutation_save']['add']['median_ms']:.2f}ms, "
+            f"theme switch median {run['theme_switch']['median_ms']:.2f}ms ({run['themed_widgets']} widgets), "
+            f"peak memory {run['peak_memory_mb']} MB",
+            flush=True
+        )
+        warm = run['warm_startup']
+        print(f"  warm startup {warm['startup_s']:.2f}s, {warm['first_rows']} rows shown after {warm['window_s']:.2f}s", flush=True)
+        if run['server_push'] is not None:
+            print(f"  change pushed to {SERVER_CLIENTS} clients, median {run['server_push']['median_ms']:.2f}ms", flush=True)
+        for error in run['errors']:
+            print(f"  error shown: {error}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
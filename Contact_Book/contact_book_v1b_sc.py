@@ -1,31 +1,349 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
+import time
+IMPORT_STARTED = time.perf_counter()  # Startup phases are measured from here (Diagnostics window)
 import json
 import os
 import sys
+import threading
+import queue
+import sqlite3
+from contact_store import (
+    ContactStore, ContactError, ContactStorageError, SearchCancelled, STORAGE_BACKENDS, DUPLICATE_POLICIES,
+    format_import_report, get_app_dir, read_settings, run_cli, validate_contact
+)
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
+# tkinter is imported by load_tkinter() the first time a window is needed,
+# so the command line and scripts that only use ContactStore start without it
+tk = ttk = messagebox = filedialog = tkfont = None
+TKINTER_SECONDS = None  # How long that import took
+
+def load_tkinter():
+    global tk, ttk, messagebox, filedialog, tkfont, TKINTER_SECONDS
+    if tk is not None:
+        return
+    start = time.perf_counter()
+    import tkinter as tk
+    from tkinter import ttk, messagebox, filedialog
+    import tkinter.font as tkfont
+    TKINTER_SECONDS = time.perf_counter() - start
+
+## Penjadwal pencarian
+class SearchScheduler: # Debounces search terms and runs them on a worker thread, newest term wins
+    DELAY_MS = 150  # Wait this long after the last keystroke before searching
+    POLL_MS = 20  # How often the Tk thread checks for finished searches
+
+    def __init__(self, root, run_query, show_results):
+        self.root = root
+        self.run_query = run_query  # run_query(term, cancelled) -> names, runs on the worker thread
+        self.show_results = show_results  # show_results(names), runs on the Tk thread
+        self.generation = 0  # Bumped for every new term, older searches are stale
+        self.pending = None  # root.after id of the debounce timer
+        self.waiting_for = None  # Generation of the last term handed to the worker
+        self.polling = False
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.worker = None
+
+    def schedule(self, term): # Restart the debounce timer with the latest term
+        self.cancel()
+        self.pending = self.root.after(self.DELAY_MS, self._submit, term, self.generation)
+
+    @property
+    def busy(self): # A term is waiting for the debounce timer or its search hasn't been shown yet
+        return self.pending is not None or self.polling
+
+    def cancel(self): # Drop the pending term and any search still running
+        self.generation += 1
+        if self.pending is not None:
+            self.root.after_cancel(self.pending)
+            self.pending = None
+
+    def _submit(self, term, generation):
+        self.pending = None
+        self.waiting_for = generation
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._work, name="contact-search", daemon=True)
+            self.worker.start()
+        self.requests.put((generation, term))
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.POLL_MS, self._poll)
+
+    def _work(self): # Worker thread: only the newest queued term is searched
+        while True:
+            generation, term = self.requests.get()
+            while not self.requests.empty():
+                generation, term = self.requests.get_nowait()
+            if generation != self.generation:
+                continue
+            try:
+                names = self.run_query(term, lambda: generation != self.generation)
+            except SearchCancelled:
+                continue
+            except Exception as e:
+                self.results.put((generation, e))
+                continue
+            self.results.put((generation, names))
+
+    def _poll(self): # Tk thread: hand the newest finished search to the UI
+        latest = None
+        while not self.results.empty():
+            latest = self.results.get_nowait()
+
+        if latest is not None and latest[0] == self.generation:
+            self.polling = False
+            if isinstance(latest[1], Exception):
+                # Raised inside an after callback Tk would only print it, the list would just stop updating
+                messagebox.showerror("Error", f"Search failed: {latest[1]}")
+                return
+            self.show_results(latest[1])
+        elif self.waiting_for != self.generation:
+            # Superseded or cancelled, the next submitted term starts polling again
+            self.polling = False
+        else:
+            self.root.after(self.POLL_MS, self._poll)
+
+## List kontak virtual
+class VirtualContactList: # Listbox that only renders the visible slice of a backing sequence
+    def __init__(self, parent, font=("Arial", 10)):
+        self.frame = tk.Frame(parent)
+        self.scrollbar = tk.Scrollbar(self.frame, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(
+            self.frame,
+            font=font,
+            selectmode=tk.SINGLE,
+            exportselection=False
+        )
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.rows = []  # Backing sequence of contact names (supports len() and slicing)
+        self.format_row = str  # Turns a backing row into the text shown in the listbox
+        self.top = 0  # Index of the first rendered row in self.rows
+        self.selected = None  # Name in the selected row, an index would point at another contact once rows shift
+        self.row_height = tkfont.Font(font=font).metrics('linespace') + 1
+        self.page_size = int(self.listbox.cget('height'))
+
+        self.listbox.bind('<Configure>', self._on_resize)
+        self.listbox.bind('<<ListboxSelect>>', self._on_select)
+        self.listbox.bind('<MouseWheel>', self._on_mousewheel)
+        self.listbox.bind('<Button-4>', lambda event: self.yview('scroll', -3, 'units'))
+        self.listbox.bind('<Button-5>', lambda event: self.yview('scroll', 3, 'units'))
+        self.listbox.bind('<Up>', lambda event: self._move_selection(-1))
+        self.listbox.bind('<Down>', lambda event: self._move_selection(1))
+        self.listbox.bind('<Prior>', lambda event: self._move_selection(-self.page_size))
+        self.listbox.bind('<Next>', lambda event: self._move_selection(self.page_size))
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def bind(self, sequence, func): # Extra handlers run after the internal ones
+        self.listbox.bind(sequence, func, add='+')
+
+    def set_rows(self, rows, format_row=str): # Replace the backing sequence and render the first page
+        self.rows = rows
+        self.format_row = format_row
+        self.top = 0
+        self.selected = None
+        self.render()
+
+    def replace_rows(self, rows): # Swap the backing sequence but keep the scroll position (and the selection if it's still there)
+        self.rows = rows
+        if self.selected is not None and self.selected not in rows:
+            self.selected = None
+        self.render()
+
+    def render(self): # Draw only the rows that fit in the listbox
+        total = len(self.rows)
+        self.top = max(0, min(self.top, total - self.page_size))
+        visible = self.rows[self.top:self.top + self.page_size]
+
+        self.listbox.delete(0, tk.END)
+        if visible:
+            self.listbox.insert(0, *[self.format_row(row) for row in visible])
+        self.listbox.yview_moveto(0)
+
+        if self.selected in visible:
+            self.listbox.selection_set(visible.index(self.selected))
+            self.listbox.activate(visible.index(self.selected))
+
+        if total:
+            self.scrollbar.set(self.top / total, (self.top + len(visible)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def yview(self, *args): # Scrollbar command ('moveto', fraction) or ('scroll', n, 'units'/'pages')
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.rows))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self.page_size
+            self.top += step
+        self.render()
+
+    def selection(self): # Name of the selected contact, or None
+        return self.selected
+
+    def selection_clear(self, first=0, last=None):
+        self.selected = None
+        self.listbox.selection_clear(0, tk.END)
+
+    def _on_resize(self, event):
+        border = 2 * (int(self.listbox.cget('borderwidth')) + int(self.listbox.cget('highlightthickness')))
+        self.page_size = max(1, (event.height - border) // self.row_height)
+        self.render()
+
+    def _on_select(self, event):
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self.rows[self.top + selection[0]]
+
+    def _on_mousewheel(self, event):
+        self.yview('scroll', -3 if event.delta > 0 else 3, 'units')
+
+    def _move_selection(self, step): # Keyboard navigation that scrolls past the rendered rows
+        if not self.rows:
+            return 'break'
+        index = self.top
+        if self.selected is not None:
+            try:
+                index = self.rows.index(self.selected) + step
+            except ValueError:
+                pass  # Removed by a sync that hasn't been shown yet
+        index = max(0, min(index, len(self.rows) - 1))
+        self.selected = self.rows[index]
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.page_size:
+            self.top = index - self.page_size + 1
+        self.render()
+        self.listbox.event_generate('<<ListboxSelect>>')
+        return 'break'
+
+## Mesin tema
+# Colors a theme may leave out (the light themes keep Tk's white entries and list)
+THEME_DEFAULTS = {
+    "text_color": "black",
+    "title_text": "white",
+    "button_text": "white",
+    "entry_background": "white",
+    "list_background": "white",
+    "select_background": "#3498db",
+    "pin_button": "#3498db"
+}
+
+# Role -> widget option -> theme color key, every themable widget is registered under one role
+THEME_ROLES = {
+    'header': {'bg': "header", 'fg': "title_text"},
+    'subheader': {'bg': "subheader", 'fg': "title_text"},
+    'panel': {'bg': "background"},
+    'label': {'bg': "background", 'fg': "text_color"},
+    'check': {
+        'bg': "background", 'fg': "text_color", 'selectcolor': "background",
+        'activebackground': "background", 'activeforeground': "text_color"
+    },
+    'menubutton': {'bg': "background", 'fg': "text_color", 'activebackground': "background", 'activeforeground': "text_color"},
+    'entry': {'bg': "entry_background", 'fg': "text_color", 'insertbackground': "text_color"},
+    'listbox': {
+        'bg': "list_background", 'fg': "text_color",
+        'selectbackground': "select_background", 'selectforeground': "title_text"
+    },
+    'add_button': {'bg': "add_button", 'fg': "button_text"},
+    'edit_button': {'bg': "edit_button", 'fg': "button_text"},
+    'delete_button': {'bg': "delete_button", 'fg': "button_text"},
+    'clear_button': {'bg': "clear_button", 'fg': "button_text"},
+    'pin_button': {'bg': "pin_button", 'fg': "button_text"},
+    'exit_button': {'bg': "exit_button", 'fg': "button_text"}
+}
+
+class ThemeEngine: # Widgets registered by role, every theme compiled once into role -> widget options
+    def __init__(self, themes, roles=THEME_ROLES, defaults=THEME_DEFAULTS):
+        self.tables = {name: self.compile(colors, roles, defaults) for name, colors in themes.items()}
+        self.widgets = {role: [] for role in roles}  # Role -> registered widgets
+        self.table = None  # Compiled table of the theme in use
+
+    @staticmethod
+    def compile(colors, roles, defaults): # KeyError if a role uses a color the theme doesn't define
+        colors = dict(defaults, **colors)
+        return {role: {option: colors[key] for option, key in options.items()} for role, options in roles.items()}
+
+    def options(self, role): # Options of the current theme for a role, to pass when creating a widget
+        return dict(self.table[role])
+
+    def register(self, widget, role): # Theme a widget now and on every later switch
+        self.widgets[role].append(widget)
+        widget.configure(**self.table[role])
+        return widget
+
+    def unregister(self, widget): # For widgets destroyed before the app closes
+        for widgets in self.widgets.values():
+            if widget in widgets:
+                widgets.remove(widget)
+
+    def apply(self, theme_name): # One pass over the registered widgets, roles that look the same are skipped
+        table = self.tables[theme_name]
+        previous, self.table = self.table, table
+        for role, widgets in self.widgets.items():
+            options = table[role]
+            if previous is not None and previous[role] == options:
+                continue
+            for widget in widgets:
+                widget.configure(**options)
 
 class ContactBookApp:
+    SAVE_DELAY_MS = 500  # Default write-behind window for changes
+    SAVE_CHECK_MS = 1000  # How often the Tk thread looks for failed background saves
+    EXTERNAL_CHECK_MS = 2000  # How often the contacts file is checked for saves by other programs
+    SERVER_CHECK_MS = 50  # How often changes pushed by a contact server are picked up
 
     ## Startup awal
-    def __init__(self, root):
+    def __init__(self, root, data_dir=None):
+        load_tkinter()
+        # Time of each startup phase, recorded as 'startup_<phase>' in the performance stats
+        self.phase_started = time.perf_counter()
+        self.startup_phases = {'import': IMPORT_SECONDS}
+        if TKINTER_SECONDS is not None:
+            self.startup_phases['tkinter'] = TKINTER_SECONDS
         self.root = root
         self.root.title("Contact Book Application")
         self.root.geometry("900x600")
         self.root.resizable(False, False)
 
-        # File to store contacts and settings (saved next to the exe or script)
-        # When running as exe, sys.executable is the exe path
-        # When running as script, __file__ is the script path
-        if getattr(sys, 'frozen', False):
-            # Running as compiled exe
-            app_dir = os.path.dirname(sys.executable)
-        else:
-            # Running as script
-            app_dir = os.path.dirname(os.path.abspath(__file__))
-        self.contacts_file = os.path.join(app_dir, "contacts.json")
+        # File to store contacts and settings (saved next to the exe or script unless data_dir is given)
+        app_dir = data_dir or get_app_dir()
         self.settings_file = os.path.join(app_dir, "contact_book_settings.json")
-        self.pinned_contacts = set()  # Store pinned contact names (initialized before load_contacts)
-        self.contacts = self.load_contacts()
+        self.diagnostics_file = os.path.join(app_dir, "contact_book_diagnostics.json")
+        self.profile_file = os.path.join(app_dir, "contact_book_profile.prof")
+        # Pinned contacts and the first page of names, written at exit and shown while the book loads
+        self.first_screen_file = os.path.join(app_dir, "contact_book_first_screen.json")
+        self.current_theme = self.load_settings()
+
+        # Opt-in cProfile capture (Diagnostics menu, or CONTACT_BOOK_PROFILE=1 to include startup), dumped on exit
+        self.profiler = None
+        if os.environ.get("CONTACT_BOOK_PROFILE"):
+            self.start_profiling()
+        # Contacts, pins, search index and storage (no GUI code), filled by start_loading once the window is up
+        # Changes are saved by a writer thread, coalesced over 'save_delay_ms' from the settings file
+        settings = read_settings(self.settings_file)
+        save_delay_ms = settings.get('save_delay_ms', self.SAVE_DELAY_MS)
+        if not isinstance(save_delay_ms, (int, float)) or save_delay_ms < 0:
+            save_delay_ms = self.SAVE_DELAY_MS
+        # With 'server' (e.g. "127.0.0.1:8765" or "unix:/path") the book is shared through a contact server
+        server = settings.get('server')
+        self.store = ContactStore(app_dir, save_delay=save_delay_ms / 1000,
+                                  server=server if isinstance(server, str) and server else None)
+        self.fuzzy_search_enabled = False  # Plain copy of fuzzy_var, read by the search worker thread
+        self.tag_filter = ((), ())  # (tags every row has, tags no row has), replaced as a whole for the worker thread
+        self.search_scheduler = SearchScheduler(
+            self.root,
+            lambda term, cancelled: self.store.search(term, cancelled, self.fuzzy_search_enabled, *self.tag_filter),
+            self.show_search_results
+        )
+        self.loading = False
+        self.end_phase('store')
 
         # Theme color schemes with hex codes
         self.themes = {
@@ -74,6 +392,9 @@ class ContactBookApp:
                 "subheader": "#2d2d2d",
                 "background": "#2b2b2b",
                 "text_color": "#e0e0e0",
+                "entry_background": "#3c3f41",
+                "list_background": "#323232",
+                "select_background": "#4a6984",
                 "add_button": "#66bb6a",
                 "edit_button": "#ffa726",
                 "delete_button": "#ef5350",
@@ -111,61 +432,157 @@ class ContactBookApp:
                 "exit_button": "#d32f2f"
             }
         }
-
-        # Load theme settings
-        self.current_theme = self.load_settings()
+        # Every theme compiled into per-role widget options (THEME_ROLES), widgets register in create_widgets
+        self.theme_engine = ThemeEngine(self.themes)
 
         # Create GUI
         self.create_widgets()
-        self.refresh_contact_list()
-
-    ## Loading isi kontak
-    def load_contacts(self): ## Load contacts from JSON file
-        if os.path.exists(self.contacts_file):
+        self.end_phase('widgets')
+        self.show_first_screen()
+        self.end_phase('first_screen')
+        self.start_loading()
+
+        # Closing the window must save pending changes just like the Exit button
+        self.root.protocol("WM_DELETE_WINDOW", self.close_window)
+        self.root.after(self.SAVE_CHECK_MS, self.check_save_errors)
+        # Other programs may share the contacts file (e.g. on a network drive), their changes are merged in
+        self.syncing = False
+        self.shown_external_changes = 0
+        self.root.after(self.EXTERNAL_CHECK_MS, self.check_external_changes)
+        # Runs once the main loop has started, the window is on screen from then on
+        self.root.after(0, self.window_shown)
+
+    ## Waktu startup per tahap
+    def end_phase(self, phase): # Time since the previous phase ended
+        now = time.perf_counter()
+        self.startup_phases[phase] = now - self.phase_started
+        self.phase_started = now
+
+    def window_shown(self):
+        self.end_phase('window')
+        self.startup_phases['total_to_window'] = time.perf_counter() - IMPORT_STARTED
+        for phase, seconds in self.startup_phases.items():
+            self.store.stats.record(f'startup_{phase}', seconds)
+
+    def show_first_screen(self): # The cached top of the list, until the book has loaded (see _poll_loading)
+        first_screen = self.store.read_first_screen(self.first_screen_file)
+        if first_screen is None:
+            self.refresh_contact_list()
+            return
+        pinned, names = first_screen
+        pinned_names = set(pinned)
+        self.contact_listbox.set_rows(pinned + names, lambda name: f"★ {name}" if name in pinned_names else name)
+
+    ## Loading kontak bertahap
+    def start_loading(self): # Stream contacts in on a background thread, the list fills in as batches arrive
+        self.loading = True
+        self.load_started = time.perf_counter()
+        self.load_queue = queue.Queue()
+        self.load_progress.pack(fill=tk.X, pady=(0, 10), before=self.contact_listbox.frame)
+        if self.contact_listbox.rows is not self.store.order:
+            # The cached first screen is shown, the book is read and indexed in one go instead of in visible batches
+            self.load_progress.config(mode='indeterminate')
+            self.load_progress.start()
+            threading.Thread(target=self._read_worker, name="contact-loader", daemon=True).start()
+        else:
+            threading.Thread(target=self._load_worker, name="contact-loader", daemon=True).start()
+        self.root.after(self.LOAD_POLL_MS, self._poll_loading)
+
+    LOAD_POLL_MS = 15  # How often the Tk thread picks up loaded batches
+    LOAD_TICK_SECONDS = 0.03  # Time spent applying batches per tick, so the window stays responsive
+
+    def _load_worker(self): # Runs on the loader thread, only parses and queues batches
+        try:
+            for item in self.store.iter_load():
+                self.load_queue.put(item)
+        except ContactStorageError as e:
+            self.load_queue.put(('error', e))
+        self.load_queue.put(('done', None))
+
+    def _read_worker(self): # Runs on the loader thread, builds the whole book apart from the one in use
+        try:
+            self.load_queue.put(('book', self.store.read_book()))
+        except ContactStorageError as e:
+            self.load_queue.put(('error', e))
+        self.load_queue.put(('done', None))
+
+    def _poll_loading(self): # Apply loaded batches on the Tk thread
+        deadline = time.perf_counter() + self.LOAD_TICK_SECONDS
+        changed = False
+        while time.perf_counter() < deadline:
             try:
-                with open(self.contacts_file, 'r') as f:
-                    data = json.load(f)
-                    # Handle both old format (dict) and new format (dict with contacts and pinned)
-                    if isinstance(data, dict) and 'contacts' in data:
-                        self.pinned_contacts = set(data.get('pinned', []))
-                        return data['contacts']
-                    else:
-                        # Old format, just contacts
-                        return data
-            except:
-                return {}
-        return {}
+                kind, payload = self.load_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == 'progress':
+                self.load_progress.config(value=payload)
+            elif kind == 'error' and self.store.storage_backend == "Server":
+                # Nothing to recover here, changes fail the same way until the server is back
+                self.refresh_contact_list()
+                messagebox.showerror("Error", f"{payload}\n\nStart the server with: python contact_store.py serve")
+            elif kind == 'error':
+                # Keep the broken file instead of silently overwriting it with an empty book
+                moved = self.store.recover()
+                self.refresh_contact_list()
+                messagebox.showerror(
+                    "Error",
+                    f"{payload}\n\nThe file was moved to:\n" + "\n".join(moved) + "\n\nStarting with an empty contact book."
+                )
+            elif kind == 'done':
+                self.loading = False
+                self.store.stats.record('load_contacts', time.perf_counter() - self.load_started)
+                self.store.stats.record('startup_total_to_loaded', time.perf_counter() - IMPORT_STARTED)
+                self.load_progress.stop()
+                self.load_progress.pack_forget()
+                # Ready before the first Add and tag filter, so they don't wait for the builds
+                threading.Thread(target=self.store.build_indexes, name="contact-indexes", daemon=True).start()
+                if self.is_filtering():
+                    self.search_contacts()
+                elif self.contact_listbox.rows is not self.store.order:
+                    # Still the cached first screen, the same rows are at the same places in the full order
+                    self.contact_listbox.format_row = self.format_contact_row
+                    self.contact_listbox.replace_rows(self.store.order)
+                else:
+                    self.contact_listbox.render()
+                return
+            else:
+                self.store.apply_loaded(kind, payload)
+            changed = True
+
+        # Show what has arrived so far, keeping the user's scroll position (unless the cached first screen is shown)
+        if changed and not self.is_filtering() and self.contact_listbox.rows is self.store.order:
+            self.contact_listbox.render()
+        self.root.after(self.LOAD_POLL_MS, self._poll_loading)
+
+    def check_loaded(self): # Changes have to wait until the whole book is loaded
+        if self.loading:
+            messagebox.showinfo("Loading", "Contacts are still loading, please try again in a moment.")
+            return False
+        return True
 
     ## Simpan kontak
-    def save_contacts(self): ## Save contacts to JSON file
-        data = {
-            'contacts': self.contacts,
-            'pinned': list(self.pinned_contacts)
-        }
-        with open(self.contacts_file, 'w') as f:
-            json.dump(data, f, indent=4)
+    def save_contacts(self): ## Save all contacts (full snapshot, also compacts the JSON journal)
+        self.store.save()
 
     ## Loading settingan
-    def load_settings(self): ## Load theme settings from JSON file
-        if os.path.exists(self.settings_file):
-            try:
-                with open(self.settings_file, 'r') as f:
-                    settings = json.load(f)
-                    return settings.get('theme', 'Default Blue')
-            except:
-                return 'Default Blue'
-        return 'Default Blue'
+    def load_settings(self): ## Load theme settings from JSON file (the storage backend is read by ContactStore)
+        return read_settings(self.settings_file).get('theme', 'Default Blue')
 
     ## Simpan settingan
-    def save_settings(self): ## Save theme settings to JSON file
-        settings = {'theme': self.current_theme}
+    def save_settings(self): ## Save theme and storage settings to JSON file (other keys, like save_delay_ms, are kept)
+        settings = read_settings(self.settings_file)
+        settings['theme'] = self.current_theme
+        if self.store.storage_backend in STORAGE_BACKENDS:
+            settings['storage'] = self.store.storage_backend
         with open(self.settings_file, 'w') as f:
             json.dump(settings, f, indent=4)
 
     ## Buat widget GUI app
     def create_widgets(self): ## Create all GUI widgets
-        # Get current theme colors
-        theme = self.themes[self.current_theme]
+        # Widgets get their colors by registering with a role of the theme engine
+        theme = self.theme_engine
+        theme.apply(self.current_theme)
 
         # Menu bar
         menubar = tk.Menu(self.root)
@@ -178,98 +595,157 @@ class ContactBookApp:
         for theme_name in self.themes.keys():
             theme_menu.add_command(label=theme_name, command=lambda t=theme_name: self.change_theme(t))
 
+        # File menu (import/export)
+        file_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="File", menu=file_menu)
+        file_menu.add_command(label="Import Contacts...", command=self.import_contacts)
+        file_menu.add_command(label="Export Contacts...", command=self.export_contacts)
+        file_menu.add_command(label="Save Now", accelerator="Ctrl+S", command=self.save_now)
+        file_menu.add_command(label="Find Duplicates...", command=self.show_duplicates)
+        self.root.bind('<Control-s>', lambda event: self.save_now())
+        file_menu.add_separator()
+
+        duplicate_menu = tk.Menu(file_menu, tearoff=0)
+        file_menu.add_cascade(label="On Duplicate Name", menu=duplicate_menu)
+        self.duplicate_policy = tk.StringVar(value="skip")
+        for policy in DUPLICATE_POLICIES:
+            duplicate_menu.add_radiobutton(label=policy.capitalize(), variable=self.duplicate_policy, value=policy)
+
+        # Edit menu (undo/redo), the labels name the change before the menu opens
+        self.edit_menu = tk.Menu(menubar, tearoff=0, postcommand=self.update_edit_menu)
+        menubar.add_cascade(label="Edit", menu=self.edit_menu)
+        self.edit_menu.add_command(label="Undo", accelerator="Ctrl+Z", command=self.undo_change)
+        self.edit_menu.add_command(label="Redo", accelerator="Ctrl+Y", command=self.redo_change)
+        self.root.bind('<Control-z>', lambda event: self.undo_change())
+        self.root.bind('<Control-y>', lambda event: self.redo_change())
+
+        # Storage menu
+        storage_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Storage", menu=storage_menu)
+
+        self.storage_var = tk.StringVar(value=self.store.storage_backend)
+        for backend in STORAGE_BACKENDS.keys():
+            storage_menu.add_radiobutton(
+                label=backend,
+                variable=self.storage_var,
+                value=backend,
+                command=lambda b=backend: self.change_storage(b),
+                # The contact server decides how the book is stored
+                state=tk.DISABLED if self.store.storage_backend == "Server" else tk.NORMAL
+            )
+
+        # Diagnostics menu
+        diagnostics_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Diagnostics", menu=diagnostics_menu)
+        diagnostics_menu.add_command(label="Performance...", command=self.show_diagnostics)
+        self.profile_var = tk.BooleanVar(value=self.profiler is not None)
+        diagnostics_menu.add_checkbutton(label="Profile Until Exit", variable=self.profile_var, command=self.toggle_profiling)
+        self.diagnostics_window = None
+        self.duplicates_window = None
+
         # Title
-        self.title_label = tk.Label(
+        self.title_label = theme.register(tk.Label(
             self.root,
             text="Contact Book",
             font=("Arial", 24, "bold"),
-            bg=theme["header"],
-            fg="white",
             pady=15
-        )
+        ), 'header')
         self.title_label.pack(fill=tk.X)
 
         # Main container
-        self.main_frame = tk.Frame(self.root, bg=theme["background"])
+        self.main_frame = theme.register(tk.Frame(self.root), 'panel')
         self.main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
         # Left panel - Contact list
-        self.left_frame = tk.Frame(self.main_frame, bg=theme["background"])
+        self.left_frame = theme.register(tk.Frame(self.main_frame), 'panel')
         self.left_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
 
         # Search bar
-        self.search_frame = tk.Frame(self.left_frame, bg=theme["background"])
+        self.search_frame = theme.register(tk.Frame(self.left_frame), 'panel')
         self.search_frame.pack(fill=tk.X, pady=(0, 10))
 
-        text_fg = theme.get("text_color", "black")
-        self.search_label = tk.Label(self.search_frame, text="Search:", font=("Arial", 10), bg=theme["background"], fg=text_fg)
+        self.search_label = theme.register(tk.Label(self.search_frame, text="Search:", font=("Arial", 10)), 'label')
         self.search_label.pack(side=tk.LEFT, padx=(0, 5))
         self.search_var = tk.StringVar()
         self.search_var.trace('w', lambda *args: self.search_contacts())
-        search_entry = tk.Entry(self.search_frame, textvariable=self.search_var, font=("Arial", 10), width=30)
+        search_entry = theme.register(tk.Entry(self.search_frame, textvariable=self.search_var, font=("Arial", 10), width=30), 'entry')
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
-
-        # Contact listbox with scrollbar
-        list_frame = tk.Frame(self.left_frame)
-        list_frame.pack(fill=tk.BOTH, expand=True)
-
-        scrollbar = tk.Scrollbar(list_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        self.contact_listbox = tk.Listbox(
-            list_frame,
-            font=("Arial", 10),
-            yscrollcommand=scrollbar.set,
-            selectmode=tk.SINGLE
-        )
-        self.contact_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.config(command=self.contact_listbox.yview)
+        self.fuzzy_var = tk.BooleanVar(value=False)
+        self.fuzzy_check = theme.register(tk.Checkbutton(
+            self.search_frame, text="Fuzzy", variable=self.fuzzy_var, command=self.toggle_fuzzy_search, font=("Arial", 9)
+        ), 'check')
+        self.fuzzy_check.pack(side=tk.LEFT, padx=(5, 0))
+
+        # Tag filter, combined with the search term ("work AND NOT family AND budi")
+        self.tag_frame = theme.register(tk.Frame(self.left_frame), 'panel')
+        self.tag_frame.pack(fill=tk.X, pady=(0, 10))
+        self.tag_label = theme.register(tk.Label(self.tag_frame, text="Tags:", font=("Arial", 10)), 'label')
+        self.tag_label.pack(side=tk.LEFT, padx=(0, 5))
+        self.tag_button = theme.register(tk.Menubutton(self.tag_frame, text="All", font=("Arial", 9), relief=tk.RAISED), 'menubutton')
+        self.tag_button.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.tag_menu = tk.Menu(self.tag_button, tearoff=0, postcommand=self.update_tag_menu)
+        self.tag_button.config(menu=self.tag_menu)
+        self.tag_vars = {}  # Tag -> StringVar of 'any', 'with' or 'without', kept while the menu is rebuilt
+        self.tag_submenus = []
+
+        # Loading progress (only shown while contacts are being loaded)
+        self.load_progress = ttk.Progressbar(self.left_frame, mode='determinate', maximum=1.0)
+
+        # Contact list with scrollbar (only the visible rows are rendered)
+        self.contact_listbox = VirtualContactList(self.left_frame, font=("Arial", 10))
+        self.contact_listbox.pack(fill=tk.BOTH, expand=True)
+        theme.register(self.contact_listbox.listbox, 'listbox')
 
         self.contact_listbox.bind('<<ListboxSelect>>', self.on_contact_select)
 
         # Right panel - Contact details and actions
-        self.right_frame = tk.Frame(self.main_frame, bg=theme["background"], width=400)
+        self.right_frame = theme.register(tk.Frame(self.main_frame, width=400), 'panel')
         self.right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, padx=(5, 0))
         self.right_frame.pack_propagate(False)
 
         # Contact details section
-        self.details_label = tk.Label(
+        self.details_label = theme.register(tk.Label(
             self.right_frame,
             text="Contact Details",
             font=("Arial", 14, "bold"),
-            bg=theme["subheader"],
-            fg="white",
             pady=10
-        )
+        ), 'subheader')
         self.details_label.pack(fill=tk.X)
 
         # Form frame
-        self.form_frame = tk.Frame(self.right_frame, bg=theme["background"], pady=20)
+        self.form_frame = theme.register(tk.Frame(self.right_frame, pady=20), 'panel')
         self.form_frame.pack(fill=tk.X, padx=20)
 
         # Name
-        self.name_label = tk.Label(self.form_frame, text="Name:", font=("Arial", 10, "bold"), bg=theme["background"], fg=text_fg)
+        self.name_label = theme.register(tk.Label(self.form_frame, text="Name:", font=("Arial", 10, "bold")), 'label')
         self.name_label.grid(row=0, column=0, sticky="w", pady=5)
         self.name_var = tk.StringVar()
-        self.name_entry = tk.Entry(self.form_frame, textvariable=self.name_var, font=("Arial", 10), width=30)
+        self.name_entry = theme.register(tk.Entry(self.form_frame, textvariable=self.name_var, font=("Arial", 10), width=30), 'entry')
         self.name_entry.grid(row=0, column=1, pady=5)
 
         # Phone Number
-        self.phone_label = tk.Label(self.form_frame, text="Phone:", font=("Arial", 10, "bold"), bg=theme["background"], fg=text_fg)
+        self.phone_label = theme.register(tk.Label(self.form_frame, text="Phone:", font=("Arial", 10, "bold")), 'label')
         self.phone_label.grid(row=1, column=0, sticky="w", pady=5)
         self.phone_var = tk.StringVar()
-        self.phone_entry = tk.Entry(self.form_frame, textvariable=self.phone_var, font=("Arial", 10), width=30)
+        self.phone_entry = theme.register(tk.Entry(self.form_frame, textvariable=self.phone_var, font=("Arial", 10), width=30), 'entry')
         self.phone_entry.grid(row=1, column=1, pady=5)
 
         # Email
-        self.email_label = tk.Label(self.form_frame, text="Email:", font=("Arial", 10, "bold"), bg=theme["background"], fg=text_fg)
+        self.email_label = theme.register(tk.Label(self.form_frame, text="Email:", font=("Arial", 10, "bold")), 'label')
         self.email_label.grid(row=2, column=0, sticky="w", pady=5)
         self.email_var = tk.StringVar()
-        self.email_entry = tk.Entry(self.form_frame, textvariable=self.email_var, font=("Arial", 10), width=30)
+        self.email_entry = theme.register(tk.Entry(self.form_frame, textvariable=self.email_var, font=("Arial", 10), width=30), 'entry')
         self.email_entry.grid(row=2, column=1, pady=5)
 
+        # Tags (comma-separated)
+        self.tags_label = theme.register(tk.Label(self.form_frame, text="Tags:", font=("Arial", 10, "bold")), 'label')
+        self.tags_label.grid(row=3, column=0, sticky="w", pady=5)
+        self.tags_var = tk.StringVar()
+        self.tags_entry = theme.register(tk.Entry(self.form_frame, textvariable=self.tags_var, font=("Arial", 10), width=30), 'entry')
+        self.tags_entry.grid(row=3, column=1, pady=5)
+
         # Buttons frame
-        self.button_frame = tk.Frame(self.right_frame, bg=theme["background"])
+        self.button_frame = theme.register(tk.Frame(self.right_frame), 'panel')
         self.button_frame.pack(fill=tk.X, padx=20, pady=20)
 
         # Button style
@@ -280,223 +756,213 @@ class ContactBookApp:
         }
 
         # Add button
-        self.add_btn = tk.Button(
+        self.add_btn = theme.register(tk.Button(
             self.button_frame,
             text="Add",
-            bg=theme["add_button"],
-            fg="white",
             command=self.add_contact,
             **button_config
-        )
+        ), 'add_button')
         self.add_btn.grid(row=0, column=0, padx=5, pady=5)
 
         # Edit button
-        self.edit_btn = tk.Button(
+        self.edit_btn = theme.register(tk.Button(
             self.button_frame,
             text="Edit",
-            bg=theme["edit_button"],
-            fg="white",
             command=self.edit_contact,
             **button_config
-        )
+        ), 'edit_button')
         self.edit_btn.grid(row=0, column=1, padx=5, pady=5)
 
         # Delete button
-        self.delete_btn = tk.Button(
+        self.delete_btn = theme.register(tk.Button(
             self.button_frame,
             text="Delete",
-            bg=theme["delete_button"],
-            fg="white",
             command=self.delete_contact,
             **button_config
-        )
+        ), 'delete_button')
         self.delete_btn.grid(row=1, column=0, padx=5, pady=5)
 
         # Clear button
-        self.clear_btn = tk.Button(
+        self.clear_btn = theme.register(tk.Button(
             self.button_frame,
             text="Clear",
-            bg=theme["clear_button"],
-            fg="white",
             command=self.clear_fields,
             **button_config
-        )
+        ), 'clear_button')
         self.clear_btn.grid(row=1, column=1, padx=5, pady=5)
 
         # Pin/Unpin button
-        self.pin_btn = tk.Button(
+        self.pin_btn = theme.register(tk.Button(
             self.button_frame,
             text="Pin",
-            bg="#3498db",
-            fg="white",
             command=self.toggle_pin_contact,
             **button_config
-        )
+        ), 'pin_button')
         self.pin_btn.grid(row=2, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
 
         # Exit button
-        self.exit_btn = tk.Button(
+        self.exit_btn = theme.register(tk.Button(
             self.button_frame,
             text="Exit",
-            bg=theme["exit_button"],
-            fg="white",
             command=self.exit_app,
             **button_config
-        )
+        ), 'exit_button')
         self.exit_btn.grid(row=3, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
 
     ## Refresh app jika ada kontak baru di list
-    def refresh_contact_list(self, filtered_contacts=None): # Refresh the contact listbox
-        self.contact_listbox.delete(0, tk.END)
+    def refresh_contact_list(self, filtered_names=None): # Refresh the contact listbox
+        # The full order and search results are both already sorted with pinned contacts first,
+        # so only the visible page has to be rendered
+        start = time.perf_counter()
+        names_to_display = filtered_names if filtered_names is not None else self.store.order
+        self.contact_listbox.set_rows(names_to_display, self.format_contact_row)
+        self.store.stats.record('refresh_contact_list', time.perf_counter() - start)
+
+    def format_contact_row(self, name): # Text shown in the listbox for a contact
+        if name in self.store.pinned:
+            return f"★ {name}"
+        return name
 
-        contacts_to_display = filtered_contacts if filtered_contacts is not None else self.contacts
-
-        # Separate pinned and unpinned contacts
-        pinned = []
-        unpinned = []
-
-        for name in contacts_to_display.keys():
-            if name in self.pinned_contacts:
-                pinned.append(name)
-            else:
-                unpinned.append(name)
+    ## Fitur Search
+    def search_contacts(self): # Search contacts by name, phone, or email (debounced, runs off the Tk thread)
+        search_term = self.search_var.get()
 
-        # Sort both lists alphabetically
-        pinned.sort(key=str.lower)
-        unpinned.sort(key=str.lower)
+        if not search_term and not any(self.tag_filter):
+            self.search_scheduler.cancel()
+            self.store.search_index.reset_cache()
+            self.refresh_contact_list()
+            return
 
-        # Add pinned contacts first with star symbol
-        for name in pinned:
-            self.contact_listbox.insert(tk.END, f"★ {name}")
+        self.search_scheduler.schedule(search_term)
 
-        # Add unpinned contacts
-        for name in unpinned:
-            self.contact_listbox.insert(tk.END, name)
+    def toggle_fuzzy_search(self): # Typo-tolerant ranked search instead of substring search
+        self.fuzzy_search_enabled = self.fuzzy_var.get()
+        if self.search_var.get():
+            self.search_contacts()
 
-    ## Fitur Search
-    def search_contacts(self): # Search contacts by name, phone, or email
-        search_term = self.search_var.get().lower()
+    def is_filtering(self): # Whether the list shows search or tag filter results rather than the whole book
+        return bool(self.search_var.get()) or any(self.tag_filter)
 
-        if not search_term:
+    def show_search_results(self, matches): # Runs on the Tk thread once the newest search is done
+        if matches is None:
             self.refresh_contact_list()
+        else:
+            self.refresh_contact_list(matches)
+
+    ## Filter tag
+    def update_tag_menu(self): # Rebuilt when the menu opens: Any/With/Without per tag, with contact counts
+        for submenu in self.tag_submenus:
+            submenu.destroy()
+        self.tag_submenus = []
+        self.tag_menu.delete(0, tk.END)
+        counts = dict(self.store.tag_counts())
+        # Tags in the filter stay listed after their last contact is gone, so they can be cleared
+        for tag in self.tag_vars:
+            if self.tag_vars[tag].get() != 'any':
+                counts.setdefault(tag, 0)
+        if not counts:
+            self.tag_menu.add_command(label="No tags yet", state=tk.DISABLED)
             return
 
-        filtered = {}
-        for name, details in self.contacts.items():
-            if (search_term in name.lower() or
-                search_term in details.get('phone', '').lower() or
-                search_term in details.get('email', '').lower()):
-                filtered[name] = details
-
-        self.refresh_contact_list(filtered)
+        for tag in sorted(counts, key=str.casefold):
+            variable = self.tag_vars.setdefault(tag, tk.StringVar(value='any'))
+            submenu = tk.Menu(self.tag_menu, tearoff=0)
+            for label, value in (("Any", 'any'), ("With", 'with'), ("Without", 'without')):
+                submenu.add_radiobutton(label=label, variable=variable, value=value, command=self.apply_tag_filter)
+            self.tag_submenus.append(submenu)
+            self.tag_menu.add_cascade(label=f"{tag} ({counts[tag]})", menu=submenu)
+        self.tag_menu.add_separator()
+        self.tag_menu.add_command(label="Clear Filter", command=self.clear_tag_filter,
+                                  state=tk.NORMAL if any(self.tag_filter) else tk.DISABLED)
+
+    def apply_tag_filter(self):
+        tags = sorted(self.tag_vars, key=str.casefold)
+        include = tuple(tag for tag in tags if self.tag_vars[tag].get() == 'with')
+        exclude = tuple(tag for tag in tags if self.tag_vars[tag].get() == 'without')
+        self.tag_filter = (include, exclude)
+        self.tag_button.config(text=", ".join(include + tuple(f"not {tag}" for tag in exclude)) or "All")
+        self.search_contacts()
+
+    def clear_tag_filter(self):
+        for variable in self.tag_vars.values():
+            variable.set('any')
+        self.apply_tag_filter()
 
     ## Select kontak
     def on_contact_select(self, event): # Handle contact selection from listbox
-        selection = self.contact_listbox.curselection()
-        if selection:
-            name = self.contact_listbox.get(selection[0])
-            # Remove star prefix if present
-            if name.startswith("★ "):
-                name = name[2:]
-            contact = self.contacts.get(name, {})
+        name = self.contact_listbox.selection()
+        if name is not None:
+            contact = self.store.contacts.get(name)
+            if contact is None:
+                return
 
             self.name_var.set(name)
-            self.phone_var.set(contact.get('phone', ''))
-            self.email_var.set(contact.get('email', ''))
+            self.phone_var.set(contact.phone)
+            self.email_var.set(contact.email)
+            self.tags_var.set(", ".join(contact.tags))
 
             # Update pin button text
-            if name in self.pinned_contacts:
+            if name in self.store.pinned:
                 self.pin_btn.config(text="Unpin")
             else:
                 self.pin_btn.config(text="Pin")
 
     ## Tambah kontak baru
     def add_contact(self): # Add a new contact
-        name = self.name_var.get().strip()
-        phone = self.phone_var.get().strip()
-        email = self.email_var.get().strip()
-
-        if not name:
-            messagebox.showerror("Error", "Name is required!")
+        if not self.check_loaded():
             return
 
-        if not phone and not email:
-            messagebox.showerror("Error", "At least one contact method (phone or email) is required!")
-            return
+        name, phone, email = self.name_var.get(), self.phone_var.get(), self.email_var.get()
+        if not validate_contact(name.strip(), phone.strip(), email.strip()):
+            # Same number or address under another name, found through the key index without a scan
+            collisions = self.store.collisions(phone, email)
+            if collisions and not messagebox.askyesno(
+                "Possible Duplicate",
+                "\n".join(f"'{other}' has the same {field}." for field, other in collisions[:5]) + "\n\nAdd the contact anyway?"
+            ):
+                return
 
-        if name in self.contacts:
-            messagebox.showerror("Error", f"Contact '{name}' already exists!")
+        self.search_scheduler.cancel()  # Results computed before this change would be stale
+        try:
+            name = self.store.add(name, phone, email, self.tags_var.get())
+        except ContactError as e:
+            messagebox.showerror("Error", str(e))
             return
 
-        self.contacts[name] = {
-            'phone': phone,
-            'email': email
-        }
-
-        self.save_contacts()
         self.refresh_contact_list()
         self.clear_fields()
         messagebox.showinfo("Success", f"Contact '{name}' added successfully!")
 
     ## Edit isi kontak
     def edit_contact(self): # Edit an existing contact
-        selection = self.contact_listbox.curselection()
-        if not selection:
-            messagebox.showerror("Error", "Please select a contact to edit!")
-            return
-
-        old_name = self.contact_listbox.get(selection[0])
-        # Remove star prefix if present
-        if old_name.startswith("★ "):
-            old_name = old_name[2:]
-
-        new_name = self.name_var.get().strip()
-        phone = self.phone_var.get().strip()
-        email = self.email_var.get().strip()
-
-        if not new_name:
-            messagebox.showerror("Error", "Name is required!")
+        if not self.check_loaded():
             return
 
-        if not phone and not email:
-            messagebox.showerror("Error", "At least one contact method (phone or email) is required!")
+        old_name = self.contact_listbox.selection()
+        if old_name is None:
+            messagebox.showerror("Error", "Please select a contact to edit!")
             return
 
-        # If name changed, check if new name already exists
-        if new_name != old_name and new_name in self.contacts:
-            messagebox.showerror("Error", f"Contact '{new_name}' already exists!")
+        self.search_scheduler.cancel()
+        try:
+            self.store.edit(old_name, self.name_var.get(), self.phone_var.get(), self.email_var.get(), self.tags_var.get())
+        except ContactError as e:
+            messagebox.showerror("Error", str(e))
             return
 
-        # Delete old contact if name changed
-        if new_name != old_name:
-            del self.contacts[old_name]
-            # Update pinned contacts if name changed
-            if old_name in self.pinned_contacts:
-                self.pinned_contacts.remove(old_name)
-                self.pinned_contacts.add(new_name)
-
-        # Update contact
-        self.contacts[new_name] = {
-            'phone': phone,
-            'email': email
-        }
-
-        self.save_contacts()
         self.refresh_contact_list()
         self.clear_fields()
         messagebox.showinfo("Success", f"Contact updated successfully!")
 
     ## Fitur Delete Kontak
     def delete_contact(self): # Delete a contact
-        selection = self.contact_listbox.curselection()
-        if not selection:
-            messagebox.showerror("Error", "Please select a contact to delete!")
+        if not self.check_loaded():
             return
 
-        name = self.contact_listbox.get(selection[0])
-        # Remove star prefix if present
-        if name.startswith("★ "):
-            name = name[2:]
+        name = self.contact_listbox.selection()
+        if name is None:
+            messagebox.showerror("Error", "Please select a contact to delete!")
+            return
 
         confirm = messagebox.askyesno(
             "Confirm Delete",
@@ -504,11 +970,13 @@ class ContactBookApp:
         )
 
         if confirm:
-            del self.contacts[name]
-            # Remove from pinned if it was pinned
-            if name in self.pinned_contacts:
-                self.pinned_contacts.remove(name)
-            self.save_contacts()
+            self.search_scheduler.cancel()
+            try:
+                self.store.delete(name)
+            except ContactError as e:
+                messagebox.showerror("Error", str(e))
+                return
+
             self.refresh_contact_list()
             self.clear_fields()
             messagebox.showinfo("Success", f"Contact '{name}' deleted successfully!")
@@ -518,79 +986,423 @@ class ContactBookApp:
         self.name_var.set('')
         self.phone_var.set('')
         self.email_var.set('')
+        self.tags_var.set('')
         self.contact_listbox.selection_clear(0, tk.END)
 
     ## Fitur ubah warna theme
     def change_theme(self, theme_name): # Change the application theme
+        start = time.perf_counter()
         self.current_theme = theme_name
         self.save_settings()
 
-        # Get new theme colors
-        theme = self.themes[theme_name]
-        text_fg = theme.get("text_color", "black")
-
-        # Update all widget colors
-        self.title_label.config(bg=theme["header"])
-        self.main_frame.config(bg=theme["background"])
-        self.left_frame.config(bg=theme["background"])
-        self.search_frame.config(bg=theme["background"])
-        self.search_label.config(bg=theme["background"], fg=text_fg)
-        self.right_frame.config(bg=theme["background"])
-        self.details_label.config(bg=theme["subheader"])
-        self.form_frame.config(bg=theme["background"])
-        self.name_label.config(bg=theme["background"], fg=text_fg)
-        self.phone_label.config(bg=theme["background"], fg=text_fg)
-        self.email_label.config(bg=theme["background"], fg=text_fg)
-        self.button_frame.config(bg=theme["background"])
-
-        # Update button colors
-        self.add_btn.config(bg=theme["add_button"])
-        self.edit_btn.config(bg=theme["edit_button"])
-        self.delete_btn.config(bg=theme["delete_button"])
-        self.clear_btn.config(bg=theme["clear_button"])
-        self.exit_btn.config(bg=theme["exit_button"])
+        # Every registered widget, looked up in the theme's precompiled table
+        self.theme_engine.apply(theme_name)
+        self.store.stats.record('change_theme', time.perf_counter() - start)
 
         messagebox.showinfo("Theme Changed", f"Theme changed to '{theme_name}' successfully!")
 
+    ## Fitur import kontak
+    def import_contacts(self): # Bulk import from CSV, vCard or JSON: one storage commit and one list refresh
+        if not self.check_loaded():
+            return
+
+        path = filedialog.askopenfilename(
+            title="Import Contacts",
+            filetypes=[
+                ("Contact files", "*.csv *.vcf *.vcard *.json"), ("CSV", "*.csv"), ("vCard", "*.vcf *.vcard"), ("JSON", "*.json")
+            ]
+        )
+        if not path:
+            return
+
+        self.search_scheduler.cancel()
+        try:
+            report = self.store.import_file(path, self.duplicate_policy.get())
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not read '{path}': {e}")
+            return
+
+        self.refresh_contact_list()
+        messagebox.showinfo("Import Finished", format_import_report(report))
+
+    ## Fitur export kontak
+    def export_contacts(self): # Export all contacts in display order to CSV, vCard or JSON
+        path = filedialog.asksaveasfilename(
+            title="Export Contacts",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("vCard", "*.vcf"), ("JSON", "*.json")]
+        )
+        if not path:
+            return
+
+        try:
+            count = self.store.export_file(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not write '{path}': {e}")
+            return
+        messagebox.showinfo("Export Finished", f"Exported {count} contacts to '{path}'.")
+
+    ## Fitur ganti penyimpanan
+    def change_storage(self, backend): # Switch between the storage backends, copying the current book over
+        if backend == self.store.storage_backend:
+            return
+        if not self.check_loaded():
+            self.storage_var.set(self.store.storage_backend)
+            return
+
+        try:
+            self.store.change_storage(backend)
+        except (OSError, sqlite3.Error, ContactStorageError) as e:
+            self.storage_var.set(self.store.storage_backend)
+            messagebox.showerror("Error", f"Could not switch storage to {backend}: {e}")
+            return
+
+        self.save_settings()
+        messagebox.showinfo("Storage Changed", f"Contacts are now stored with {backend}.")
+
     ## Fitur untuk pin beberapa kontak (max = 5 kontak)
     def toggle_pin_contact(self): # Pin or unpin a contact
-        selection = self.contact_listbox.curselection()
-        if not selection:
+        if not self.check_loaded():
+            return
+
+        name = self.contact_listbox.selection()
+        if name is None:
             messagebox.showerror("Error", "Please select a contact to pin/unpin!")
             return
 
-        name = self.contact_listbox.get(selection[0])
-        # Remove star prefix if present
-        if name.startswith("★ "):
-            name = name[2:]
+        self.search_scheduler.cancel()
+        try:
+            pinned = self.store.toggle_pin(name)
+        except ContactError as e:
+            messagebox.showerror("Error", str(e))
+            return
 
-        if name in self.pinned_contacts:
-            # Unpin contact
-            self.pinned_contacts.remove(name)
-            self.save_contacts()
-            self.refresh_contact_list()
+        self.refresh_contact_list()
+        if pinned:
+            self.pin_btn.config(text="Unpin")
+            messagebox.showinfo("Success", f"Contact '{name}' pinned to top!")
+        else:
             self.pin_btn.config(text="Pin")
             messagebox.showinfo("Success", f"Contact '{name}' unpinned!")
+
+    ## Undo/redo
+    def undo_change(self): # Revert the newest change of this session
+        self._revert_change(self.store.undo, "Nothing to undo.")
+
+    def redo_change(self):
+        self._revert_change(self.store.redo, "Nothing to redo.")
+
+    def _revert_change(self, step, nothing_message):
+        if not self.check_loaded():
+            return
+        searching = self.search_scheduler.busy
+        self.search_scheduler.cancel()
+        result = step()
+        if result is None:
+            messagebox.showinfo("Undo", nothing_message)
+            return
+        if searching:
+            # The rows on screen were about to be replaced anyway
+            self.search_contacts()
         else:
-            # Check if limit reached
-            if len(self.pinned_contacts) >= 5:
-                messagebox.showerror("Error", "You can only pin up to 5 contacts! Please unpin a contact first.")
+            self.update_contact_rows(result[1])
+        self.clear_fields()
+
+    def update_contact_rows(self, touched): # Patch the shown rows for the touched contacts instead of rebuilding them
+        start = time.perf_counter()
+        listbox = self.contact_listbox
+        term = self.search_var.get()
+        if self.is_filtering() and listbox.rows is not self.store.order:
+            if self.fuzzy_search_enabled and term.strip():
+                # Ranked results can move anywhere, search again
+                self.search_contacts()
                 return
+            kept = [name for name in listbox.rows if name not in touched]
+            added = [name for name in touched if self.store.matches(name, term, *self.tag_filter)]
+            # Both parts are already in display order, so this sort is a cheap merge
+            listbox.replace_rows(self.store.order.ordered(kept + added))
+        else:
+            # The full display order is a live view, only the visible page is drawn again
+            listbox.replace_rows(self.store.order)
+        self.store.stats.record('update_contact_rows', time.perf_counter() - start)
+
+    def update_edit_menu(self): # Menu labels like "Undo Delete 'Budi'"
+        for index, (action, stack) in enumerate((("Undo", 'undo'), ("Redo", 'redo'))):
+            label = self.store.history.label(stack)
+            self.edit_menu.entryconfig(index, label=f"{action} {label}" if label else action,
+                                       state=tk.NORMAL if label else tk.DISABLED)
+
+    ## Cari kontak ganda
+    def show_duplicates(self): # Window that scans for duplicates in the background and merges the chosen suggestion
+        if not self.check_loaded():
+            return
+        if self.duplicates_window is not None:
+            self.duplicates_window.lift()
+            return
 
-            # Pin contact
-            self.pinned_contacts.add(name)
-            self.save_contacts()
-            self.refresh_contact_list()
-            self.pin_btn.config(text="Unpin")
-            messagebox.showinfo("Success", f"Contact '{name}' pinned to top!")
+        window = self.duplicates_window = tk.Toplevel(self.root)
+        window.title("Find Duplicates")
+        window.geometry("640x400")
+        window.protocol("WM_DELETE_WINDOW", self.close_duplicates)
+
+        self.duplicates_status = tk.Label(window, anchor="w")
+        self.duplicates_status.pack(fill=tk.X, padx=10, pady=(10, 0))
+        self.duplicates_progress = ttk.Progressbar(window, mode="determinate", maximum=1.0)
+        self.duplicates_progress.pack(fill=tk.X, padx=10, pady=5)
+
+        list_frame = tk.Frame(window)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        scrollbar = tk.Scrollbar(list_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.duplicates_listbox = tk.Listbox(list_frame, font=("Arial", 10), yscrollcommand=scrollbar.set)
+        self.duplicates_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.duplicates_listbox.yview)
+        self.duplicates_listbox.bind('<<ListboxSelect>>', lambda event: self.show_duplicate_details())
+
+        self.duplicates_details = tk.Label(window, anchor="w", justify=tk.LEFT)
+        self.duplicates_details.pack(fill=tk.X, padx=10, pady=5)
+
+        button_frame = tk.Frame(window)
+        button_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        tk.Button(button_frame, text="Merge Selected", command=self.merge_duplicate).pack(side=tk.LEFT)
+        tk.Button(button_frame, text="Scan Again", command=self.scan_duplicates).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Close", command=self.close_duplicates).pack(side=tk.RIGHT)
+
+        self.duplicate_scan = 0  # Generation of the running scan, a closed window or a new scan drops older results
+        self.scan_duplicates()
+
+    def scan_duplicates(self):
+        self.duplicate_scan += 1
+        self.duplicate_suggestions = []
+        self.duplicates_listbox.delete(0, tk.END)
+        self.duplicates_details.config(text="")
+        self.duplicates_status.config(text="Scanning contacts...")
+        self.duplicates_progress.config(value=0)
+        self.duplicate_queue = queue.Queue()
+        threading.Thread(target=self._duplicates_worker, args=(self.duplicate_scan, self.duplicate_queue),
+                         name="contact-duplicates", daemon=True).start()
+        self.root.after(self.LOAD_POLL_MS, self._poll_duplicates)
+
+    def _duplicates_worker(self, scan, results): # Runs on a background thread, the store scans a copy of the book
+        try:
+            suggestions = self.store.find_duplicates(
+                progress=lambda fraction: results.put(('progress', fraction)),
+                cancelled=lambda: scan != self.duplicate_scan
+            )
+        except SearchCancelled:
+            return
+        results.put(('done', suggestions))
+
+    def _poll_duplicates(self): # Tk thread: show progress, then the suggestions
+        if self.duplicates_window is None:
+            return
+        while True:
+            try:
+                kind, payload = self.duplicate_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                self.duplicates_progress.config(value=payload)
+            else:
+                self.duplicate_suggestions = payload
+                for suggestion in payload:
+                    self.duplicates_listbox.insert(tk.END, self.format_duplicate_row(suggestion))
+                self.duplicates_status.config(
+                    text=f"Groups of possible duplicates: {len(payload)}" if payload else "No duplicates found.")
+                return
+        self.root.after(self.LOAD_POLL_MS, self._poll_duplicates)
+
+    def format_duplicate_row(self, suggestion): # "★ Keep <- Others (same name, phone)"
+        marker = "★ " if suggestion['pinned'] else ""
+        return f"{marker}{suggestion['keep']}  <-  {', '.join(suggestion['others'])}  (same {', '.join(suggestion['fields'])})"
+
+    def show_duplicate_details(self): # What merging the selected suggestion would keep
+        selection = self.duplicates_listbox.curselection()
+        if not selection:
+            return
+        suggestion = self.duplicate_suggestions[selection[0]]
+        self.duplicates_details.config(text=(
+            f"Keeps '{suggestion['keep']}' with phone '{suggestion['phone']}' and email '{suggestion['email']}'"
+            + (", pinned" if suggestion['pinned'] else "") + f".\nDeletes: {', '.join(suggestion['others'])}"
+        ))
+
+    def merge_duplicate(self):
+        selection = self.duplicates_listbox.curselection()
+        if not selection:
+            messagebox.showerror("Error", "Please select a suggestion to merge!", parent=self.duplicates_window)
+            return
+        index = selection[0]
+        suggestion = self.duplicate_suggestions[index]
+        if not messagebox.askyesno(
+            "Confirm Merge",
+            f"Merge {', '.join(suggestion['others'])} into '{suggestion['keep']}'?",
+            parent=self.duplicates_window
+        ):
+            return
+
+        self.search_scheduler.cancel()
+        try:
+            self.store.merge_contacts(suggestion['keep'], suggestion['others'], suggestion['phone'], suggestion['email'])
+        except ContactError as e:
+            # Changed since the scan, for example edited or deleted meanwhile
+            messagebox.showerror("Error", f"{e}\n\nPlease scan again.", parent=self.duplicates_window)
+            return
+
+        del self.duplicate_suggestions[index]
+        self.duplicates_listbox.delete(index)
+        self.duplicates_details.config(text="")
+        self.refresh_contact_list()
+        self.clear_fields()
+
+    def close_duplicates(self):
+        if self.duplicates_window is not None:
+            self.duplicate_scan += 1  # Cancels a scan that is still running
+            self.duplicates_window.destroy()
+            self.duplicates_window = None
+
+    ## Fitur diagnostik performa
+    def show_diagnostics(self): # Window with call counts, latency histograms and bytes written per hot path
+        if self.diagnostics_window is not None:
+            self.diagnostics_window.lift()
+            return
+
+        window = self.diagnostics_window = tk.Toplevel(self.root)
+        window.title("Diagnostics")
+        window.geometry("640x400")
+        window.protocol("WM_DELETE_WINDOW", self.close_diagnostics)
+
+        self.diagnostics_text = tk.Text(window, font=("Courier", 9), wrap=tk.NONE)
+        self.diagnostics_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+
+        button_frame = tk.Frame(window)
+        button_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        tk.Button(button_frame, text="Export JSON", command=self.export_diagnostics).pack(side=tk.LEFT)
+        tk.Button(button_frame, text="Reset", command=self.reset_diagnostics).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Close", command=self.close_diagnostics).pack(side=tk.RIGHT)
+
+        self.update_diagnostics()
+
+    DIAGNOSTICS_REFRESH_MS = 1000  # The open diagnostics window redraws itself this often
+
+    def update_diagnostics(self):
+        if self.diagnostics_window is None:
+            return
+        self.diagnostics_text.config(state=tk.NORMAL)
+        self.diagnostics_text.delete("1.0", tk.END)
+        self.diagnostics_text.insert(tk.END, self.store.stats.format_table())
+        self.diagnostics_text.config(state=tk.DISABLED)
+        self.diagnostics_window.after(self.DIAGNOSTICS_REFRESH_MS, self.update_diagnostics)
+
+    def close_diagnostics(self):
+        if self.diagnostics_window is not None:
+            self.diagnostics_window.destroy()
+            self.diagnostics_window = None
+
+    def reset_diagnostics(self):
+        self.store.stats.reset()
+        self.update_diagnostics()
+
+    def export_diagnostics(self): # Saved next to contact_book_settings.json
+        try:
+            self.store.stats.export(self.diagnostics_file)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not write '{self.diagnostics_file}': {e}")
+            return
+        messagebox.showinfo("Diagnostics Exported", f"Diagnostics saved to '{self.diagnostics_file}'.")
+
+    def start_profiling(self):
+        import cProfile
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def toggle_profiling(self): # Only the Tk thread is profiled, search and loading threads are not
+        if self.profile_var.get():
+            self.start_profiling()
+            messagebox.showinfo("Profiling", f"Profiling until exit, the profile will be saved to '{self.profile_file}'.")
+        elif self.profiler is not None:
+            self.profiler.disable()
+            self.profiler = None
+
+    ## Simpan sekarang
+    def save_now(self): # Write pending changes without waiting for the writer thread
+        try:
+            self.store.flush()
+        except (OSError, sqlite3.Error, ContactStorageError) as e:
+            messagebox.showerror("Error", f"Could not save contacts: {e}")
+            return
+        messagebox.showinfo("Saved", "All changes are saved.")
+
+    def check_save_errors(self): # Report a failed background save once, the changes stay pending
+        error = self.store.saver.error if self.store.saver is not None else None
+        if error is not None:
+            self.store.saver.error = None
+            messagebox.showerror("Error", f"Could not save contacts: {error}\n\nChanges are kept and saved again with the next change or Save Now.")
+        self.root.after(self.SAVE_CHECK_MS, self.check_save_errors)
+
+    ## Perubahan dari program lain
+    def check_external_changes(self): # Merge saves by other programs, the list updates without a reload
+        if not self.loading and not self.syncing and self.store.storage.changed():
+            # Reading the other program's changes can take a while on a network drive
+            self.syncing = True
+            threading.Thread(target=self._sync_worker, name="contact-sync", daemon=True).start()
+
+        # Also counts changes merged by the writer thread right before it saved
+        if self.store.external_changes != self.shown_external_changes:
+            self.shown_external_changes = self.store.external_changes
+            with self.store.lock:
+                touched, self.store.external_names = self.store.external_names, set()
+            # Only the rows of the contacts they touched are patched
+            self.update_contact_rows(touched)
+        if self.store.storage_backend == "Server":
+            self.root.after(self.SERVER_CHECK_MS, self.check_external_changes)
+        else:
+            self.root.after(self.EXTERNAL_CHECK_MS, self.check_external_changes)
+
+    def _sync_worker(self): # Runs on a background thread, applies the merged records under the store lock
+        try:
+            self.store.sync()
+        except (OSError, sqlite3.Error, ContactStorageError):
+            # Locked or half-written by the other program, the next check tries again
+            pass
+        finally:
+            self.syncing = False
 
     ## Untuk exit
+    def shutdown(self): # Save everything and close the storage, False if the user wants to stay after a failed save
+        try:
+            # Fold the journal into contacts.json so the next start only reads the snapshot
+            # (not while loading, the book in memory is still incomplete)
+            self.store.close(compact=not self.loading)
+        except (OSError, sqlite3.Error, ContactStorageError) as e:
+            if not messagebox.askyesno("Error", f"Could not save contacts: {e}\n\nExit anyway? Unsaved changes will be lost."):
+                return False
+        else:
+            if not self.loading:
+                try:
+                    self.store.write_first_screen(self.first_screen_file)
+                except OSError:
+                    pass  # Only a cache, the next start loads the list without it
+        if self.profiler is not None:
+            # Read it with: python -m pstats contact_book_profile.prof
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_file)
+        return True
+
     def exit_app(self): # Exit application
         confirm = messagebox.askyesno("Exit", "Are you sure you want to exit?")
-        if confirm:
+        if confirm and self.shutdown():
             self.root.quit()
 
+    def close_window(self): # Window close button
+        if self.shutdown():
+            self.root.destroy()
+
 def main():
+    if len(sys.argv) > 1:
+        # Command line mode, e.g. "contact_book_v1b_sc.py import contacts.csv"
+        sys.exit(run_cli(sys.argv[1:]))
+
+    load_tkinter()
     root = tk.Tk()
     app = ContactBookApp(root)
     root.mainloop()
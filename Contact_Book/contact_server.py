@@ -0,0 +1,322 @@
+## Server sinkronisasi lokal: satu proses memegang buku kontak, GUI dan script terhubung lewat socket
+import asyncio
+import json
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from contact_store import (
+    ContactStore, ContactError, ContactStorageError, DEFAULT_SERVER_ADDRESS, RECORD_FIELDS,
+    encode_message, get_app_dir, parse_server_address, read_settings, record_names
+)
+
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024  # Longest request line, a 'replace' of a big book is one line
+MAX_UNSENT_BYTES = 16 * 1024 * 1024  # Pushed changes a client may leave unread before it is dropped
+SAVE_DELAY_MS = 50  # Commits from all clients within this window are saved together ('server_save_delay_ms' overrides it)
+
+## Protokol: satu baris JSON per pesan
+# Request {"id": 1, "method": "search", "params": {...}} -> reply {"id": 1, "result": ...} or {"id": 1, "error": "..."}
+# Clients that called "load" or "subscribe" also get {"event": "changes", "changes": [[revision, [[name, details, pinned], ...]], ...]}:
+# the state of every contact a change touched right after it was applied (details is null for a deleted contact)
+class ContactServer: # asyncio server around one ContactStore, every applied change is pushed to the subscribed clients
+    EXTERNAL_CHECK_SECONDS = 2  # Programs that still write the files directly are merged in this often
+    WORKER_THREADS = 2  # Searches, saves and anything taking store.lock run here, so the event loop keeps answering other clients
+
+    def __init__(self, store, address=DEFAULT_SERVER_ADDRESS):
+        self.store = store
+        self.address = address
+        self.subscribers = {}  # StreamWriter -> unsent bytes it may have before it is dropped
+        self.connections = set()
+        self.revision = 0  # Bumped for every applied change, guarded by store.lock
+        self.outbox = []  # [revision, touched contacts] not pushed yet, guarded by outbox_lock
+        self.outbox_lock = threading.Lock()  # Only held for a moment, the loop thread never waits on store.lock
+        self.push_scheduled = False
+        self.snapshot = None  # (revision, encoded book), shared by clients that load the same revision
+        self.loop = None
+        self.server = None
+        self.watcher = None
+        self.executor = ThreadPoolExecutor(self.WORKER_THREADS, thread_name_prefix="contact-server")
+        store.on_change = self._changed
+
+    ## Menyalakan dan mematikan server
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        family, target = parse_server_address(self.address)
+        if family == 'unix':
+            remove_stale_socket(target)
+            self.server = await asyncio.start_unix_server(self._serve, target, limit=MAX_MESSAGE_BYTES)
+        else:
+            self.server = await asyncio.start_server(self._serve, *target, limit=MAX_MESSAGE_BYTES)
+        self.watcher = asyncio.ensure_future(self._watch_files())
+
+    async def close(self): # Disconnect everyone, then save and close the book
+        self.watcher.cancel()
+        self.server.close()
+        for writer in list(self.connections):
+            writer.transport.abort()
+        await self.server.wait_closed()
+        await self.loop.run_in_executor(self.executor, self.store.close)
+        self.executor.shutdown()
+        family, target = parse_server_address(self.address)
+        if family == 'unix' and os.path.exists(target):
+            os.unlink(target)
+
+    @property
+    def port(self): # The TCP port actually bound, useful with port 0
+        return self.server.sockets[0].getsockname()[1]
+
+    ## Kirim perubahan ke klien
+    def _changed(self, records): # store.on_change, runs under store.lock on whichever thread applied the records
+        self.revision += 1
+        # States rather than the records, so a client can take them as they are whatever it changed meanwhile
+        contacts, pinned = self.store.contacts, self.store.pinned
+        names = dict.fromkeys(name for record in records for name in record_names(record) if name is not None)
+        change = [self.revision, [
+            [name, contacts[name].to_dict() if name in contacts else None, name in pinned] for name in names
+        ]]
+        with self.outbox_lock:
+            self.outbox.append(change)
+            if self.push_scheduled:
+                return
+            # Everything applied until the loop gets to it goes out as one message
+            self.push_scheduled = True
+        self.loop.call_soon_threadsafe(self._push)
+
+    def _push(self): # Loop thread: one message with every change since the last push, encoded once for all clients
+        with self.outbox_lock:
+            changes, self.outbox = self.outbox, []
+            self.push_scheduled = False
+        if changes:
+            data = encode_message({'event': 'changes', 'changes': changes})
+            for writer in list(self.subscribers):
+                self._send(writer, data)
+
+    def _send(self, writer, data):
+        if writer.transport.is_closing():
+            self.subscribers.pop(writer, None)
+            return
+        writer.write(data)
+        if writer in self.subscribers and writer.transport.get_write_buffer_size() > self.subscribers[writer]:
+            # A client that stopped reading would make the server hold every change for it, it can load again
+            self.subscribers.pop(writer)
+            writer.transport.abort()
+
+    ## Melayani satu koneksi
+    async def _serve(self, reader, writer):
+        self.connections.add(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(encode_message({'id': None, 'error': f"Request longer than {MAX_MESSAGE_BYTES} bytes"}))
+                    break
+                if not line:
+                    break
+                writer.write(await self._handle(writer, line))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(writer)
+            self.subscribers.pop(writer, None)
+            writer.close()
+
+    async def _handle(self, writer, line): # Reply bytes for one request line
+        start = time.perf_counter()
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id, method = request.get('id'), request.get('method')
+            handler = getattr(self, f'do_{method}', None)
+            if handler is None:
+                raise ContactError(f"Unknown method '{method}'")
+            try:
+                result = await handler(writer, **(request.get('params') or {}))
+            finally:
+                self.store.stats.record(f'server_{method}', time.perf_counter() - start)
+        except ContactError as e:
+            return encode_message({'id': request_id, 'error': str(e)})
+        except (ContactStorageError, OSError, sqlite3.Error) as e:
+            # Disk full or a locked file, the client gets an answer instead of waiting for its timeout
+            return encode_message({'id': request_id, 'error': f"Storage error: {e}"})
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            return encode_message({'id': request_id, 'error': f"Bad request: {e}"})
+        if isinstance(result, bytes):
+            # Already encoded (the book), spliced in instead of being decoded and encoded again
+            return b'{"id":' + json.dumps(request_id).encode('utf-8') + b',"result":' + result + b'}\n'
+        return encode_message({'id': request_id, 'result': result})
+
+    def _run(self, func, *args): # Runs func on a worker thread, for anything that may take more than a moment
+        return self.loop.run_in_executor(self.executor, func, *args)
+
+    def _commit(self, change, *args): # Worker thread: apply one store change, returns its result and the revision it is pushed under
+        with self.store.lock:
+            before = self.revision
+            result = change(*args)
+            return result, (self.revision if self.revision != before else None)
+
+    ## Method yang bisa dipanggil klien
+    async def do_ping(self, writer):
+        return {'revision': self.revision}
+
+    async def do_load(self, writer): # The whole book, and every change after it is pushed to this client
+        self._push()  # Earlier changes go out to the others now, they are part of the snapshot
+        # Subscribed before the snapshot is taken: changes applied meanwhile come again after it,
+        # which is harmless as every pushed change carries the state of the contacts it touched
+        self.subscribers[writer] = MAX_UNSENT_BYTES
+        book = await self._run(self._encoded_book)
+        if writer in self.subscribers:
+            # The reply itself may sit in the buffer while changes arrive
+            self.subscribers[writer] = MAX_UNSENT_BYTES + len(book)
+        return book
+
+    def _encoded_book(self): # Worker thread: the current book as 'load' result bytes, shared by clients loading the same revision
+        with self.store.lock:
+            snapshot = self.snapshot
+            if snapshot is None or snapshot[0] != self.revision:
+                revision, contacts, pinned = self.revision, self.store.contacts.copy(), sorted(self.store.pinned)
+                snapshot = None
+        if snapshot is None:
+            snapshot = self.snapshot = (revision, encode_book(contacts, pinned, revision))
+        return snapshot[1]
+
+    async def do_subscribe(self, writer): # Only the changes from now on, for clients that keep no copy of the book
+        self._push()
+        self.subscribers[writer] = MAX_UNSENT_BYTES
+        return {'revision': self.revision}
+
+    async def do_search(self, writer, term='', fuzzy=False, include_tags=(), exclude_tags=(), limit=None):
+        # Names in display order (ranked if fuzzy), None means the whole book
+        names = await self._run(lambda: self.store.search(term, None, fuzzy, include_tags, exclude_tags))
+        if names is None:
+            return {'names': None, 'count': len(self.store.contacts)}
+        return {'names': names[:limit] if limit else names, 'count': len(names)}
+
+    async def do_get(self, writer, names): # {name: details or None}
+        return await self._run(self._get, names)
+
+    def _get(self, names):
+        with self.store.lock:
+            return {name: self.store.contacts[name].to_dict() if name in self.store.contacts else None for name in names}
+
+    async def do_add(self, writer, name, phone='', email='', tags=()):
+        name, revision = await self._run(self._commit, self.store.add, name, phone, email, tags)
+        return {'name': name, 'revision': revision}
+
+    async def do_edit(self, writer, name, new_name=None, phone=None, email=None, tags=None): # Unspecified fields stay the same
+        name, revision = await self._run(self._edit, name, new_name, phone, email, tags)
+        return {'name': name, 'revision': revision}
+
+    def _edit(self, name, new_name, phone, email, tags):
+        with self.store.lock:
+            contact = self.store.contacts.get(name)
+            if contact is None:
+                raise ContactError(f"Contact '{name}' does not exist!")
+            return self._commit(
+                self.store.edit, name, name if new_name is None else new_name,
+                contact.phone if phone is None else phone, contact.email if email is None else email, tags
+            )
+
+    async def do_delete(self, writer, name):
+        return {'revision': (await self._run(self._commit, self.store.delete, name))[1]}
+
+    async def do_pin(self, writer, name):
+        return {'revision': (await self._run(self._commit, self.store.pin, name))[1]}
+
+    async def do_unpin(self, writer, name):
+        return {'revision': (await self._run(self._commit, self.store.unpin, name))[1]}
+
+    async def do_merge(self, writer, name, others):
+        name, revision = await self._run(self._commit, self.store.merge_contacts, name, others)
+        return {'name': name, 'revision': revision}
+
+    async def do_commit(self, writer, records, label="Change"): # Raw change records, as ServerStorage sends them
+        for record in records:
+            op = record.get('op')
+            if op not in RECORD_FIELDS:
+                raise ContactError(f"Unknown change '{op}'")
+            for field in ('old', 'new') if op == 'rename' else ('name',):
+                if not isinstance(record.get(field), str):
+                    raise ContactError(f"'{op}' change without '{field}'")
+        if not records:
+            return {'revision': None}
+        return {'revision': (await self._run(self._commit, lambda: self.store.commit(*records, label=label)))[1]}
+
+    async def do_replace(self, writer, contacts, pinned): # Make the book equal to the given one, only the differences are committed
+        return await self._run(self._replace, contacts, pinned)
+
+    def _replace(self, contacts, pinned):
+        with self.store.lock:
+            records = self.store.diff_records(contacts, set(pinned))
+            if not records:
+                return {'revision': None, 'names': []}
+            revision = self._commit(lambda: self.store.commit(*records, label="Replace"))[1]
+        return {'revision': revision, 'names': sorted({name for record in records for name in record_names(record)})}
+
+    async def do_flush(self, writer): # Returns once everything committed so far is on disk
+        await self._run(self.store.flush)
+        return {'revision': self.revision}
+
+    ## Program lain yang menulis file secara langsung
+    async def _watch_files(self):
+        while True:
+            await asyncio.sleep(self.EXTERNAL_CHECK_SECONDS)
+            if not self.store.storage.changed():
+                continue
+            try:
+                # Merged records reach the clients through store.on_change like any other change
+                await self._run(self.store.sync)
+            except (OSError, sqlite3.Error, ContactStorageError):
+                # Locked or half-written by the other program, the next check tries again
+                pass
+
+def encode_book(contacts, pinned, revision): # The 'load' result as JSON bytes, runs on a worker thread
+    book = {'revision': revision, 'pinned': pinned, 'contacts': dict(contacts.items())}
+    return encode_message(book)[:-1]
+
+def remove_stale_socket(path): # A socket file left by a server that didn't shut down, refuses to remove a live one
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"A contact server is already listening on {path}")
+
+def run_server(data_dir=None, address=DEFAULT_SERVER_ADDRESS, storage_backend=None): # Serve until Ctrl+C or SIGTERM, returns the exit code
+    settings = read_settings(os.path.join(data_dir or get_app_dir(), "contact_book_settings.json"))
+    save_delay_ms = settings.get('server_save_delay_ms', SAVE_DELAY_MS)
+    if not isinstance(save_delay_ms, (int, float)) or save_delay_ms <= 0:
+        save_delay_ms = SAVE_DELAY_MS
+
+    async def serve():
+        store = ContactStore(data_dir, storage_backend, save_delay=save_delay_ms / 1000)
+        store.load()
+        server = ContactServer(store, address)
+        await server.start()
+        print(f"Serving {len(store.contacts)} contacts on {address} (Ctrl+C to stop)", flush=True)
+        stopped = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                server.loop.add_signal_handler(signal_number, stopped.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+        try:
+            await stopped.wait()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,3349 @@
+## Inti buku kontak tanpa GUI (dipakai oleh GUI, command line dan script)
+import json
+import os
+import sys
+import time
+import sqlite3
+import threading
+import queue
+import socket
+import csv
+import re
+import heapq
+import contextlib
+import glob
+import mmap
+import struct
+import zlib
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from itertools import accumulate, chain, islice
+from bisect import bisect_left, insort
+
+try:
+    import fcntl
+except ImportError:
+    # Windows locks files through msvcrt instead
+    fcntl = None
+    import msvcrt
+
+class ContactStorageError(Exception): # Raised when the contacts file exists but can't be read
+    pass
+
+## Lokasi file data
+def get_app_dir(): # Folder that holds contacts.json and the settings (next to the exe or script)
+    # When running as exe, sys.executable is the exe path
+    # When running as script, __file__ is the script path
+    if getattr(sys, 'frozen', False):
+        # Running as compiled exe
+        return os.path.dirname(sys.executable)
+    # Running as script
+    return os.path.dirname(os.path.abspath(__file__))
+
+## Validasi kontak
+def validate_contact(name, phone, email): # Error message for an invalid contact, None if it is fine
+    if not name:
+        return "Name is required!"
+    if not phone and not email:
+        return "At least one contact method (phone or email) is required!"
+    return None
+
+class SearchCancelled(Exception): # Raised inside a search that was superseded by a newer term (or a cancelled duplicate scan)
+    pass
+
+## Interface penyimpanan kontak
+class ContactStorage: # Base class for the storage backends behind ContactStore
+    records = 0  # Changes not yet folded into a full snapshot
+    bytes_written = 0  # Bytes written by append and save_snapshot since the storage was opened
+    lazy_details = False  # True if load returns LazyContacts instead of a dict
+    snapshot = None  # Lazy storages: LazyContacts over the details written by the last save_snapshot
+
+    def load(self): # Returns (contacts, pinned), raises ContactStorageError if the data can't be read
+        raise NotImplementedError
+
+    def append(self, *records): # Persist mutation records ({'op': 'put'/'delete'/'rename'/'pin'/'unpin', ...})
+        raise NotImplementedError
+
+    def save_snapshot(self, contacts, pinned): # Replace the stored book with the given state
+        raise NotImplementedError
+
+    def iter_load(self, batch_size=2000): # Yields ('pinned', set), ('contacts', dict), ('records', list), ('progress', fraction)
+        contacts, pinned = self.load()
+        yield ('pinned', pinned)
+        yield ('contacts', contacts)
+        yield ('progress', 1.0)
+
+    def needs_compaction(self, incoming=0): # True if the next change should be written as a full snapshot
+        return False
+
+    def search(self, term): # Names matching term, or None if the backend has no index for it
+        return None
+
+    def quarantine(self): # Move unreadable files aside, returns the new paths
+        return []
+
+    def lock(self): # Context manager that keeps other programs from writing the same book meanwhile
+        return contextlib.nullcontext()
+
+    def changed(self): # Cheap check whether another program saved since this one last read or wrote
+        return False
+
+    def read_changes(self): # Records other programs saved since the last read or write, None if everything must be reloaded
+        return []
+
+    def close(self):
+        pass
+
+def record_names(record): # Contact names a change record touches
+    if record['op'] == 'rename':
+        return (record['old'], record['new'])
+    return (record.get('name'),)
+
+## Kunci file antar program (shared drive)
+class FileLock: # Advisory lock on a .lock file, reentrant within this process, waits for other programs holding it
+    TIMEOUT = 30  # Seconds to wait for another program before the write fails
+    RETRY_SECONDS = 0.05
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.depth = 0  # Nested holders in this process, the file lock is taken by the outermost one
+        self.thread_lock = threading.RLock()
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            try:
+                self._acquire()
+            except BaseException:
+                self.thread_lock.release()
+                raise
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        try:
+            if self.depth == 0:
+                self._release()
+        finally:
+            self.thread_lock.release()
+
+    def _acquire(self):
+        self.file = open(self.path, 'a+b')
+        deadline = time.monotonic() + self.TIMEOUT
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    self.file.seek(0)
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    self.file.close()
+                    self.file = None
+                    raise TimeoutError(f"'{self.path}' is locked by another program, try again later")
+                time.sleep(self.RETRY_SECONDS)
+
+    def _release(self):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.file.close()
+            self.file = None
+
+## Data satu kontak
+class Contact: # Phone, email and tags of one contact, much smaller than a {'phone': ..., 'email': ...} dict
+    __slots__ = ('phone', 'email', 'tags')
+
+    def __init__(self, phone='', email='', tags=()):
+        self.phone = phone
+        self.email = email
+        self.tags = tags  # Tuple of tag names, see normalize_tags
+
+    @classmethod
+    def from_dict(cls, details):
+        return cls(details.get('phone', ''), details.get('email', ''), tuple(details.get('tags') or ()))
+
+    def to_dict(self): # Format used in contacts.json, 'tags' is only written for tagged contacts
+        details = {'phone': self.phone, 'email': self.email}
+        if self.tags:
+            details['tags'] = list(self.tags)
+        return details
+
+    def get(self, field, default=None): # Dict-style read access, so code written for the JSON dicts keeps working
+        if field in self.__slots__:
+            return getattr(self, field)
+        return default
+
+    def __getitem__(self, field):
+        if field not in self.__slots__:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __eq__(self, other):
+        if isinstance(other, Contact):
+            return self.phone == other.phone and self.email == other.email and self.tags == other.tags
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        tags = f", tags={self.tags!r}" if self.tags else ""
+        return f"Contact(phone={self.phone!r}, email={self.email!r}{tags})"
+
+    @staticmethod
+    def json_default(value): # json.dump hook that writes Contact objects as their dict form
+        if isinstance(value, Contact):
+            return value.to_dict()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+NO_DETAILS = Contact()  # Stand-in for contacts whose phone and email aren't kept in memory
+
+def normalize_tags(tags): # Sorted tuple of unique tag names, from a list or a comma-separated string
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    unique = {' '.join(tag.split()) for tag in tags} - {''}
+    return tuple(sorted(unique, key=str.casefold))
+
+def put_record(name, phone='', email='', tags=()): # 'put' record, 'tags' is only written for tagged contacts
+    record = {'op': 'put', 'name': name, 'phone': phone, 'email': email}
+    if tags:
+        record['tags'] = list(tags)
+    return record
+
+## Kontak dengan detail yang dibaca saat dibutuhkan
+class LazyContacts(MutableMapping): # Contact name -> Contact, unchanged contacts are read from a details file on demand
+    CACHE_SIZE = 256  # Recently read contacts kept decoded (selected in the list, shown in the form)
+    CANCEL_CHECK_EVERY = 1024  # Lines checked between checks for a newer search term
+
+    def __init__(self, data=b'', offsets=None):
+        self.data = data  # mmap of the details file: one '"name": {"phone": ..., "email": ..., "tags": [...]}' line per contact
+        self.offsets = offsets if offsets is not None else {}  # Name -> offset of its line, for contacts unchanged since
+        self.changed = {}  # Name -> Contact for contacts added or edited after the file was written
+        self.cache = OrderedDict()  # Least recently read first
+        self.lock = threading.RLock()  # ContactStore shares its own lock
+        self.last_term = ''
+        self.last_result = None  # Names from the previous details search, narrowed when the term is extended
+        self.last_texts = None  # Their lowercase "phone\nemail", only kept until the next search
+
+    @staticmethod
+    def encode_entry(name, details): # Line for the details file, also a member of the contacts object in contacts.json
+        value = {'phone': details.get('phone', ''), 'email': details.get('email', '')}
+        if details.get('tags'):
+            value['tags'] = list(details.get('tags'))
+        return (json.dumps(name) + ': ' + json.dumps(value)).encode('ascii')
+
+    @staticmethod
+    def is_plain(line): # Nothing escaped and no tags, the values can be cut out of the line directly
+        return b'\\' not in line and not line.endswith(b']}')
+
+    @staticmethod
+    def _value_spans(line): # Where the phone and email values of a plain details file line start and end
+        # Quotes inside strings are escaped, so the first unescaped separators are the ones encode_entry wrote
+        name_end = line.index(b'": {"phone": "')
+        email_start = line.index(b'", "email": "', name_end)
+        return name_end, (name_end + 14, email_start), (email_start + 13, len(line) - 2)
+
+    @classmethod
+    def decode_entry(cls, line): # (name, Contact) from a details file line
+        if not cls.is_plain(line):
+            (name, details), = json.loads(b'{' + line + b'}').items()
+            return name, Contact.from_dict(details)
+        # Cutting the values out directly is much faster than json.loads
+        name_end, (phone_start, phone_end), (email_start, email_end) = cls._value_spans(line)
+        return line[1:name_end].decode('ascii'), Contact(
+            line[phone_start:phone_end].decode('ascii'), line[email_start:email_end].decode('ascii')
+        )
+
+    @classmethod
+    def line_text(cls, line): # Lowercase "phone\nemail" of a details file line, what search_details looks in
+        if not cls.is_plain(line):
+            contact = cls.decode_entry(line)[1]
+            return contact.phone.lower() + '\n' + contact.email.lower()
+        _, (phone_start, phone_end), (email_start, email_end) = cls._value_spans(line)
+        return line[phone_start:phone_end].decode('ascii').lower() + '\n' + line[email_start:email_end].decode('ascii').lower()
+
+    @staticmethod
+    def decode_name(line): # Name from a details file line, without decoding the rest
+        name_end = line.index(b'": {"phone": "')
+        if b'\\' in line[:name_end]:
+            return json.loads(line[:name_end + 1])
+        return line[1:name_end].decode('ascii')
+
+    def raw_entry(self, name): # Line of an unchanged contact, copied as it is into the next snapshot
+        offset = self.offsets[name]
+        end = self.data.find(b'\n', offset)
+        return self.data[offset:end if end >= 0 else len(self.data)]
+
+    def entries(self): # (name, encoded line) for every contact, without decoding unchanged ones
+        for name in self.offsets:
+            yield name, self.raw_entry(name)
+        for name, contact in self.changed.items():
+            yield name, self.encode_entry(name, contact)
+
+    def _details(self, name): # Contact without touching the cache, KeyError if there is none
+        contact = self.changed.get(name)
+        if contact is None:
+            contact = self.decode_entry(self.raw_entry(name))[1]
+        return contact
+
+    def __getitem__(self, name):
+        with self.lock:
+            contact = self.changed.get(name)
+            if contact is not None:
+                return contact
+            contact = self.cache.get(name)
+            if contact is not None:
+                self.cache.move_to_end(name)
+                return contact
+            contact = self._details(name)
+            self.cache[name] = contact
+            if len(self.cache) > self.CACHE_SIZE:
+                self.cache.popitem(last=False)
+            return contact
+
+    def __setitem__(self, name, contact):
+        if not isinstance(contact, Contact):
+            contact = Contact.from_dict(contact)
+        with self.lock:
+            self.offsets.pop(name, None)
+            self.cache.pop(name, None)
+            self.changed[name] = contact
+            self.last_result = None
+
+    def __delitem__(self, name):
+        with self.lock:
+            if self.changed.pop(name, None) is None:
+                del self.offsets[name]
+            self.cache.pop(name, None)
+            self.last_result = None
+
+    def __contains__(self, name):
+        return name in self.changed or name in self.offsets
+
+    def __len__(self):
+        return len(self.offsets) + len(self.changed)
+
+    def __iter__(self):
+        return chain(self.offsets, self.changed)
+
+    def items(self): # Decodes every unchanged contact once, without filling the cache (used to build indexes)
+        for name in self.offsets:
+            yield name, self._details(name)
+        yield from self.changed.items()
+
+    def tagged(self): # (name, tags) of every tagged contact, only their lines are decoded
+        with self.lock:
+            data = self.data
+            # A line ends with ']}' only if it has a tags list, find() skips the others without decoding them
+            end = data.find(b']}\n')
+            while end >= 0:
+                start = data.rfind(b'\n', 0, end) + 1
+                name, contact = self.decode_entry(data[start:end + 2])
+                if self.offsets.get(name) == start:
+                    yield name, contact.tags
+                end = data.find(b']}\n', end + 3)
+            for name, contact in self.changed.items():
+                if contact.tags:
+                    yield name, contact.tags
+
+    def copy(self): # Cheap copy for a snapshot write, shares the details file
+        with self.lock:
+            copy = LazyContacts(self.data, dict(self.offsets))
+            copy.changed = dict(self.changed)
+        return copy
+
+    def remap(self, other, touched): # Switch to other's details file, the contacts in touched keep their state here
+        with self.lock:
+            offsets, changed = other.offsets, dict(other.changed)
+            for name in touched:
+                if name in self:
+                    offsets.pop(name, None)
+                    changed[name] = self._details(name)
+                else:
+                    # Deleted (or renamed away) after other was written
+                    offsets.pop(name, None)
+                    changed.pop(name, None)
+            self.data, self.offsets, self.changed = other.data, offsets, changed
+            self.cache.clear()
+            self.last_result = None
+
+    def search_details(self, term, cancelled=None): # Names whose phone or email contains the lowercase term
+        with self.lock:
+            if self.last_result is not None and self.last_term in term:
+                # Term was extended, so the new matches are a subset of the previous ones
+                kept = [(name, text) for name, text in zip(self.last_result, self.last_texts) if term in text]
+                names, texts = [name for name, _ in kept], [text for _, text in kept]
+            else:
+                names, texts = self._scan(term, cancelled)
+                for name, contact in self.changed.items():
+                    text = contact.phone.lower() + '\n' + contact.email.lower()
+                    if term in text:
+                        names.append(name)
+                        texts.append(text)
+            self.last_term, self.last_result, self.last_texts = term, names, texts
+            return names
+
+    def _scan(self, term, cancelled): # Unchanged contacts whose line in the details file matches, and their texts
+        # The file is ASCII with JSON escapes, so the term is looked for in its escaped form.
+        # Letters match case-insensitively (ASCII only, uppercase non-ASCII details are missed).
+        pattern = re.compile(re.escape(json.dumps(term)[1:-1].encode('ascii')), re.IGNORECASE)
+        data = self.data
+        offsets = self.offsets
+        names, texts = [], []
+        position = 0
+        checked = 0
+        while True:
+            match = pattern.search(data, position)
+            if match is None:
+                break
+            start = data.rfind(b'\n', 0, match.start()) + 1
+            end = data.find(b'\n', match.end())
+            if end < 0:
+                end = len(data)
+            line = data[start:end]
+            # The hit may be in the name or a key, and lines of edited contacts are out of date
+            text = self.line_text(line)
+            if term in text:
+                name = self.decode_name(line)
+                if offsets.get(name) == start:
+                    names.append(name)
+                    texts.append(text)
+            position = end + 1
+            checked += 1
+            if cancelled is not None and checked % self.CANCEL_CHECK_EVERY == 0 and cancelled():
+                raise SearchCancelled()
+        return names, texts
+
+## Pembaca JSON bertahap
+class JsonStreamReader: # Reads one JSON value at a time from a file, without loading the whole file
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ''
+        self.pos = 0
+        self.consumed = 0  # Characters read from the file so far, for progress reporting
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self): # Read the next chunk, returns False at end of file
+        chunk = self.f.read(self.CHUNK_SIZE)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.consumed += len(chunk)
+        return True
+
+    def peek(self): # Next non-whitespace character, '' at end of file
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at character {self.consumed - len(self.buffer) + self.pos}")
+        self.pos += 1
+
+    def value(self): # Decode one complete value, reading more chunks until it is complete
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not self._fill():
+                    raise
+                continue
+            if end == len(self.buffer) and isinstance(value, (int, float)) and self._fill():
+                continue  # A number cut off at the chunk boundary
+            self.pos = end
+            return value
+
+    def object_keys(self): # Yield the keys of an object, the caller reads each value before the next key
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect('}')
+                return
+
+## Penyimpanan kontak (snapshot + journal)
+class JsonJournalStorage(ContactStorage): # contacts.json snapshot plus an append-only journal of changes
+    COMPACT_EVERY = 500  # Journal records written before the snapshot is rewritten
+
+    # Several programs may share the files (e.g. on a network drive): every read and write happens under
+    # contacts.lock, and each program remembers what it has seen so it can pick up the others' changes
+    def __init__(self, contacts_file):
+        self.contacts_file = contacts_file
+        self.journal_file = os.path.splitext(contacts_file)[0] + ".journal"
+        self.file_lock = FileLock(os.path.splitext(contacts_file)[0] + ".lock")
+        self.journal = None  # Append handle, opened on the first write
+        self.records = 0  # Records in the journal since the last snapshot
+        self.revision = 0  # Snapshot revision in contacts.json, bumped by every rewrite
+        self.journal_offset = 0  # Journal bytes already read or written by this program
+        self.file_state = None  # _file_state() after the last read or write, None before the first load
+
+    def lock(self):
+        return self.file_lock
+
+    def load(self): # Read the snapshot and replay the journal, returns (contacts, pinned)
+        with self.file_lock:
+            contacts, pinned = self._read_snapshot()
+            for record in self.read_journal():
+                self.apply_record(contacts, pinned, record)
+            self.file_state = self._file_state()
+        return contacts, pinned
+
+    def _read_snapshot(self): # Whole contacts.json as (contacts, pinned), also sets self.revision
+        contacts = {}
+        pinned = set()
+        self.revision = 0
+        if os.path.exists(self.contacts_file):
+            try:
+                with open(self.contacts_file, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                raise ContactStorageError(f"Could not read '{self.contacts_file}': {e}")
+            # Handle both old format (dict) and new format (dict with contacts and pinned)
+            if isinstance(data, dict) and 'contacts' in data:
+                pinned = set(data.get('pinned', []))
+                contacts = data['contacts']
+                self.revision = data.get('revision', 0)
+            else:
+                # Old format, just contacts
+                contacts = data
+        return contacts, pinned
+
+    def iter_load(self, batch_size=2000): # Stream the snapshot in batches, then the journal records
+        with self.file_lock:
+            # Other programs wait for the whole load, so the journal matches the snapshot that was read
+            self.revision = 0
+            yield from self._iter_snapshot(batch_size)
+            records = self.read_journal()
+            self.file_state = self._file_state()
+        yield ('records', records)
+        yield ('progress', 1.0)
+
+    def _iter_snapshot(self, batch_size):
+        if os.path.exists(self.contacts_file):
+            total = max(1, os.path.getsize(self.contacts_file))
+            batch = {}
+            try:
+                with open(self.contacts_file, 'r') as f:
+                    reader = JsonStreamReader(f)
+                    for key in reader.object_keys():
+                        if key == 'contacts' and reader.peek() == '{':
+                            # New format, stream the contacts object entry by entry
+                            for name in reader.object_keys():
+                                batch[name] = reader.value()
+                                if len(batch) >= batch_size:
+                                    yield ('contacts', batch)
+                                    yield ('progress', min(1.0, reader.consumed / total))
+                                    batch = {}
+                        elif key == 'pinned' and reader.peek() == '[':
+                            yield ('pinned', set(reader.value()))
+                        elif key == 'revision' and reader.peek() != '{':
+                            self.revision = reader.value()
+                        else:
+                            # Old format, every top-level key is a contact
+                            batch[key] = reader.value()
+                            if len(batch) >= batch_size:
+                                yield ('contacts', batch)
+                                yield ('progress', min(1.0, reader.consumed / total))
+                                batch = {}
+            except (OSError, ValueError) as e:
+                raise ContactStorageError(f"Could not read '{self.contacts_file}': {e}")
+            if batch:
+                yield ('contacts', batch)
+
+    def read_journal(self, start=0): # Intact journal records from byte offset start on, also counted in self.records
+        records = []
+        good_end = 0
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, 'rb+') as f:
+                f.seek(start)
+                good_end = start
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError("incomplete record")
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # Torn last line from a crash mid-append, everything before it is intact.
+                        # Cut it off so new records don't end up behind it.
+                        f.truncate(good_end)
+                        break
+                    good_end += len(line)
+        self.journal_offset = good_end
+        self.records = (self.records if start else 0) + len(records)
+        return records
+
+    def _file_state(self): # Changes whenever a program saves: contacts.json's stat and the journal's size
+        try:
+            stat = os.stat(self.contacts_file)
+            snapshot = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except FileNotFoundError:
+            snapshot = None
+        try:
+            journal = os.path.getsize(self.journal_file)
+        except FileNotFoundError:
+            journal = 0
+        return snapshot, journal
+
+    REVISION_PATTERN = re.compile(r'\s*\{\s*"revision"\s*:\s*(\d+)')
+
+    def _read_revision(self): # 'revision' from the first bytes of contacts.json, 0 for older files without one
+        try:
+            with open(self.contacts_file, 'r') as f:
+                match = self.REVISION_PATTERN.match(f.read(64))
+        except FileNotFoundError:
+            return 0
+        return int(match.group(1)) if match else 0
+
+    def changed(self):
+        return self.file_state is not None and self._file_state() != self.file_state
+
+    def read_changes(self): # Only the journal tail is read, unless another program rewrote contacts.json
+        snapshot, journal = self._file_state()
+        if (self.file_state is None or snapshot != self.file_state[0] or journal < self.journal_offset
+                or self._read_revision() != self.revision):
+            return None
+        records = self.read_journal(self.journal_offset) if journal > self.journal_offset else []
+        self.file_state = self._file_state()
+        return records
+
+    @staticmethod
+    def apply_record(contacts, pinned, record): # Replay one journal record (safe to replay twice)
+        op = record['op']
+        name = record.get('name')
+        if op == 'put':
+            details = {'phone': record.get('phone', ''), 'email': record.get('email', '')}
+            if record.get('tags'):
+                details['tags'] = record['tags']
+            # Assigned once, LazyContacts turns the dict into a Contact that can't be changed afterwards
+            contacts[name] = details
+        elif op == 'delete':
+            contacts.pop(name, None)
+            pinned.discard(name)
+        elif op == 'rename':
+            if record['old'] in contacts:
+                contacts[record['new']] = contacts.pop(record['old'])
+            if record['old'] in pinned:
+                pinned.remove(record['old'])
+                pinned.add(record['new'])
+        elif op == 'pin':
+            pinned.add(name)
+        elif op == 'unpin':
+            pinned.discard(name)
+
+    def append(self, *records): # Append records to the journal with a single fsync
+        with self.file_lock:
+            if self.journal is None:
+                self.journal = open(self.journal_file, 'a', encoding='utf-8')
+            data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+            self.journal.write(data)
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+            self.records += len(records)
+            self.bytes_written += len(data.encode('utf-8'))
+            self.journal_offset = os.fstat(self.journal.fileno()).st_size
+            self.file_state = self._file_state()
+
+    def needs_compaction(self, incoming=0):
+        return self.records + incoming >= self.COMPACT_EVERY
+
+    def save_snapshot(self, contacts, pinned): # Crash-safe full rewrite, then empty the journal
+        with self.file_lock:
+            self._check_revision()
+            # The revision goes first so other programs can check it cheaply,
+            # pinned names next so a streaming load can show them before the rest of the book
+            data = {
+                'revision': self.revision + 1,
+                'pinned': list(pinned),
+                'contacts': contacts
+            }
+            temp_file = self.contacts_file + ".tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(data, f, indent=4, default=Contact.json_default)
+                f.flush()
+                os.fsync(f.fileno())
+                self.bytes_written += f.tell()
+            os.replace(temp_file, self.contacts_file)
+            self._fsync_dir()
+            self.revision += 1
+            self._reset_journal()
+
+    def _check_revision(self): # Before a rewrite, caller holds the file lock
+        if self.file_state is None:
+            # Nothing was loaded through this storage (switching backends), continue the numbering on disk
+            self.revision = self._read_revision()
+        elif self._read_revision() != self.revision:
+            # Optimistic check: the caller has to merge the other program's snapshot first (ContactStore does)
+            raise ContactStorageError(f"'{self.contacts_file}' was changed by another program, reload before saving")
+
+    def _reset_journal(self): # The snapshot now holds everything, replaying an old journal on top of it is harmless
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        with open(self.journal_file, 'w') as f:
+            os.fsync(f.fileno())
+        self.records = 0
+        self.journal_offset = 0
+        self.file_state = self._file_state()
+
+    def quarantine(self): # Move unreadable files aside so they are never overwritten
+        with self.file_lock:
+            suffix = time.strftime(".corrupt-%Y%m%d-%H%M%S")
+            moved = []
+            for path in (self.contacts_file, self.journal_file):
+                if os.path.exists(path):
+                    os.replace(path, path + suffix)
+                    moved.append(path + suffix)
+            # The book starts empty, just like the files on disk now
+            self.revision = 0
+            self.records = 0
+            self.journal_offset = 0
+            self.file_state = self._file_state()
+            return moved
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def _fsync_dir(self): # Make the rename durable (not supported on Windows)
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.contacts_file)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+## Penyimpanan kontak (JSON, detail dibaca saat dibutuhkan)
+class LazyJsonStorage(JsonJournalStorage): # Same files as JSON, but only names are loaded, details are memory-mapped
+    lazy_details = True
+
+    # Every snapshot also writes a details file (one contact per line, never modified afterwards) and contacts.index
+    # with the names and their line offsets. Details files get a new name each time, so a file that a running
+    # program still has mapped is never replaced (Windows can't), old ones are removed by later snapshots.
+    def __init__(self, contacts_file):
+        super().__init__(contacts_file)
+        self.base = os.path.splitext(contacts_file)[0]
+        self.index_file = self.base + ".index"
+
+    @staticmethod
+    def _map(path): # Read-only mapping of a details file
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b''
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def load(self): # Names from contacts.index plus the journal, returns (LazyContacts, pinned)
+        with self.file_lock:
+            contacts, pinned = self._load_index()
+            for record in self.read_journal():
+                self.apply_record(contacts, pinned, record)
+            self.file_state = self._file_state()
+        return contacts, pinned
+
+    def iter_load(self, batch_size=2000): # ('details', empty LazyContacts), then the names in ('offsets', dict) batches
+        with self.file_lock:
+            contacts, pinned = self._load_index()
+            offsets, contacts.offsets = contacts.offsets, {}
+            yield ('details', contacts)
+            yield ('pinned', pinned)
+            items = iter(offsets.items())
+            loaded = 0
+            while True:
+                batch = dict(islice(items, batch_size))
+                if not batch:
+                    break
+                loaded += len(batch)
+                yield ('offsets', batch)
+                yield ('progress', loaded / len(offsets))
+            records = self.read_journal()
+            self.file_state = self._file_state()
+        yield ('records', records)
+        yield ('progress', 1.0)
+
+    def _load_index(self): # Caller holds the file lock
+        if not os.path.exists(self.contacts_file):
+            self.revision = 0
+            return LazyContacts(), set()
+        loaded = self._read_index()
+        if loaded is None:
+            # Written by the JSON storage, another version or a crashed save: read it fully once and index it
+            contacts, pinned = self._read_snapshot()
+            details_file, offsets = self._write_details(contacts, pinned)
+            self._write_index(details_file, offsets, pinned)
+            loaded = LazyContacts(self._map(details_file), offsets), pinned
+        return loaded
+
+    def _read_index(self): # (LazyContacts, pinned) if contacts.index describes the current contacts.json, else None
+        try:
+            with open(self.index_file, 'r') as f:
+                index = json.load(f)
+            stat = os.stat(self.contacts_file)
+            if index['revision'] != self._read_revision() or index['snapshot'] != [stat.st_size, stat.st_mtime_ns]:
+                return None
+            data = self._map(os.path.join(os.path.dirname(self.index_file), index['details']))
+            offsets = dict(zip(index['names'], index['offsets']))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        self.revision = index['revision']
+        return LazyContacts(data, offsets), set(index['pinned'])
+
+    def _write_details(self, contacts, pinned, json_file=None): # New details file and index, optionally contacts.json too
+        revision = self.revision + (json_file is not None)
+        details_file = f"{self.base}.{revision}-{time.time_ns():x}.details"
+        offsets = {}
+        position = 0
+        with open(details_file, 'wb') as details:
+            if json_file is not None:
+                # Plain JSON with one contact per line, readable by the JSON storage and older versions
+                header = '{\n    "revision": %d,\n    "pinned": %s,\n    "contacts": {' % (revision, json.dumps(list(pinned)))
+                json_file.write(header.encode('ascii'))
+            separator = b'\n'
+            entries = contacts.entries() if isinstance(contacts, LazyContacts) else (
+                (name, LazyContacts.encode_entry(name, details)) for name, details in contacts.items()
+            )
+            for name, entry in entries:
+                details.write(entry + b'\n')
+                offsets[name] = position
+                position += len(entry) + 1
+                if json_file is not None:
+                    json_file.write(separator + b'        ' + entry)
+                    separator = b',\n'
+            details.flush()
+            os.fsync(details.fileno())
+            self.bytes_written += position
+            if json_file is not None:
+                json_file.write(b'\n    }\n}\n')
+        return details_file, offsets
+
+    def _write_index(self, details_file, offsets, pinned): # contacts.index for the contacts.json now on disk
+        stat = os.stat(self.contacts_file)
+        index = {
+            'revision': self.revision,
+            'snapshot': [stat.st_size, stat.st_mtime_ns],
+            'details': os.path.basename(details_file),
+            'pinned': list(pinned),
+            'names': list(offsets),
+            'offsets': list(offsets.values())
+        }
+        temp_file = self.index_file + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+            self.bytes_written += f.tell()
+        os.replace(temp_file, self.index_file)
+        # Files still mapped by a program can't be removed on Windows, a later snapshot tries again
+        for path in glob.glob(glob.escape(self.base) + ".*.details"):
+            if path != details_file:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def save_snapshot(self, contacts, pinned): # contacts.json and a new details file, written from the same lines
+        with self.file_lock:
+            self._check_revision()
+            temp_file = self.contacts_file + ".tmp"
+            with open(temp_file, 'wb') as f:
+                details_file, offsets = self._write_details(contacts, pinned, f)
+                f.flush()
+                os.fsync(f.fileno())
+                self.bytes_written += f.tell()
+            os.replace(temp_file, self.contacts_file)
+            self._fsync_dir()
+            self.revision += 1
+            self._write_index(details_file, offsets, pinned)
+            self._reset_journal()
+            self.snapshot = LazyContacts(self._map(details_file), offsets)
+
+## Penyimpanan kontak (biner)
+class BinaryStorage(JsonJournalStorage): # contacts.bin: compact binary snapshot, same journal and lock as JSON
+    MAGIC = b'CBKB'
+    VERSION = 2  # Version 1 had no tags (3 string numbers per contact), it is still read
+    # magic, version, flags, revision, contacts, pinned contacts, strings, bytes of string text
+    HEADER = struct.Struct('<4sHHQIIII')
+    UINT32 = 'I' if array('I').itemsize == 4 else 'L'
+
+    # Layout after the header: the length of every string (in characters, uint32), the strings as one UTF-8 text
+    # separated by NUL characters, then name/phone/email/tags string numbers (4 x uint32) per contact and a CRC-32
+    # of everything before it. The tags of a contact are one string, joined by newlines.
+    # Contacts are stored in display order with the pinned ones first, so the order is rebuilt without sorting.
+    def __init__(self, contacts_file):
+        super().__init__(os.path.splitext(contacts_file)[0] + ".bin")
+        self.json_file = contacts_file
+
+    def _read_snapshot(self): # Whole contacts.bin as (contacts, pinned), also sets self.revision
+        if not os.path.exists(self.contacts_file) and os.path.exists(self.json_file):
+            return self._convert_json()
+        self.revision = 0
+        if not os.path.exists(self.contacts_file):
+            return {}, set()
+        try:
+            with open(self.contacts_file, 'rb') as f:
+                data = f.read()
+            contacts, pinned, self.revision = self.decode(data)
+        except (OSError, ValueError, struct.error) as e:
+            raise ContactStorageError(f"Could not read '{self.contacts_file}': {e}")
+        return contacts, pinned
+
+    def _convert_json(self): # First use: contacts.json becomes contacts.bin, the journal stays valid for both
+        json_storage = JsonJournalStorage(self.json_file)
+        contacts, pinned = json_storage._read_snapshot()
+        self.revision = json_storage.revision
+        self._write(contacts, pinned, self.revision)
+        return contacts, pinned
+
+    def iter_load(self, batch_size=2000): # Pinned contacts first, then the rest in display order
+        with self.file_lock:
+            contacts, pinned = self._read_snapshot()
+            yield ('pinned', pinned)
+            names = list(contacts)
+            for start in range(0, len(names), batch_size):
+                yield ('contacts', {name: contacts[name] for name in names[start:start + batch_size]})
+                yield ('progress', min(1.0, (start + batch_size) / len(names)))
+            records = self.read_journal()
+            self.file_state = self._file_state()
+        yield ('records', records)
+        yield ('progress', 1.0)
+
+    @classmethod
+    def decode(cls, data): # (contacts in display order, pinned, revision), ValueError if data isn't a valid snapshot
+        if len(data) < cls.HEADER.size + 4:
+            raise ValueError("file is too short")
+        view = memoryview(data)
+        if zlib.crc32(view[:-4]) != struct.unpack_from('<I', data, len(data) - 4)[0]:
+            raise ValueError("checksum mismatch, the file is damaged")
+        magic, version, _, revision, count, pinned_count, string_count, text_size = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError("not a contact book file")
+        if version > cls.VERSION:
+            raise ValueError(f"written by a newer version of the app (format {version})")
+
+        position = cls.HEADER.size
+        lengths = cls._uint32s(view[position:position + 4 * string_count])
+        position += 4 * string_count
+        text = str(view[position:position + text_size], 'utf-8')
+        position += text_size
+        fields = 3 if version == 1 else 4
+        numbers = cls._uint32s(view[position:position + 4 * fields * count])
+        if position + 4 * fields * count + 4 != len(data) or len(lengths) != string_count or len(numbers) != fields * count:
+            raise ValueError("unexpected file size")
+
+        # Every string is decoded once, contacts sharing a value (e.g. an empty email) share the string
+        strings = text.split('\0')
+        if len(strings) != string_count:
+            # A string contains NUL itself, cut the text by the lengths instead
+            strings = [text[end - length - 1:end - 1] for end, length in zip(accumulate(n + 1 for n in lengths), lengths)]
+        string = strings.__getitem__
+        try:
+            if fields == 3:
+                contacts = dict(zip(
+                    map(string, numbers[0::3]), map(Contact, map(string, numbers[1::3]), map(string, numbers[2::3]))
+                ))
+            else:
+                # Tag strings are few (most contacts share the empty one), split each of them once
+                tag_tuples = {number: tuple(strings[number].split('\n')) if number else () for number in set(numbers[3::4])}
+                contacts = dict(zip(map(string, numbers[0::4]), map(
+                    Contact, map(string, numbers[1::4]), map(string, numbers[2::4]), map(tag_tuples.__getitem__, numbers[3::4])
+                )))
+        except (IndexError, KeyError):
+            raise ValueError("string number out of range")
+        return contacts, set(islice(contacts, pinned_count)), revision
+
+    @classmethod
+    def _uint32s(cls, data): # Little-endian uint32 array
+        numbers = array(cls.UINT32)
+        numbers.frombytes(data)
+        if sys.byteorder == 'big':
+            numbers.byteswap()
+        return numbers
+
+    @classmethod
+    def encode(cls, contacts, pinned, revision): # Bytes of a snapshot, contacts is {name: Contact or dict}
+        key = SortedNameList.sort_key
+        order = sorted((name for name in contacts if name in pinned), key=key)
+        pinned_count = len(order)
+        order += sorted((name for name in contacts if name not in pinned), key=key)
+
+        numbers = {'': 0}  # String -> its number in the table
+        fields = array(cls.UINT32)
+        for name in order:
+            details = contacts[name]
+            for value in (name, details.get('phone', ''), details.get('email', ''), '\n'.join(details.get('tags') or ())):
+                number = numbers.get(value)
+                if number is None:
+                    number = numbers[value] = len(numbers)
+                fields.append(number)
+        lengths = array(cls.UINT32, map(len, numbers))
+        text = '\0'.join(numbers).encode('utf-8')
+        if sys.byteorder == 'big':
+            lengths.byteswap()
+            fields.byteswap()
+
+        header = cls.HEADER.pack(cls.MAGIC, cls.VERSION, 0, revision, len(order), pinned_count, len(numbers), len(text))
+        data = b''.join((header, lengths.tobytes(), text, fields.tobytes()))
+        return data + struct.pack('<I', zlib.crc32(data))
+
+    def _write(self, contacts, pinned, revision): # Crash-safe replace of contacts.bin, caller holds the file lock
+        data = self.encode(contacts, pinned, revision)
+        temp_file = self.contacts_file + ".tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.contacts_file)
+        self._fsync_dir()
+        self.bytes_written += len(data)
+
+    def _read_revision(self): # Revision from the header of contacts.bin, 0 if there is none yet
+        try:
+            with open(self.contacts_file, 'rb') as f:
+                header = f.read(self.HEADER.size)
+        except FileNotFoundError:
+            return 0
+        if len(header) < self.HEADER.size or header[:4] != self.MAGIC:
+            return 0
+        return self.HEADER.unpack(header)[3]
+
+    def save_snapshot(self, contacts, pinned): # Crash-safe full rewrite, then empty the journal
+        with self.file_lock:
+            self._check_revision()
+            self._write(contacts, pinned, self.revision + 1)
+            self.revision += 1
+            self._reset_journal()
+
+    def quarantine(self): # Also moves contacts.json aside if it was the file that couldn't be converted
+        with self.file_lock:
+            moved = []
+            if not os.path.exists(self.contacts_file) and os.path.exists(self.json_file):
+                path = self.json_file + time.strftime(".corrupt-%Y%m%d-%H%M%S")
+                os.replace(self.json_file, path)
+                moved.append(path)
+            return moved + super().quarantine()
+
+## Penyimpanan kontak (SQLite)
+class SqliteStorage(ContactStorage): # contacts.db with indexed columns and an FTS5 table for searching
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            phone TEXT NOT NULL DEFAULT '',
+            email TEXT NOT NULL DEFAULT '',
+            pinned INTEGER NOT NULL DEFAULT 0,
+            tags TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS contacts_name_nocase ON contacts (name COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS contacts_phone ON contacts (phone);
+        CREATE INDEX IF NOT EXISTS contacts_email ON contacts (email);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5(
+            name, phone, email, content='contacts', content_rowid='id', tokenize='trigram'
+        );
+        CREATE TRIGGER IF NOT EXISTS contacts_fts_insert AFTER INSERT ON contacts BEGIN
+            INSERT INTO contacts_fts (rowid, name, phone, email) VALUES (new.id, new.name, new.phone, new.email);
+        END;
+        CREATE TRIGGER IF NOT EXISTS contacts_fts_delete AFTER DELETE ON contacts BEGIN
+            INSERT INTO contacts_fts (contacts_fts, rowid, name, phone, email)
+            VALUES ('delete', old.id, old.name, old.phone, old.email);
+        END;
+        CREATE TRIGGER IF NOT EXISTS contacts_fts_update AFTER UPDATE OF name, phone, email ON contacts BEGIN
+            INSERT INTO contacts_fts (contacts_fts, rowid, name, phone, email)
+            VALUES ('delete', old.id, old.name, old.phone, old.email);
+            INSERT INTO contacts_fts (rowid, name, phone, email) VALUES (new.id, new.name, new.phone, new.email);
+        END;
+    """
+
+    def __init__(self, contacts_file):
+        self.contacts_file = contacts_file  # Only read once, to migrate an existing JSON book
+        self.db_file = os.path.splitext(contacts_file)[0] + ".db"
+        self.db = None
+        self.has_fts = False
+        self.readers = {}  # Read connections for the search worker, by thread id, all closed with the book
+        self.readers_lock = threading.Lock()
+        self.data_version = None  # PRAGMA data_version after the last read, changes when another program commits
+        # SQLite locks single statements itself, this keeps a merge and the following write together
+        self.file_lock = FileLock(os.path.splitext(contacts_file)[0] + ".lock")
+
+    def _connect(self):
+        if self.db is not None:
+            return
+        # The streaming loader may open the database on its worker thread, later use is on the Tk thread only
+        self.db = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.executescript(self.SCHEMA)
+        if 'tags' not in {column[1] for column in self.db.execute("PRAGMA table_info(contacts)")}:
+            # Database from before tags, tags are newline-separated like in the binary storage
+            self.db.execute("ALTER TABLE contacts ADD COLUMN tags TEXT NOT NULL DEFAULT ''")
+        try:
+            self.db.executescript(self.FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite without FTS5 or the trigram tokenizer (older than 3.34), search falls back to the app index
+            self.has_fts = False
+
+    def load(self):
+        try:
+            self._connect()
+            migrated = self.db.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone()
+            if migrated is None:
+                self._migrate_json()
+            contacts = {}
+            pinned = set()
+            for name, phone, email, is_pinned, tags in self.db.execute("SELECT name, phone, email, pinned, tags FROM contacts"):
+                contacts[name] = self._details(phone, email, tags)
+                if is_pinned:
+                    pinned.add(name)
+            self.data_version = self._data_version()
+        except sqlite3.DatabaseError as e:
+            raise ContactStorageError(f"Could not read '{self.db_file}': {e}")
+        return contacts, pinned
+
+    def iter_load(self, batch_size=2000): # Pinned contacts first, then the rest in display order
+        try:
+            self._connect()
+            if self.db.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone() is None:
+                self._migrate_json()
+            total = max(1, self.db.execute("SELECT COUNT(*) FROM contacts").fetchone()[0])
+            self.data_version = self._data_version()
+            yield ('pinned', {name for (name,) in self.db.execute("SELECT name FROM contacts WHERE pinned")})
+            cursor = self.db.execute(
+                "SELECT name, phone, email, tags FROM contacts ORDER BY pinned DESC, name COLLATE NOCASE"
+            )
+            loaded = 0
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                loaded += len(rows)
+                yield ('contacts', {name: self._details(phone, email, tags) for name, phone, email, tags in rows})
+                yield ('progress', loaded / total)
+        except sqlite3.DatabaseError as e:
+            raise ContactStorageError(f"Could not read '{self.db_file}': {e}")
+        yield ('progress', 1.0)
+
+    @staticmethod
+    def _details(phone, email, tags): # Contact dict of a row
+        details = {'phone': phone, 'email': email}
+        if tags:
+            details['tags'] = tags.split('\n')
+        return details
+
+    def _migrate_json(self): # Import contacts.json (any format the JSON backend reads) on first use
+        contacts, pinned = {}, set()
+        if os.path.exists(self.contacts_file):
+            contacts, pinned = JsonJournalStorage(self.contacts_file).load()
+        with self.db:
+            self._replace_all(contacts, pinned)
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', ?)", (self.contacts_file,))
+
+    def _replace_all(self, contacts, pinned):
+        self.db.execute("DELETE FROM contacts")
+        rows = [(name, details.get('phone', ''), details.get('email', ''), '\n'.join(details.get('tags') or ()))
+                for name, details in contacts.items()]
+        self.db.executemany(
+            "INSERT INTO contacts (name, phone, email, tags, pinned) VALUES (?, ?, ?, ?, ?)",
+            (row + (int(row[0] in pinned),) for row in rows)
+        )
+        self.bytes_written += sum(self._row_bytes(*row) for row in rows)
+
+    @staticmethod
+    def _row_bytes(*values): # Row data handed to SQLite, page and WAL overhead is not counted
+        return sum(len(value.encode('utf-8')) for value in values if value)
+
+    def append(self, *records): # Only the rows touched by the records are written, in one transaction
+        self._connect()
+        with self.db:
+            for record in records:
+                op = record['op']
+                name = record.get('name')
+                if op == 'put':
+                    row = (name, record.get('phone', ''), record.get('email', ''), '\n'.join(record.get('tags') or ()))
+                    self.db.execute(
+                        "INSERT INTO contacts (name, phone, email, tags) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT (name) DO UPDATE SET phone = excluded.phone, email = excluded.email, tags = excluded.tags",
+                        row
+                    )
+                    self.bytes_written += self._row_bytes(*row)
+                elif op == 'delete':
+                    self.db.execute("DELETE FROM contacts WHERE name = ?", (name,))
+                elif op == 'rename':
+                    self.db.execute("UPDATE contacts SET name = ? WHERE name = ?", (record['new'], record['old']))
+                    self.bytes_written += self._row_bytes(record['new'])
+                elif op in ('pin', 'unpin'):
+                    self.db.execute("UPDATE contacts SET pinned = ? WHERE name = ?", (int(op == 'pin'), name))
+
+    def save_snapshot(self, contacts, pinned):
+        self._connect()
+        with self.db:
+            self._replace_all(contacts, pinned)
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', ?)", (self.contacts_file,))
+
+    def _data_version(self):
+        return self.db.execute("PRAGMA data_version").fetchone()[0]
+
+    def lock(self):
+        return self.file_lock
+
+    def changed(self):
+        return self.db is not None and self.data_version is not None and self._data_version() != self.data_version
+
+    def read_changes(self): # The database doesn't keep a change log, so any outside commit means comparing the book
+        if self.db is None or self.data_version is None or self._data_version() != self.data_version:
+            return None
+        return []
+
+    def search(self, term): # Substring search through the trigram FTS index (needs at least 3 characters)
+        if not self.has_fts or len(term) < 3:
+            return None
+        with self.readers_lock:
+            reader = self.readers.get(threading.get_ident())
+            if reader is None:
+                # close() runs on another thread, left open the -wal and -shm files outlive the app
+                reader = self.readers[threading.get_ident()] = sqlite3.connect(self.db_file, check_same_thread=False)
+        query = '"' + term.replace('"', '""') + '"'
+        rows = reader.execute(
+            "SELECT contacts.name FROM contacts_fts JOIN contacts ON contacts.id = contacts_fts.rowid "
+            "WHERE contacts_fts MATCH ?",
+            (query,)
+        )
+        return [name for (name,) in rows]
+
+    def quarantine(self):
+        self.close()
+        suffix = time.strftime(".corrupt-%Y%m%d-%H%M%S")
+        moved = []
+        for path in (self.db_file, self.db_file + "-wal", self.db_file + "-shm"):
+            if os.path.exists(path):
+                os.replace(path, path + suffix)
+                moved.append(path + suffix)
+        return moved
+
+    def close(self):
+        with self.readers_lock:
+            readers, self.readers = list(self.readers.values()), {}
+        for reader in readers:
+            reader.close()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+            self.data_version = None
+
+## Penyimpanan lewat server sinkronisasi lokal (klien)
+DEFAULT_SERVER_ADDRESS = "127.0.0.1:8765"  # "host:port" or "unix:/path/to/socket"
+
+def parse_server_address(address): # ('unix', path) or ('tcp', (host, port)), ValueError if it isn't an address
+    if address.startswith("unix:"):
+        return 'unix', address[len("unix:"):]
+    host, separator, port = address.rpartition(':')
+    if not separator or not port.isdigit():
+        raise ValueError(f"expected host:port or unix:/path, got '{address}'")
+    return 'tcp', (host.strip('[]') or "127.0.0.1", int(port))
+
+def encode_message(message): # One JSON line, the framing used by the server and its clients in both directions
+    return json.dumps(message, ensure_ascii=False, separators=(',', ':'), default=Contact.json_default).encode('utf-8') + b'\n'
+
+def contact_records(name, details, pinned): # Records that set one contact to a state pushed by the server (details None: deleted)
+    if details is None:
+        return [{'op': 'delete', 'name': name}]
+    return [put_record(name, details.get('phone', ''), details.get('email', ''), details.get('tags')),
+            {'op': 'pin' if pinned else 'unpin', 'name': name}]
+
+class ContactClient: # Blocking connection to a contact server, one request at a time, pushed changes are queued in events
+    TIMEOUT = 30  # Seconds to wait for a reply before the server is considered gone
+
+    def __init__(self, address=DEFAULT_SERVER_ADDRESS):
+        self.address = address
+        try:
+            family, target = parse_server_address(address)
+            if family == 'unix':
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.connect(target)
+            else:
+                self.sock = socket.create_connection(target, timeout=self.TIMEOUT)
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # Requests are small, don't wait to fill a packet
+                self.sock.settimeout(None)
+        except (OSError, ValueError, AttributeError) as e:
+            raise ContactStorageError(f"Could not connect to the contact server at {address}: {e}") from e
+        self.call_lock = threading.Lock()
+        self.replies = queue.Queue()
+        self.events = queue.Queue()  # {'event': 'changes', ...} messages pushed by the server
+        self.request_id = 0
+        self.bytes_sent = 0
+        self.closed = False
+        self.reader = threading.Thread(target=self._read, name="contact-client", daemon=True)
+        self.reader.start()
+
+    def call(self, method, **params): # Send a request and wait for its result, ContactError if the server refused it
+        with self.call_lock:
+            if self.closed:
+                raise ContactStorageError(f"The connection to the contact server at {self.address} was closed")
+            self.request_id += 1
+            data = encode_message({'id': self.request_id, 'method': method, 'params': params})
+            try:
+                self.sock.sendall(data)
+                self.bytes_sent += len(data)
+                reply = self.replies.get(timeout=self.TIMEOUT)
+                while reply is not None and reply.get('id') != self.request_id:
+                    reply = self.replies.get(timeout=self.TIMEOUT)  # Late reply to a request that timed out
+            except (OSError, queue.Empty) as e:
+                raise ContactStorageError(f"The contact server at {self.address} did not answer") from e
+        if reply is None:
+            raise ContactStorageError(f"The connection to the contact server at {self.address} was closed")
+        if 'error' in reply:
+            raise ContactError(reply['error'])
+        return reply.get('result')
+
+    def _read(self): # Reader thread: replies go to the waiting call, pushed events to the queue
+        try:
+            with self.sock.makefile('rb') as lines:
+                for line in lines:
+                    message = json.loads(line)
+                    if 'event' in message:
+                        self.events.put(message)
+                    else:
+                        self.replies.put(message)
+        except (OSError, ValueError):
+            pass
+        self.closed = True
+        self.replies.put(None)
+
+    def close(self):
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+class ServerStorage(ContactStorage): # The book is kept by a contact server process, other clients' changes are pushed here
+    def __init__(self, address=DEFAULT_SERVER_ADDRESS):
+        self.address = address
+        self.client = None
+        self.own = {}  # Revision -> names of a change sent from here that hasn't come back as an event yet
+
+    def _connect(self):
+        if self.client is None:
+            self.client = ContactClient(self.address)
+        return self.client
+
+    @property
+    def bytes_written(self):
+        return self.client.bytes_sent if self.client is not None else 0
+
+    def load(self): # Also subscribes to the changes the server applies from now on
+        book = self._connect().call('load')
+        return book['contacts'], set(book['pinned'])
+
+    def append(self, *records): # The server saves them together with other clients' changes and pushes them to everyone
+        revision = self._connect().call('commit', records=list(records))['revision']
+        if revision is not None:
+            self.own[revision] = {name for record in records for name in record_names(record)}
+
+    def save_snapshot(self, contacts, pinned): # The server compares the books and commits only what differs
+        contacts = {name: details for name, details in contacts.items()}
+        result = self._connect().call('replace', contacts=contacts, pinned=sorted(pinned))
+        if result['revision'] is not None:
+            self.own[result['revision']] = set(result['names'])
+
+    def changed(self):
+        return self.client is not None and not self.client.events.empty()
+
+    def read_changes(self): # Records that set every contact a pushed change touched to its state on the server
+        records = []
+        while self.client is not None:
+            try:
+                message = self.client.events.get_nowait()
+            except queue.Empty:
+                break
+            for revision, contacts in message.get('changes', ()):
+                self.own.pop(revision, None)
+                # Changes sent from here that haven't come back were applied after this one on the server,
+                # the contacts they touch are set when they do (our own changes come back too, in server order)
+                newer = set().union(*self.own.values())
+                for name, details, pinned in contacts:
+                    if name not in newer:
+                        records.extend(contact_records(name, details, pinned))
+        return records
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+STORAGE_BACKENDS = {
+    "JSON": JsonJournalStorage,
+    "Lazy JSON": LazyJsonStorage,
+    "Binary": BinaryStorage,
+    "SQLite": SqliteStorage
+}
+
+## Import/Export kontak (CSV dan vCard)
+CSV_FIELDS = ('name', 'phone', 'email')
+CSV_HEADER_ALIASES = {
+    'name': ('name', 'full name', 'fn', 'nama', 'display name'),
+    'phone': ('phone', 'phone number', 'telephone', 'tel', 'mobile', 'telepon', 'no hp'),
+    'email': ('email', 'e-mail', 'email address', 'e-mail address', 'mail')
+}
+DUPLICATE_POLICIES = ("skip", "overwrite", "rename")
+
+def is_vcard_file(path):
+    return os.path.splitext(path)[1].lower() in ('.vcf', '.vcard')
+
+def read_contacts_csv(path): # Yield (name, phone, email) rows, with or without a header row
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        first_row = next(reader, None)
+        if first_row is None:
+            return
+
+        columns = {}
+        for i, title in enumerate(first_row):
+            title = title.strip().lower()
+            for field, aliases in CSV_HEADER_ALIASES.items():
+                if title in aliases and field not in columns:
+                    columns[field] = i
+
+        if 'name' in columns:
+            rows = reader
+        else:
+            # No header, the columns are name, phone, email
+            columns = {'name': 0, 'phone': 1, 'email': 2}
+            rows = chain([first_row], reader)
+
+        for row in rows:
+            yield tuple(
+                row[columns[field]].strip() if field in columns and columns[field] < len(row) else ''
+                for field in CSV_FIELDS
+            )
+
+def write_contacts_csv(path, rows): # rows are (name, phone, email)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+        writer.writerows(rows)
+
+def _vcard_unescape(value):
+    return re.sub(r'\\(.)', lambda m: '\n' if m.group(1) in 'nN' else m.group(1), value)
+
+def _vcard_escape(value):
+    return value.replace('\\', '\\\\').replace(',', '\\,').replace(';', '\\;').replace('\n', '\\n')
+
+def read_contacts_vcard(path): # Yield (name, phone, email) for every card, using the first TEL and EMAIL
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        card = None
+        line = ''
+        for raw in chain(f, ['']):
+            raw = raw.rstrip('\r\n')
+            if raw[:1] in (' ', '\t'):
+                line += raw[1:]  # Folded continuation of the previous line
+                continue
+
+            if line:
+                prop, _, value = line.partition(':')
+                prop = prop.split(';')[0].rsplit('.', 1)[-1].upper()
+                if prop == 'BEGIN' and value.strip().upper() == 'VCARD':
+                    card = {}
+                elif prop == 'END' and card is not None:
+                    name = card.get('FN', '')
+                    if not name and card.get('N'):
+                        # N is Family;Given;Middle;Prefix;Suffix
+                        parts = re.split(r'(?<!\\);', card['N'])
+                        name = ' '.join(_vcard_unescape(p).strip() for p in parts[1:3] + parts[:1] if p.strip())
+                        card['FN'] = name
+                    yield (card.get('FN', '').strip(), card.get('TEL', '').strip(), card.get('EMAIL', '').strip())
+                    card = None
+                elif card is not None and prop in ('FN', 'TEL', 'EMAIL') and prop not in card:
+                    card[prop] = _vcard_unescape(value)
+                elif card is not None and prop == 'N' and 'N' not in card:
+                    card['N'] = value
+            line = raw
+
+def write_contacts_vcard(path, rows): # rows are (name, phone, email), written as vCard 3.0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for name, phone, email in rows:
+            lines = ['BEGIN:VCARD', 'VERSION:3.0', f'FN:{_vcard_escape(name)}', f'N:;{_vcard_escape(name)};;;']
+            if phone:
+                lines.append(f'TEL:{_vcard_escape(phone)}')
+            if email:
+                lines.append(f'EMAIL:{_vcard_escape(email)}')
+            lines.append('END:VCARD')
+            f.write('\r\n'.join(lines) + '\r\n')
+
+def is_json_file(path):
+    return os.path.splitext(path)[1].lower() == '.json'
+
+def read_contacts_json(path): # Yield (name, phone, email) from a file in the contacts.json format (old or new)
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        data = json.load(f)
+    if isinstance(data, dict) and isinstance(data.get('contacts'), dict):
+        data = data['contacts']
+    if not isinstance(data, dict):
+        raise ValueError("expected an object of contacts")
+    for name, details in data.items():
+        if not isinstance(details, dict):
+            details = {}
+        yield (name.strip(), str(details.get('phone', '')).strip(), str(details.get('email', '')).strip())
+
+def write_contacts_json(path, rows): # rows are (name, phone, email), the file can be used as contacts.json
+    contacts = {name: {'phone': phone, 'email': email} for name, phone, email in rows}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'contacts': contacts}, f, indent=4)
+
+def read_contacts_file(path):
+    if is_json_file(path):
+        return read_contacts_json(path)
+    return read_contacts_vcard(path) if is_vcard_file(path) else read_contacts_csv(path)
+
+def write_contacts_file(path, rows):
+    if is_json_file(path):
+        write_contacts_json(path, rows)
+    elif is_vcard_file(path):
+        write_contacts_vcard(path, rows)
+    else:
+        write_contacts_csv(path, rows)
+
+def plan_import(rows, contacts, on_duplicate="skip"): # Validate rows and turn them into 'put' records
+    report = {'added': 0, 'updated': 0, 'renamed': 0, 'skipped': 0, 'invalid': 0}
+    records = []
+    imported = set()  # Names added by this import, duplicates inside the file follow the same policy
+    for name, phone, email in rows:
+        if validate_contact(name, phone, email):
+            report['invalid'] += 1
+            continue
+
+        if name in contacts or name in imported:
+            if on_duplicate == "skip":
+                report['skipped'] += 1
+                continue
+            if on_duplicate == "rename":
+                number = 2
+                while f"{name} ({number})" in contacts or f"{name} ({number})" in imported:
+                    number += 1
+                name = f"{name} ({number})"
+                report['renamed'] += 1
+            else:
+                report['updated'] += 1
+        else:
+            report['added'] += 1
+
+        imported.add(name)
+        # Overwriting keeps the tags, the files have none
+        records.append(put_record(name, phone, email, contacts[name].tags if name in contacts else ()))
+    return records, report
+
+def format_import_report(report):
+    return (f"Added: {report['added']}\nUpdated: {report['updated']}\nRenamed: {report['renamed']}\n"
+            f"Skipped (duplicate): {report['skipped']}\nSkipped (invalid): {report['invalid']}")
+
+## Index pencarian kontak
+class ContactSearchIndex: # Trigram index over name, phone and email
+    CANCEL_CHECK_EVERY = 8192  # Candidates scanned between checks for a newer search term
+
+    def __init__(self, lock=None):
+        self.lock = lock or threading.RLock()  # Held while searching on the worker thread and while updating
+        self.sort_results = list  # Orders a fresh result, extended terms keep the previous order
+        self.haystacks = {}  # Contact name -> lowercased "name\0phone\0email"
+        self.trigrams = {}  # Trigram -> set of contact names containing it
+        self.last_term = ''
+        self.last_result = None  # Result of the previous query, narrowed when the term is extended
+
+    def _trigrams(self, text): # All 3-character substrings that don't cross a field boundary
+        return {text[i:i + 3] for i in range(len(text) - 2) if '\0' not in text[i:i + 3]}
+
+    def build(self, contacts): # Build the index from scratch
+        with self.lock:
+            self.haystacks = {}
+            self.trigrams = {}
+            for name, details in contacts.items():
+                self.add(name, details)
+            self.reset_cache()
+
+    def take_over(self, other): # Use the contents of an index built elsewhere (see ContactStore.build_book)
+        with self.lock:
+            self.haystacks, self.trigrams = other.haystacks, other.trigrams
+            self.reset_cache()
+
+    def add(self, name, details): # Index a single contact
+        with self.lock:
+            haystack = '\0'.join((
+                name.lower(),
+                details.get('phone', '').lower(),
+                details.get('email', '').lower()
+            ))
+            self.haystacks[name] = haystack
+            for gram in self._trigrams(haystack):
+                self.trigrams.setdefault(gram, set()).add(name)
+            self.reset_cache()
+
+    def remove(self, name): # Remove a single contact from the index
+        with self.lock:
+            haystack = self.haystacks.pop(name, None)
+            if haystack is None:
+                return
+            for gram in self._trigrams(haystack):
+                names = self.trigrams.get(gram)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del self.trigrams[gram]
+            self.reset_cache()
+
+    def reset_cache(self): # Forget the previous query (called after every mutation)
+        with self.lock:
+            self.last_term = ''
+            self.last_result = None
+
+    def search(self, term, cancelled=None): # Return names whose name, phone or email contains term
+        with self.lock:
+            term = term.lower()
+            if not term:
+                self.reset_cache()
+                return None
+
+            narrowed = self.last_result is not None and self.last_term in term
+            if narrowed:
+                # Term was extended, so the new matches are a subset of the previous ones
+                candidates = self.last_result
+            elif len(term) >= 3:
+                postings = sorted((self.trigrams.get(gram, ()) for gram in self._trigrams(term)), key=len)
+                candidates = set(postings[0])
+                for names in postings[1:]:
+                    if not candidates:
+                        break
+                    candidates &= names
+            else:
+                # Too short for a trigram lookup, scan the cached lowercase strings instead
+                candidates = self.haystacks
+
+            haystacks = self.haystacks
+            if cancelled is None:
+                result = [name for name in candidates if term in haystacks[name]]
+            else:
+                # Scan in chunks so a search for an outdated term can stop early
+                candidates = list(candidates)
+                result = []
+                for start in range(0, len(candidates), self.CANCEL_CHECK_EVERY):
+                    if cancelled():
+                        raise SearchCancelled()
+                    chunk = candidates[start:start + self.CANCEL_CHECK_EVERY]
+                    result.extend(name for name in chunk if term in haystacks[name])
+            if not narrowed:
+                result = self.sort_results(result)
+            self.last_term = term
+            self.last_result = result
+            return result
+
+## Daftar nama yang selalu terurut
+class SortedNameList: # Names sorted by casefolded name, stored in small blocks so inserts and removes stay cheap
+    BLOCK_SIZE = 512
+
+    def __init__(self, names=()):
+        keys = sorted(self.sort_key(name) for name in names)
+        self.blocks = [keys[i:i + self.BLOCK_SIZE] for i in range(0, len(keys), self.BLOCK_SIZE)]
+        self.maxes = [block[-1] for block in self.blocks]  # Last key of every block, for bisecting
+        self.size = len(keys)
+
+    @staticmethod
+    def sort_key(name):
+        return (name.casefold(), name)
+
+    def add(self, name): # Insert a name at its sorted position
+        key = self.sort_key(name)
+        if not self.blocks:
+            self.blocks.append([key])
+            self.maxes.append(key)
+            self.size = 1
+            return
+
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            i -= 1
+        block = self.blocks[i]
+        insort(block, key)
+        self.maxes[i] = block[-1]
+        self.size += 1
+
+        # Split blocks that grew too big so a single insert never moves many items
+        if len(block) > 2 * self.BLOCK_SIZE:
+            self.blocks[i:i + 1] = [block[:self.BLOCK_SIZE], block[self.BLOCK_SIZE:]]
+            self.maxes[i:i + 1] = [block[self.BLOCK_SIZE - 1], block[-1]]
+
+    def remove(self, name): # Remove a name, returns False if it wasn't there
+        key = self.sort_key(name)
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            return False
+        block = self.blocks[i]
+        j = bisect_left(block, key)
+        if j == len(block) or block[j] != key:
+            return False
+
+        del block[j]
+        self.size -= 1
+        if block:
+            self.maxes[i] = block[-1]
+        else:
+            del self.blocks[i]
+            del self.maxes[i]
+        return True
+
+    def __contains__(self, name):
+        key = self.sort_key(name)
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            return False
+        block = self.blocks[i]
+        j = bisect_left(block, key)
+        return j < len(block) and block[j] == key
+
+    def index(self, name): # Position of a name, ValueError if it isn't there
+        key = self.sort_key(name)
+        i = bisect_left(self.maxes, key)
+        if i < len(self.maxes):
+            block = self.blocks[i]
+            j = bisect_left(block, key)
+            if j < len(block) and block[j] == key:
+                return sum(len(block) for block in self.blocks[:i]) + j
+        raise ValueError(f"'{name}' is not in the list")
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for block in self.blocks:
+            for key in block:
+                yield key[1]
+
+    def __getitem__(self, index): # Positional access, supports integers and simple slices
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(self.size)
+            names = []
+            offset = 0
+            for block in self.blocks:
+                if offset >= stop:
+                    break
+                if offset + len(block) > start:
+                    names.extend(key[1] for key in block[max(0, start - offset):stop - offset])
+                offset += len(block)
+            return names
+
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("SortedNameList index out of range")
+        for block in self.blocks:
+            if index < len(block):
+                return block[index][1]
+            index -= len(block)
+
+## Urutan kontak (pinned di atas)
+class ContactOrder: # Display order: sorted pinned partition followed by sorted unpinned partition
+    def __init__(self, lock=None):
+        self.lock = lock or threading.RLock()
+        self.pinned = SortedNameList()
+        self.unpinned = SortedNameList()
+
+    def build(self, contacts, pinned_contacts): # Build both partitions from scratch
+        with self.lock:
+            self.pinned = SortedNameList(name for name in contacts if name in pinned_contacts)
+            self.unpinned = SortedNameList(name for name in contacts if name not in pinned_contacts)
+
+    def take_over(self, other): # Use the partitions of an order built elsewhere
+        with self.lock:
+            self.pinned, self.unpinned = other.pinned, other.unpinned
+
+    def add(self, name, pinned=False):
+        with self.lock:
+            if pinned:
+                self.pinned.add(name)
+            else:
+                self.unpinned.add(name)
+
+    def remove(self, name):
+        with self.lock:
+            if not self.pinned.remove(name):
+                self.unpinned.remove(name)
+
+    def pin(self, name):
+        with self.lock:
+            if self.unpinned.remove(name):
+                self.pinned.add(name)
+
+    def unpin(self, name):
+        with self.lock:
+            if self.pinned.remove(name):
+                self.unpinned.add(name)
+
+    def ordered(self, names): # Put a subset of names in display order
+        with self.lock:
+            key = SortedNameList.sort_key
+            pinned_names = set(self.pinned)  # At most MAX_PINNED, cheaper than a bisect per name
+            pinned = [name for name in names if name in pinned_names]
+            if not pinned:
+                return sorted(names, key=key)
+            pinned_set = set(pinned)
+            return sorted(pinned, key=key) + sorted((name for name in names if name not in pinned_set), key=key)
+
+    def index(self, name): # Position in the display order, ValueError if the name isn't there
+        with self.lock:
+            if name in self.pinned:
+                return self.pinned.index(name)
+            return len(self.pinned) + self.unpinned.index(name)
+
+    def __contains__(self, name):
+        with self.lock:
+            return name in self.pinned or name in self.unpinned
+
+    def __len__(self):
+        return len(self.pinned) + len(self.unpinned)
+
+    def __iter__(self):
+        yield from self.pinned
+        yield from self.unpinned
+
+    def __getitem__(self, index): # Positional access across both partitions
+        pinned_count = len(self.pinned)
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(len(self))
+            names = self.pinned[start:stop] if start < pinned_count else []
+            if stop > pinned_count:
+                names += self.unpinned[max(0, start - pinned_count):stop - pinned_count]
+            return names
+
+        if index < 0:
+            index += len(self)
+        if index < pinned_count:
+            return self.pinned[index]
+        return self.unpinned[index - pinned_count]
+
+## Nomor telepon
+DEFAULT_COUNTRY_CODE = "62"  # Numbers written with a leading 0 are Indonesian, 'country_code' in the settings overrides it
+PHONE_QUERY_PATTERN = re.compile(r'^\+?[\d\s().\-/]+$')  # Search terms that look like (part of) a phone number
+PHONE_QUERY_MIN_DIGITS = 3
+
+def normalize_phone(phone, country_code=DEFAULT_COUNTRY_CODE): # E.164-style digits without '+', '' if there are none
+    digits = re.sub(r'\D', '', phone)
+    if not digits:
+        return ''
+    if phone.lstrip().startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]  # International prefix
+    elif digits.startswith('0'):
+        digits = country_code + digits[1:]  # National trunk prefix
+    if digits.startswith(country_code + '0'):
+        # "+62 0812..." keeps the trunk 0 by mistake
+        digits = country_code + digits[len(country_code) + 1:]
+    return digits
+
+def is_phone_query(term):
+    return bool(PHONE_QUERY_PATTERN.match(term)) and sum(c.isdigit() for c in term) >= PHONE_QUERY_MIN_DIGITS
+
+def phone_matches(phone, term, country_code=DEFAULT_COUNTRY_CODE): # Whether PhoneIndex.search(term) finds this number
+    number = normalize_phone(phone, country_code)
+    if not number or not is_phone_query(term):
+        return False
+    digits = re.sub(r'\D', '', term)
+    prefixes = [normalize_phone(term, country_code)]
+    if not term.lstrip().startswith(('+', '0')):
+        prefixes.append(country_code + digits)
+    return number.endswith(digits) or any(prefix and number.startswith(prefix) for prefix in prefixes)
+
+class SortedKeyList(SortedNameList): # (key, name) pairs in key order, iterates names
+    @staticmethod
+    def sort_key(item):
+        return item
+
+    def starting_with(self, prefix): # (key, name) pairs whose key starts with prefix, found by bisecting
+        low = (prefix, '')
+        i = bisect_left(self.maxes, low)
+        for block in self.blocks[i:]:
+            for key in block[bisect_left(block, low):]:
+                if not key[0].startswith(prefix):
+                    return
+                yield key
+
+class PhoneIndex: # Normalized numbers sorted forward and reversed, for exact, prefix and last-digits lookups
+    def __init__(self, lock=None, country_code=DEFAULT_COUNTRY_CODE):
+        self.lock = lock or threading.RLock()
+        self.country_code = country_code
+        self.forward = SortedKeyList()  # (normalized digits, name)
+        self.backward = SortedKeyList()  # (normalized digits reversed, name)
+
+    def build(self, contacts):
+        with self.lock:
+            numbers = [(normalize_phone(details.get('phone', ''), self.country_code), name) for name, details in contacts.items()]
+            numbers = [(digits, name) for digits, name in numbers if digits]
+            self.forward = SortedKeyList(numbers)
+            self.backward = SortedKeyList((digits[::-1], name) for digits, name in numbers)
+
+    def add(self, name, phone):
+        digits = normalize_phone(phone, self.country_code)
+        if digits:
+            with self.lock:
+                self.forward.add((digits, name))
+                self.backward.add((digits[::-1], name))
+
+    def remove(self, name, phone): # phone is the number the contact was added with
+        digits = normalize_phone(phone, self.country_code)
+        if digits:
+            with self.lock:
+                self.forward.remove((digits, name))
+                self.backward.remove((digits[::-1], name))
+
+    def exact(self, phone): # Contacts with this number, however it is formatted
+        digits = normalize_phone(phone, self.country_code)
+        if not digits:
+            return []
+        with self.lock:
+            return [name for number, name in self.forward.starting_with(digits) if number == digits]
+
+    def prefix(self, phone): # Contacts whose number starts with phone ("0812" finds "+62 812-...")
+        digits = normalize_phone(phone, self.country_code)
+        if not digits:
+            return []
+        with self.lock:
+            return [name for number, name in self.forward.starting_with(digits)]
+
+    def suffix(self, phone): # Contacts whose number ends with the same digits (caller ID style)
+        digits = re.sub(r'\D', '', phone)
+        if not digits:
+            return []
+        with self.lock:
+            return [name for number, name in self.backward.starting_with(digits[::-1])]
+
+    def search(self, term): # Prefix and last-digits matches for a search bar term, empty if it isn't a number
+        if not is_phone_query(term):
+            return set()
+        names = set(self.prefix(term)) | set(self.suffix(term))
+        if not term.lstrip().startswith(('+', '0')):
+            # "812 345" is most likely a national number typed without the trunk 0
+            names.update(self.prefix('+' + self.country_code + re.sub(r'\D', '', term)))
+        return names
+
+## Pencarian fuzzy (toleran salah ketik)
+def edit_distance(a, b, max_distance): # Optimal string alignment distance, max_distance + 1 once it is exceeded
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)  # Swapped neighbours count as one typo
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+class FuzzyNameIndex: # SymSpell-style deletion index over the words of names and email user names
+    PREFIX_LENGTH = 7  # Only this many leading characters of a word get deletion variants (keeps the index small)
+    PREFIX_MATCH_MIN = 3  # Shorter query words only match whole words
+    PREFIX_COST = 0.5  # "sito" while typing "sitorus" ranks between an exact word and a typo
+    PINNED_BOOST = 0.5  # Pinned contacts rank above unpinned ones with the same match quality
+    WORD_PATTERN = re.compile(r'[^\W\d_]+')
+
+    def __init__(self, lock=None):
+        self.lock = lock or threading.RLock()
+        self.postings = {}  # Word -> set of contact names using it
+        self.vocabulary = []  # Sorted words, for prefix matches while typing
+        self.deletes = {}  # Word prefix with up to 2 characters deleted -> words
+        self.sorted_postings = {}  # Word -> postings in display order, filled by searches
+
+    @classmethod
+    def words_of(cls, name, email): # Lowercase words of the name and of the part of the email before '@'
+        words = cls.WORD_PATTERN.findall(name.casefold())
+        words += cls.WORD_PATTERN.findall(email.split('@', 1)[0].casefold())
+        return {word for word in words if len(word) > 1}
+
+    @staticmethod
+    def max_distance(word): # One typo for short words, two for longer ones
+        return 1 if len(word) <= 4 else 2
+
+    @staticmethod
+    def deletion_variants(word, distance): # word with up to `distance` characters deleted, word included
+        variants = {word}
+        edge = {word}
+        for _ in range(distance):
+            edge = {w[:i] + w[i + 1:] for w in edge for i in range(len(w))} - variants
+            variants |= edge
+        return variants
+
+    def build(self, contacts):
+        with self.lock:
+            self.postings = {}
+            for name, details in contacts.items():
+                for word in self.words_of(name, details.get('email', '')):
+                    names = self.postings.get(word)
+                    if names is None:
+                        names = self.postings[word] = set()
+                    names.add(name)
+            self.vocabulary = sorted(self.postings)
+            self.sorted_postings = {}
+            self.deletes = {}
+            for word in self.vocabulary:
+                for variant in self.deletion_variants(word[:self.PREFIX_LENGTH], 2):
+                    self.deletes.setdefault(variant, set()).add(word)
+
+    def add(self, name, email):
+        with self.lock:
+            for word in self.words_of(name, email):
+                names = self.postings.get(word)
+                if names is None:
+                    names = self.postings[word] = set()
+                    insort(self.vocabulary, word)
+                    for variant in self.deletion_variants(word[:self.PREFIX_LENGTH], 2):
+                        self.deletes.setdefault(variant, set()).add(word)
+                names.add(name)
+                self.sorted_postings.pop(word, None)
+
+    def remove(self, name, email): # email is the address the contact was added with
+        with self.lock:
+            for word in self.words_of(name, email):
+                names = self.postings.get(word)
+                if names is None:
+                    continue
+                names.discard(name)
+                self.sorted_postings.pop(word, None)
+                if names:
+                    continue
+                del self.postings[word]
+                del self.vocabulary[bisect_left(self.vocabulary, word)]
+                for variant in self.deletion_variants(word[:self.PREFIX_LENGTH], 2):
+                    words = self.deletes.get(variant)
+                    if words is not None:
+                        words.discard(word)
+                        if not words:
+                            del self.deletes[variant]
+
+    def _word_tiers(self, query): # Cost -> (names, words): names whose best word for query has that cost (disjoint)
+        limit = self.max_distance(query)
+        candidates = set()
+        for variant in self.deletion_variants(query[:self.PREFIX_LENGTH], limit):
+            candidates |= self.deletes.get(variant, set())
+        matches = {}  # Cost -> words
+        for word in candidates:
+            distance = edit_distance(query, word, limit)
+            if distance <= limit:
+                matches.setdefault(distance, []).append(word)
+        if len(query) >= self.PREFIX_MATCH_MIN:
+            for i in range(bisect_left(self.vocabulary, query), len(self.vocabulary)):
+                word = self.vocabulary[i]
+                if not word.startswith(query):
+                    break
+                if word != query:
+                    matches.setdefault(self.PREFIX_COST, []).append(word)
+
+        tiers = {}
+        seen = set()
+        for cost in sorted(matches):
+            # Set operations only, a common word can have tens of thousands of contacts
+            names = set().union(*(self.postings[word] for word in matches[cost])) - seen
+            if names:
+                tiers[cost] = (names, matches[cost])
+                seen |= names
+        return tiers
+
+    def _sorted_postings(self, word): # Contacts using word in display order, cached until the word changes
+        names = self.sorted_postings.get(word)
+        if names is None:
+            names = self.sorted_postings[word] = sorted(self.postings[word], key=SortedNameList.sort_key)
+        return names
+
+    def search(self, term, pinned=(), limit=200, cancelled=None): # Best matches first, every query word has to match
+        with self.lock:
+            tiers = None
+            for query in self.WORD_PATTERN.findall(term.casefold()):
+                if cancelled is not None and cancelled():
+                    raise SearchCancelled()
+                word_tiers = self._word_tiers(query)
+                if tiers is None:
+                    tiers = word_tiers
+                else:
+                    # A contact's score is the sum of its costs for every query word
+                    combined = {}
+                    for cost, (names, _) in tiers.items():
+                        for word_cost, (word_names, _) in word_tiers.items():
+                            both = names & word_names
+                            if both:
+                                combined.setdefault(cost + word_cost, (set(), None))[0].update(both)
+                    tiers = combined
+                if not tiers:
+                    return []
+            if tiers is None:
+                return []
+
+            for name in pinned:
+                for score, (names, _) in list(tiers.items()):
+                    if name in names:
+                        names.discard(name)
+                        tiers.setdefault(score - self.PINNED_BOOST, (set(), None))[0].add(name)
+                        break
+
+            result = []
+            for score in sorted(tiers):
+                names, words = tiers[score]
+                result.extend(self._first_names(names, words, limit - len(result)))
+                if len(result) >= limit:
+                    break
+            return result
+
+    def _first_names(self, names, words, count): # The first `count` of names in display order
+        if count <= 0:
+            return []
+        if words is None or len(names) <= count:
+            return sorted(names, key=SortedNameList.sort_key)[:count]
+        # Big group from known words: walk their sorted postings instead of sorting the whole group
+        if len(words) == 1:
+            ordered = self._sorted_postings(words[0])
+        else:
+            ordered = heapq.merge(*(self._sorted_postings(word) for word in words), key=SortedNameList.sort_key)
+        picked = []
+        for name in ordered:
+            if name in names:
+                names.discard(name)  # A contact can be listed under several of the words
+                picked.append(name)
+                if len(picked) == count:
+                    break
+        return picked
+
+## Kontak ganda (duplikat)
+IMPORT_COPY_SUFFIX = re.compile(r'\s*\(\d+\)$')  # " (2)" added when importing with on_duplicate="rename"
+DUPLICATE_PROGRESS_EVERY = 5000  # Contacts between two progress reports (and cancel checks) of a duplicate scan
+
+NAME_WORD_PATTERN = re.compile(r'\w+')
+
+def normalize_email(email): # Comparable form of an address, '' if there is none
+    return email.strip().casefold()
+
+def name_key(name): # Name without case, punctuation, word order or an import copy suffix ("Santoso, Budi (2)" is "budi santoso")
+    return ' '.join(sorted(NAME_WORD_PATTERN.findall(IMPORT_COPY_SUFFIX.sub('', name).casefold())))
+
+def contact_keys(name, phone, email, country_code=DEFAULT_COUNTRY_CODE): # Blocking keys, contacts sharing one may be the same person
+    keys = []
+    for field, key in (('name', name and name_key(name)), ('phone', phone and normalize_phone(phone, country_code)),
+                       ('email', email and normalize_email(email))):
+        if key:
+            keys.append((field, key))
+    return keys
+
+def find_duplicate_groups(contacts, country_code=DEFAULT_COUNTRY_CODE, progress=None, cancelled=None): # [(names, shared fields)]
+    # Contacts are only compared with the first contact seen with the same key, so the scan stays linear;
+    # the groups are the connected components (union-find), "A shares a phone with B, B a name with C" is one group
+    parent = {}
+    first = {}  # Key -> first contact that has it
+    links = []  # (field, name) for every contact that shares a key with an earlier one
+
+    def root(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    total = len(contacts) or 1
+    for count, (name, details) in enumerate(contacts.items(), 1):
+        parent[name] = name
+        for key in contact_keys(name, details.phone, details.email, country_code):
+            other = first.setdefault(key, name)
+            if other != name:
+                links.append((key[0], name))
+                parent[root(name)] = root(other)
+        if count % DUPLICATE_PROGRESS_EVERY == 0:
+            if cancelled is not None and cancelled():
+                raise SearchCancelled()
+            if progress is not None:
+                progress(count / total)
+
+    groups = {}
+    for field, name in links:
+        groups.setdefault(root(name), (set(), set()))[1].add(field)
+    for name in parent:
+        group = groups.get(root(name))
+        if group is not None:
+            group[0].add(name)
+    if progress is not None:
+        progress(1.0)
+    return list(groups.values())
+
+def merge_suggestion(names, fields, contacts, pinned): # What merging a group would keep: pins first, then complete and unsuffixed names
+    def rank(name):
+        details = contacts[name]
+        return (name not in pinned, bool(IMPORT_COPY_SUFFIX.search(name)),
+                -(bool(details.phone) + bool(details.email)), SortedNameList.sort_key(name))
+
+    names = sorted(names, key=rank)
+    keep = names[0]
+    # Empty fields of the kept contact are filled from the others, its own values win
+    phone = next((contacts[name].phone for name in names if contacts[name].phone), '')
+    email = next((contacts[name].email for name in names if contacts[name].email), '')
+    return {'keep': keep, 'others': names[1:], 'phone': phone, 'email': email,
+            'pinned': any(name in pinned for name in names), 'fields': sorted(fields)}
+
+class ContactKeyIndex: # Normalized phone number and email -> contact names, for the O(1) warning when adding
+    def __init__(self, country_code=DEFAULT_COUNTRY_CODE):
+        self.country_code = country_code
+        # Key -> name, or a set of names once several share it (most keys are unique, this keeps the build light)
+        self.phones = {}
+        self.emails = {}
+
+    def _keys(self, phone, email): # (field, table, normalized key) for the fields that are filled in
+        keys = []
+        digits = phone and normalize_phone(phone, self.country_code)
+        if digits:
+            keys.append(('phone', self.phones, digits))
+        address = email and normalize_email(email)
+        if address:
+            keys.append(('email', self.emails, address))
+        return keys
+
+    def build(self, contacts):
+        self.phones, self.emails = {}, {}
+        for name, details in contacts.items():
+            self.add(name, details)
+
+    def add(self, name, details):
+        for field, table, key in self._keys(details.phone, details.email):
+            names = table.setdefault(key, name)
+            if names == name:
+                continue
+            if isinstance(names, str):
+                table[key] = names = {names}
+            names.add(name)
+
+    def remove(self, name, details): # details are the ones the contact was added with
+        for field, table, key in self._keys(details.phone, details.email):
+            names = table.get(key)
+            if names == name:
+                del table[key]
+            elif isinstance(names, set):
+                names.discard(name)
+                if len(names) == 1:
+                    table[key] = names.pop()
+
+    def collisions(self, phone, email, exclude=None): # (field, name) of contacts using the same number or address
+        result = []
+        for field, table, key in self._keys(phone, email):
+            names = table.get(key, ())
+            for name in sorted([names] if isinstance(names, str) else names, key=SortedNameList.sort_key):
+                if name != exclude:
+                    result.append((field, name))
+        return result
+
+## Tag (grup kontak)
+class TagIndex: # Tag -> names of the contacts that have it, like the trigram postings
+    def __init__(self):
+        self.names = {}  # Tag -> set of names
+
+    def build(self, tagged): # tagged yields (name, tags)
+        self.names = {}
+        for name, tags in tagged:
+            self.add(name, tags)
+
+    def add(self, name, tags):
+        for tag in tags:
+            self.names.setdefault(tag, set()).add(name)
+
+    def remove(self, name, tags): # tags are the ones the contact was added with
+        for tag in tags:
+            names = self.names.get(tag)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self.names[tag]
+
+    def counts(self): # [(tag, number of contacts)] sorted by tag
+        return sorted(((tag, len(names)) for tag, names in self.names.items()), key=lambda item: item[0].casefold())
+
+    def filter(self, include=(), exclude=(), names=None): # "A AND B AND NOT C" over names (kept in order), a set if None
+        # The intersection starts from the smallest included tag, so its cost follows the result rather than the book
+        wanted = sorted((self.names.get(tag, set()) for tag in include), key=len)
+        unwanted = [self.names[tag] for tag in exclude if tag in self.names]
+        if not wanted:
+            unwanted = set().union(*unwanted)
+            return set() if names is None else [name for name in names if name not in unwanted]
+        if names is not None and len(names) < len(wanted[0]):
+            # A few search results are cheaper to check one by one than to intersect big tags
+            return [name for name in names
+                    if all(name in tagged for tagged in wanted) and not any(name in tagged for tagged in unwanted)]
+        allowed = wanted[0].intersection(*wanted[1:]).difference(*unwanted)
+        return allowed if names is None else [name for name in names if name in allowed]
+
+## Pengaturan
+def read_settings(settings_file): # Contents of contact_book_settings.json, {} if missing or unreadable
+    try:
+        with open(settings_file, 'r') as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return settings if isinstance(settings, dict) else {}
+
+class ContactError(ValueError): # A change was refused, the message is meant for the user
+    pass
+
+## Cache layar pertama
+FIRST_SCREEN_ROWS = 100  # Unpinned names cached for the first screen, more than a maximized window shows
+
+def book_signature(contacts_file): # Size and modification time of every file of the book, changes with any save
+    folder = os.path.dirname(contacts_file) or "."
+    signature = []
+    for file_name in sorted(os.listdir(folder)):
+        # The lock file is touched by every program that opens the book, without changing it
+        if file_name.startswith("contacts.") and not file_name.endswith(".lock"):
+            stat = os.stat(os.path.join(folder, file_name))
+            signature.append([file_name, stat.st_size, stat.st_mtime_ns])
+    return signature
+
+## Statistik performa
+class PerformanceStats: # Call counts, latency histograms and bytes written per hot path
+    BUCKET_LIMITS_MS = (1, 5, 10, 50, 100, 500, 1000)  # Upper bounds of the histogram buckets, the last bucket is open
+
+    def __init__(self):
+        self.lock = threading.Lock()  # Searches are recorded from the search worker thread
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.paths = {}  # Hot path name -> counters
+            self.since = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    def record(self, name, seconds, bytes_written=0): # Add one call of a hot path
+        elapsed_ms = seconds * 1000
+        with self.lock:
+            path = self.paths.get(name)
+            if path is None:
+                path = self.paths[name] = {
+                    'calls': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'bytes_written': 0,
+                    'histogram': [0] * (len(self.BUCKET_LIMITS_MS) + 1)
+                }
+            path['calls'] += 1
+            path['total_ms'] += elapsed_ms
+            path['max_ms'] = max(path['max_ms'], elapsed_ms)
+            path['bytes_written'] += bytes_written
+            path['histogram'][bisect_left(self.BUCKET_LIMITS_MS, elapsed_ms)] += 1
+
+    def snapshot(self): # Copy of all counters, safe to keep or dump as JSON
+        with self.lock:
+            paths = {
+                name: dict(path, histogram=list(path['histogram']), mean_ms=path['total_ms'] / path['calls'])
+                for name, path in self.paths.items()
+            }
+        return {'since': self.since, 'bucket_limits_ms': list(self.BUCKET_LIMITS_MS), 'paths': paths}
+
+    def export(self, path): # Write the counters to a JSON file
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=4)
+
+    def format_table(self): # Plain text report for the diagnostics window and the command line
+        snapshot = self.snapshot()
+        labels = [f"<{limit}ms" for limit in self.BUCKET_LIMITS_MS] + [f">={self.BUCKET_LIMITS_MS[-1]}ms"]
+        lines = [
+            f"Since {snapshot['since']}",
+            "",
+            f"{'Hot path':24}{'Calls':>8}{'Mean ms':>10}{'Max ms':>10}{'Bytes written':>15}"
+        ]
+        for name, path in sorted(snapshot['paths'].items()):
+            lines.append(
+                f"{name:24}{path['calls']:>8}{path['mean_ms']:>10.2f}{path['max_ms']:>10.2f}{path['bytes_written']:>15}"
+            )
+            buckets = [f"{label}: {count}" for label, count in zip(labels, path['histogram']) if count]
+            lines.append("    " + "  ".join(buckets))
+        if not snapshot['paths']:
+            lines.append("(nothing recorded yet)")
+        return "\n".join(lines)
+
+## Simpan di background
+class SaveScheduler: # Writer thread: changes made within `delay` seconds of the first one are saved together
+    def __init__(self, flush, delay):
+        self.flush = flush
+        self.delay = delay
+        self.condition = threading.Condition()
+        self.due = None  # time.monotonic() of the next save, None while nothing is waiting
+        self.error = None  # Last failed save, the records stay pending until a later flush succeeds
+        self.thread = None
+        self.stopped = False
+
+    def schedule(self): # A change is pending, the window starts with the first one
+        with self.condition:
+            if self.due is None:
+                self.due = time.monotonic() + self.delay
+                self.condition.notify()
+            # A writer that died on an unexpected error is replaced, the changes would never be saved otherwise
+            if (self.thread is None or not self.thread.is_alive()) and not self.stopped:
+                self.thread = threading.Thread(target=self._run, name="contact-writer", daemon=True)
+                self.thread.start()
+
+    def stop(self): # Let the thread finish, the caller flushes what is left (a later schedule starts a new one)
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+        with self.condition:
+            self.thread = None
+            self.stopped = False
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.due is None and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                wait = self.due - time.monotonic()
+                if wait > 0:
+                    self.condition.wait(wait)
+                    continue
+                self.due = None
+            try:
+                self.flush()
+                self.error = None
+            except (OSError, sqlite3.Error, ContactStorageError) as e:
+                self.error = e  # ContactStorageError: the sync server went away
+
+## Riwayat undo/redo
+RECORD_FIELDS = {'put': ('name', 'phone', 'email', 'tags'), 'delete': ('name',), 'rename': ('old', 'new'),
+                 'pin': ('name',), 'unpin': ('name',)}
+
+def pack_record(record): # Change record as a tuple, ('put', name, phone, email) is much smaller than the dict
+    packed = (record['op'],) + tuple(record.get(field, '') for field in RECORD_FIELDS[record['op']][:3])
+    if record.get('tags'):
+        packed += (tuple(record['tags']),)  # Left out for untagged contacts, unpack_record then skips it
+    return packed
+
+def unpack_record(packed):
+    return dict(zip(RECORD_FIELDS[packed[0]], packed[1:]), op=packed[0])
+
+class ChangeHistory: # Undo and redo stacks of packed records, the oldest changes are dropped beyond a memory budget
+    RECORD_OVERHEAD = 120  # Rough bytes per packed record besides its strings (tuple and string headers)
+
+    def __init__(self, budget):
+        self.budget = budget  # Bytes for both stacks together
+        self.undo_stack = deque()  # (label, packed records, size), newest last
+        self.redo_stack = []
+        self.size = 0
+
+    @classmethod
+    def entry(cls, label, records): # Packed entry and its estimated size
+        packed = tuple(pack_record(record) for record in records)
+        size = sum(cls.RECORD_OVERHEAD + sum(len(value) if isinstance(value, str) else sum(map(len, value))
+                                             for value in record[1:]) for record in packed)
+        return label, packed, size
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack = []
+        self.size = 0
+
+    def push(self, stack, label, records): # Add the records that revert a change to 'undo' or 'redo'
+        entry = self.entry(label, records)
+        if entry[2] > self.budget:
+            # Bigger than the whole budget (a huge import), older changes can't be undone in order past it
+            self.clear()
+            return
+        (self.undo_stack if stack == 'undo' else self.redo_stack).append(entry)
+        self.size += entry[2]
+        while self.size > self.budget and self.undo_stack:
+            self.size -= self.undo_stack.popleft()[2]
+        while self.size > self.budget:
+            self.size -= self.redo_stack.pop(0)[2]
+
+    def drop_redo(self):
+        self.size -= sum(entry[2] for entry in self.redo_stack)
+        self.redo_stack = []
+
+    def pop(self, stack): # (label, records) of the newest entry of 'undo' or 'redo', None if it is empty
+        entries = self.undo_stack if stack == 'undo' else self.redo_stack
+        if not entries:
+            return None
+        label, packed, size = entries.pop()
+        self.size -= size
+        return label, [unpack_record(record) for record in packed]
+
+    def label(self, stack): # Label of the change undo or redo would revert, None if there is none
+        entries = self.undo_stack if stack == 'undo' else self.redo_stack
+        return entries[-1][0] if entries else None
+
+## Inti buku kontak
+class ContactStore: # Contacts, pins, search index, display order and storage, without any GUI
+    MAX_PINNED = 5
+    UNDO_MEMORY_KB = 1024  # Default memory budget of the undo/redo history
+
+    def __init__(self, data_dir=None, storage_backend=None, save_delay=0, server=None):
+        data_dir = data_dir or get_app_dir()
+        self.contacts_file = os.path.join(data_dir, "contacts.json")
+        self.settings_file = os.path.join(data_dir, "contact_book_settings.json")
+        if server:
+            # A contact server owns the files, this store is one of its clients
+            self.storage_backend = "Server"
+            self.storage = ServerStorage(server)
+        else:
+            if storage_backend is None:
+                storage_backend = read_settings(self.settings_file).get('storage', "JSON")
+            if storage_backend not in STORAGE_BACKENDS:
+                storage_backend = "JSON"
+            self.storage_backend = storage_backend
+            self.storage = STORAGE_BACKENDS[storage_backend](self.contacts_file)
+
+        self.contacts = {}  # Contact name -> Contact
+        self.pinned = set()  # Pinned contact names
+        self.lock = threading.RLock()  # Shared by the index and order, a search thread may read both
+        self.search_index = ContactSearchIndex(self.lock)
+        self.order = ContactOrder(self.lock)  # Sorted display order, kept up to date on every change
+        self.search_index.sort_results = self.order.ordered
+        self.country_code = str(read_settings(self.settings_file).get('country_code', DEFAULT_COUNTRY_CODE))
+        # Normalized numbers, merged into phone-like searches (built on first use when details stay on disk)
+        self.phone_index = PhoneIndex(self.lock, self.country_code)
+        self.fuzzy_index = None  # FuzzyNameIndex, built by the first fuzzy search and then kept up to date
+        self.key_index = None  # ContactKeyIndex, built by the first duplicate check and then kept up to date
+        self.tag_index = None  # TagIndex, built by the first tag filter and then kept up to date
+        self.stats = PerformanceStats()  # Hot path timings, shown in the GUI diagnostics window
+
+        # Write-behind: with a save_delay (seconds), changes made within that window are saved together
+        # by a writer thread, otherwise every commit is saved before it returns
+        self.pending = []  # Records applied in memory but not yet saved, guarded by self.lock
+        self.write_lock = threading.Lock()  # One storage write at a time (writer thread or caller)
+        self.save_delay = save_delay
+        self.saver = SaveScheduler(self.flush, save_delay) if save_delay else None
+        self.external_changes = 0  # Records merged from other programs sharing the book, the GUI watches it grow
+        self.external_names = set()  # Names those records touched, taken by the GUI to patch its list
+        self.on_change = None  # Called with the records of every applied change, under self.lock (the sync server pushes them)
+
+        # Undo/redo of this program's changes, bounded by 'undo_memory_kb' from the settings
+        undo_memory_kb = read_settings(self.settings_file).get('undo_memory_kb', self.UNDO_MEMORY_KB)
+        if not isinstance(undo_memory_kb, (int, float)) or undo_memory_kb < 0:
+            undo_memory_kb = self.UNDO_MEMORY_KB
+        self.history = ChangeHistory(undo_memory_kb * 1024)
+
+    ## Loading kontak
+    def load(self): # Read the whole book, raises ContactStorageError if it can't be read
+        start = time.perf_counter()
+        contacts, pinned = self.storage.load()
+        self.reset(contacts, pinned)
+        self.stats.record('load_contacts', time.perf_counter() - start)
+
+    def iter_load(self, batch_size=2000): # Stream the book, pass every item to apply_loaded
+        return self.storage.iter_load(batch_size)
+
+    def apply_loaded(self, kind, payload): # Apply one ('pinned'/'contacts'/'details'/'offsets'/'records'/'book', payload) item
+        if kind == 'book':
+            self.install_book(payload)
+        elif kind == 'details':
+            # Lazy storage: phone and email stay in its details file, the names follow in 'offsets' batches
+            payload.lock = self.lock
+            self.contacts = payload
+            self.phone_index = None
+            self.key_index = None
+            self.tag_index = None
+        elif kind == 'offsets':
+            with self.lock:
+                self.contacts.offsets.update(payload)
+                self.contacts.last_result = None
+                for name in payload:
+                    self.order.add(name, pinned=name in self.pinned)
+                    self.search_index.add(name, NO_DETAILS)
+        elif kind == 'pinned':
+            self.pinned |= payload
+            for name in payload:
+                self.order.pin(name)
+        elif kind == 'contacts':
+            for name, details in payload.items():
+                self.apply_record(put_record(name, details.get('phone', ''), details.get('email', ''), details.get('tags')))
+        elif kind == 'records':
+            for record in payload:
+                self.apply_record(record)
+
+    def recover(self): # Move an unreadable book aside and start empty, returns the moved files
+        moved = self.storage.quarantine()
+        self.reset({}, set())
+        self.history.clear()  # Its records were relative to the book that was moved aside
+        return moved
+
+    def reset(self, contacts, pinned): # Replace the whole in-memory book and rebuild the indexes
+        self.install_book(self.build_book(contacts, pinned))
+
+    def read_book(self): # Read the whole book for install_book, the loader thread does this while the window shows a cached page
+        return self.build_book(*self.storage.load())
+
+    def build_book(self, contacts, pinned): # Contacts, pins and indexes of a whole book, under a lock of their own
+        lock = threading.RLock()  # Searches and changes on the book in use don't wait for the build
+        if isinstance(contacts, LazyContacts):
+            contacts.lock = lock
+            indexed = dict.fromkeys(contacts, NO_DETAILS)
+            phone_index = None
+        else:
+            contacts = indexed = {
+                name: details if isinstance(details, Contact) else Contact.from_dict(details)
+                for name, details in contacts.items()
+            }
+            phone_index = PhoneIndex(lock, self.country_code)
+            phone_index.build(contacts)
+        pinned = set(pinned)
+        search_index = ContactSearchIndex(lock)
+        search_index.build(indexed)
+        order = ContactOrder(lock)
+        order.build(contacts, pinned)
+        return contacts, pinned, search_index, order, phone_index
+
+    def install_book(self, book): # Swap in a book from build_book, only references change hands
+        contacts, pinned, search_index, order, phone_index = book
+        with self.lock:
+            if isinstance(contacts, LazyContacts):
+                contacts.lock = self.lock
+            if phone_index is not None:
+                phone_index.lock = self.lock
+            self.contacts, self.pinned, self.phone_index = contacts, pinned, phone_index
+            # The GUI keeps the order (and the search index) it was given, so they stay the same objects
+            self.search_index.take_over(search_index)
+            self.order.take_over(order)
+            self.fuzzy_index = None
+            self.key_index = None
+            self.tag_index = None
+
+    @property
+    def details_in_memory(self): # False with the lazy storage, phone and email are then read from its details file
+        return not isinstance(self.contacts, LazyContacts)
+
+    def _indexed_details(self, name): # What the trigram index holds for a contact, only the name if details stay on disk
+        return self.contacts[name] if self.details_in_memory else NO_DETAILS
+
+    def _phones(self): # The phone index, built here on first use if details stay on disk
+        with self.lock:
+            if self.phone_index is None:
+                index = PhoneIndex(self.lock, self.country_code)
+                index.build(self.contacts)
+                self.phone_index = index
+            return self.phone_index
+
+    def _tags(self): # The tag index, built here on first use
+        with self.lock:
+            if self.tag_index is None:
+                index = TagIndex()
+                if self.details_in_memory:
+                    index.build((name, details.tags) for name, details in self.contacts.items() if details.tags)
+                else:
+                    index.build(self.contacts.tagged())
+                self.tag_index = index
+            return self.tag_index
+
+    ## Terapkan perubahan ke data di memori
+    def apply_record(self, record): # Apply one change record to the contacts, the search index and the order
+        op = record['op']
+        name = record.get('name')
+        if op == 'put':
+            if name in self.contacts:
+                self.search_index.remove(name)
+                if self.phone_index is not None:
+                    self.phone_index.remove(name, self.contacts[name].phone)
+                if self.fuzzy_index is not None:
+                    self.fuzzy_index.remove(name, self.contacts[name].email)
+                if self.key_index is not None:
+                    self.key_index.remove(name, self.contacts[name])
+                if self.tag_index is not None:
+                    self.tag_index.remove(name, self.contacts[name].tags)
+            else:
+                self.order.add(name, pinned=name in self.pinned)
+            self.contacts[name] = Contact(record.get('phone', ''), record.get('email', ''), tuple(record.get('tags') or ()))
+            self.search_index.add(name, self._indexed_details(name))
+            if self.phone_index is not None:
+                self.phone_index.add(name, self.contacts[name].phone)
+            if self.fuzzy_index is not None:
+                self.fuzzy_index.add(name, self.contacts[name].email)
+            if self.key_index is not None:
+                self.key_index.add(name, self.contacts[name])
+            if self.tag_index is not None:
+                self.tag_index.add(name, self.contacts[name].tags)
+        elif op == 'delete':
+            if name in self.contacts:
+                if self.phone_index is not None:
+                    self.phone_index.remove(name, self.contacts[name].phone)
+                if self.fuzzy_index is not None:
+                    self.fuzzy_index.remove(name, self.contacts[name].email)
+                if self.key_index is not None:
+                    self.key_index.remove(name, self.contacts[name])
+                if self.tag_index is not None:
+                    self.tag_index.remove(name, self.contacts[name].tags)
+                del self.contacts[name]
+                self.search_index.remove(name)
+                self.order.remove(name)
+            self.pinned.discard(name)
+        elif op == 'rename':
+            old_name, new_name = record['old'], record['new']
+            if old_name in self.contacts and new_name in self.contacts and new_name != old_name:
+                # Another program's contact took the name meanwhile (a shared book or server), it is replaced
+                self.apply_record({'op': 'delete', 'name': new_name})
+            if old_name in self.contacts:
+                self.contacts[new_name] = self.contacts.pop(old_name)
+                self.search_index.remove(old_name)
+                self.search_index.add(new_name, self._indexed_details(new_name))
+                if self.phone_index is not None:
+                    self.phone_index.remove(old_name, self.contacts[new_name].phone)
+                    self.phone_index.add(new_name, self.contacts[new_name].phone)
+                if self.fuzzy_index is not None:
+                    self.fuzzy_index.remove(old_name, self.contacts[new_name].email)
+                    self.fuzzy_index.add(new_name, self.contacts[new_name].email)
+                if self.key_index is not None:
+                    self.key_index.remove(old_name, self.contacts[new_name])
+                    self.key_index.add(new_name, self.contacts[new_name])
+                if self.tag_index is not None:
+                    self.tag_index.remove(old_name, self.contacts[new_name].tags)
+                    self.tag_index.add(new_name, self.contacts[new_name].tags)
+                self.order.remove(old_name)
+                self.order.add(new_name, pinned=old_name in self.pinned)
+            if old_name in self.pinned:
+                self.pinned.remove(old_name)
+                self.pinned.add(new_name)
+        elif op == 'pin':
+            self.pinned.add(name)
+            self.order.pin(name)
+            self.search_index.reset_cache()
+        elif op == 'unpin':
+            self.pinned.discard(name)
+            self.order.unpin(name)
+            self.search_index.reset_cache()
+
+    ## Simpan kontak
+    def save(self): # Write a full snapshot now (also compacts the JSON journal and covers pending changes)
+        with self.write_lock:
+            with self.storage.lock():
+                self._merge_external()
+                with self.lock:
+                    records, self.pending = self.pending, []
+                    contacts, pinned = self.contacts.copy(), set(self.pinned)
+                try:
+                    self._write_snapshot(contacts, pinned)
+                except Exception:
+                    self._restore_pending(records)
+                    raise
+
+    def _write_snapshot(self, contacts, pinned):
+        start = time.perf_counter()
+        written = self.storage.bytes_written
+        self.storage.save_snapshot(contacts, pinned)
+        if self.storage.snapshot is not None:
+            if not self.details_in_memory:
+                # Read details from the new file from now on, so the old one can be removed
+                self._remap_details(self.storage.snapshot)
+            self.storage.snapshot = None
+        self.stats.record('save_contacts', time.perf_counter() - start, self.storage.bytes_written - written)
+
+    def _remap_details(self, written): # Changes made while it was written are still pending and stay in memory
+        with self.lock:
+            touched = set()
+            for record in self.pending:
+                touched.update(record_names(record))
+            self.contacts.remap(written, touched)
+
+    def _restore_pending(self, records): # A failed write keeps its records for the next flush
+        with self.lock:
+            self.pending[:0] = records
+
+    def commit(self, *records, label="Change"): # Apply records in memory, they are persisted now or by the writer thread
+        with self.lock:
+            self.history.drop_redo()  # A new change ends the redo chain
+            self.history.push('undo', label, self._apply_records(records))
+        self._save_later()
+
+    def _apply_records(self, records): # Apply and queue records, returns the records that revert them
+        # Caller holds self.lock; every inverse is taken right before its record changes the book
+        undo = []
+        for record in records:
+            undo.append(self.inverse_records(record))
+            self.apply_record(record)
+        self.pending.extend(records)
+        if self.on_change is not None and records:
+            self.on_change(records)
+        return [inverse for group in reversed(undo) for inverse in group]
+
+    def _save_later(self):
+        if self.saver is None:
+            self.flush()
+        else:
+            self.saver.schedule()
+
+    def inverse_records(self, record): # Records that undo one record, given the book before it is applied
+        op = record['op']
+        name = record.get('name')
+        if op == 'put':
+            if name in self.contacts:
+                old = self.contacts[name]
+                return [put_record(name, old.phone, old.email, old.tags)]
+            return [{'op': 'delete', 'name': name}]
+        elif op == 'delete':
+            if name not in self.contacts:
+                return []
+            old = self.contacts[name]
+            undo = [put_record(name, old.phone, old.email, old.tags)]
+            if name in self.pinned:
+                undo.append({'op': 'pin', 'name': name})
+            return undo
+        elif op == 'rename':
+            if record['old'] not in self.contacts:
+                return []
+            undo = [{'op': 'rename', 'old': record['new'], 'new': record['old']}]
+            if record['new'] != record['old']:
+                # The contact it replaces comes back too
+                undo.extend(self.inverse_records({'op': 'delete', 'name': record['new']}))
+            return undo
+        elif op == 'pin':
+            return [] if name in self.pinned else [{'op': 'unpin', 'name': name}]
+        elif op == 'unpin':
+            return [{'op': 'pin', 'name': name}] if name in self.pinned else []
+        return []
+
+    ## Undo/redo
+    def undo(self): # Revert the newest change, returns (label, touched names) or None if there is nothing to undo
+        return self._revert('undo', 'redo')
+
+    def redo(self): # Apply the newest undone change again, same result as undo
+        return self._revert('redo', 'undo')
+
+    def _revert(self, source, target):
+        with self.lock:
+            entry = self.history.pop(source)
+            if entry is None:
+                return None
+            label, records = entry
+            self.history.push(target, label, self._apply_records(records))
+        self._save_later()
+        touched = set()
+        for record in records:
+            touched.update(record_names(record))
+        return label, touched
+
+    @property
+    def dirty(self): # True while changes are applied in memory but not yet saved
+        return bool(self.pending)
+
+    def flush(self): # Persist pending changes as one storage commit (called by the writer thread too)
+        with self.write_lock:
+            with self.lock:
+                if not self.pending:
+                    return
+            with self.storage.lock():
+                # Changes another program saved meanwhile go first, so the file never loses them
+                self._merge_external()
+                with self.lock:
+                    records, self.pending = self.pending, []
+                    compact = self.storage.needs_compaction(len(records))
+                    if compact:
+                        # Dict and set copies are taken while no change can be applied, the GUI keeps running meanwhile
+                        contacts, pinned = self.contacts.copy(), set(self.pinned)
+                try:
+                    if compact:
+                        # The journal would get too long, the snapshot already includes these records
+                        self._write_snapshot(contacts, pinned)
+                    else:
+                        start = time.perf_counter()
+                        written = self.storage.bytes_written
+                        self.storage.append(*records)
+                        self.stats.record('save_changes', time.perf_counter() - start, self.storage.bytes_written - written)
+                except Exception:
+                    self._restore_pending(records)
+                    raise
+
+    def close(self, compact=True): # Save pending changes, fold the journal into the snapshot and release files
+        if self.saver is not None:
+            self.saver.stop()
+        self.flush()
+        with self.write_lock:
+            if compact and self.storage.records:
+                with self.storage.lock():
+                    self._merge_external()
+                    self._write_snapshot(self.contacts, self.pinned)
+            self.storage.close()
+
+    def write_first_screen(self, path): # Cache the top of the display order for the next start, after close()
+        if isinstance(self.storage, ServerStorage):
+            return  # The book isn't on this computer, there is nothing to check the cache against
+        with self.lock:
+            first_screen = {
+                'storage': self.storage_backend,
+                'signature': book_signature(self.contacts_file),
+                'pinned': list(self.order.pinned),
+                'names': self.order.unpinned[:FIRST_SCREEN_ROWS],
+            }
+        temp_file = path + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(first_screen, f, ensure_ascii=False)
+        os.replace(temp_file, path)
+
+    def read_first_screen(self, path): # (pinned, names) from write_first_screen, None unless the book is unchanged since
+        if isinstance(self.storage, ServerStorage):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                first_screen = json.load(f)
+            if (first_screen['storage'] != self.storage_backend
+                    or first_screen['signature'] != book_signature(self.contacts_file)):
+                return None
+            return first_screen['pinned'], first_screen['names']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    ## Perubahan dari program lain (file bersama)
+    def sync(self): # Merge what other programs saved into memory, returns the records that were applied
+        with self.write_lock:
+            with self.storage.lock():
+                return self._merge_external()
+
+    def _merge_external(self): # Caller holds write_lock and the storage lock
+        records = self.storage.read_changes()
+        contacts = None
+        if records is None:
+            # Another program rewrote the whole book (compaction), compare it with the one in memory
+            contacts, pinned = self.storage.load()
+        with self.lock:
+            if records is None:
+                records = self.diff_records(contacts, pinned)
+            # Unsaved changes here are written after theirs, so they win for the contacts they touch
+            touched = set()
+            for record in self.pending:
+                touched.update(record_names(record))
+            records = [record for record in records if touched.isdisjoint(record_names(record))]
+            for record in records:
+                self.apply_record(record)
+                self.external_names.update(record_names(record))
+            self.external_changes += len(records)
+            if self.on_change is not None and records:
+                self.on_change(records)
+            if isinstance(contacts, LazyContacts) and not self.details_in_memory:
+                # The book in memory now matches the reloaded one, except for the unsaved changes
+                self.contacts.remap(contacts, touched)
+        return records
+
+    def diff_records(self, contacts, pinned): # Records that turn the book in memory into the given one
+        records = [{'op': 'delete', 'name': name} for name in self.contacts if name not in contacts]
+        for name, details in contacts.items():
+            phone, email, tags = details.get('phone', ''), details.get('email', ''), tuple(details.get('tags') or ())
+            current = self.contacts.get(name)
+            if current is None or current.phone != phone or current.email != email or current.tags != tags:
+                records.append(put_record(name, phone, email, tags))
+        records.extend({'op': 'unpin', 'name': name} for name in self.pinned - pinned if name in contacts)
+        records.extend({'op': 'pin', 'name': name} for name in pinned - self.pinned if name in contacts)
+        return records
+
+    def change_storage(self, backend): # Switch backend, copying the current book over
+        if isinstance(self.storage, ServerStorage):
+            raise ContactStorageError("The contact server decides how the book is stored")
+        new_storage = STORAGE_BACKENDS[backend](self.contacts_file)
+        with self.write_lock:
+            with self.lock:
+                records, self.pending = self.pending, []
+            try:
+                # The JSON storage writes a real dict, details on disk are read in for that
+                contacts = self.contacts if self.details_in_memory or new_storage.lazy_details else dict(self.contacts.items())
+                new_storage.save_snapshot(contacts, self.pinned)
+            except Exception:
+                new_storage.close()
+                self._restore_pending(records)
+                raise
+            self.storage.close()
+            self.storage = new_storage
+            self.storage_backend = backend
+            if new_storage.lazy_details == self.details_in_memory:
+                # Details move into memory or out to the new details file
+                new_storage.snapshot = None
+                self.reset(*new_storage.load())
+
+    ## Pencarian
+    def search(self, term, cancelled=None, fuzzy=False, include_tags=(), exclude_tags=()): # Names matching term in display order (ranked if fuzzy), None for an empty term
+        if include_tags or exclude_tags:
+            return self.filter_tags(term, include_tags, exclude_tags, cancelled, fuzzy)
+        if fuzzy:
+            return self.fuzzy_search(term, cancelled=cancelled)
+        start = time.perf_counter()
+        matches = self._search_storage(term)
+        if matches is not None:
+            matches = self.order.ordered(matches)
+        else:
+            matches = self.search_index.search(term, cancelled)
+        if matches is not None:
+            extra = set()
+            if not self.details_in_memory:
+                # The index only holds names, phone and email are searched in the details file
+                extra.update(self.contacts.search_details(term.lower(), cancelled))
+            if is_phone_query(term):
+                # "08123" also finds "+62 812-3...", and the last digits of a number find it too
+                extra.update(self._phones().search(term))
+            extra.difference_update(matches)
+            if extra:
+                matches = self.order.ordered(matches + list(extra))
+        self.stats.record('search_contacts', time.perf_counter() - start)
+        return matches
+
+    def _search_storage(self, term): # Backend index results, None while it is behind the changes in memory
+        if not self.write_lock.acquire(blocking=False):
+            return None  # A flush is writing, the backend only has part of it
+        try:
+            with self.lock:
+                if self.pending:
+                    return None
+            matches = self.storage.search(term)
+            with self.lock:
+                # A change made during the query isn't in the results
+                return None if self.pending else matches
+        finally:
+            self.write_lock.release()
+
+    TAG_SORT_LIMIT = 16  # Tag filter results above 1/16 of the book are taken from the display order instead of sorted
+
+    def filter_tags(self, term, include=(), exclude=(), cancelled=None, fuzzy=False): # "A AND NOT B AND text" in display order
+        start = time.perf_counter()
+        matches = self.search(term, cancelled, fuzzy) if term.strip() else None
+        with self.lock:
+            tags = self._tags()
+            if matches is not None:
+                result = tags.filter(include, exclude, matches)  # Keeps the search's order
+            elif include:
+                result = tags.filter(include, exclude)
+                if len(result) > len(self.order) // self.TAG_SORT_LIMIT:
+                    # Picking a big result out of the display order is cheaper than sorting it
+                    result = [name for name in self.order if name in result]
+                else:
+                    result = self.order.ordered(result)
+            else:
+                result = tags.filter((), exclude, self.order)
+        self.stats.record('filter_tags', time.perf_counter() - start)
+        return result
+
+    def tag_counts(self): # [(tag, number of contacts)] sorted by tag
+        with self.lock:
+            return self._tags().counts()
+
+    def matches(self, name, term, include_tags=(), exclude_tags=()): # Whether search(term) would list this contact, checked without searching the book
+        contact = self.contacts.get(name)
+        if contact is None:
+            return False
+        if include_tags or exclude_tags:
+            tags = set(contact.tags)
+            if not tags.issuperset(include_tags) or not tags.isdisjoint(exclude_tags):
+                return False
+            if not term.strip():
+                return True
+        term_lower = term.lower()
+        if term_lower in name.lower() or term_lower in contact.phone.lower() or term_lower in contact.email.lower():
+            return True
+        return phone_matches(contact.phone, term, self.country_code)
+
+    FUZZY_LIMIT = 200  # Ranked fuzzy results shown at most
+
+    def fuzzy_search(self, term, limit=FUZZY_LIMIT, cancelled=None): # Names and emails with up to 2 typos, best match first
+        if not term.strip():
+            return None
+        start = time.perf_counter()
+        with self.lock:
+            if self.fuzzy_index is None:
+                # Built on first use so a book that is never searched this way doesn't pay for it
+                index = FuzzyNameIndex(self.lock)
+                index.build(self.contacts)
+                self.fuzzy_index = index
+            matches = self.fuzzy_index.search(term, self.pinned, limit, cancelled)
+        self.stats.record('fuzzy_search', time.perf_counter() - start)
+        return matches
+
+    ## Cari nomor telepon
+    def find_phone(self, phone): # Contacts with exactly this number, in display order
+        return self.order.ordered(self._phones().exact(phone))
+
+    def find_phone_prefix(self, phone): # Contacts whose number starts with phone
+        return self.order.ordered(self._phones().prefix(phone))
+
+    def find_phone_suffix(self, digits): # Contacts whose number ends with these digits (caller ID)
+        return self.order.ordered(self._phones().suffix(digits))
+
+    ## Operasi kontak (validasi sama seperti di GUI)
+    def add(self, name, phone='', email='', tags=()): # tags is a list or a comma-separated string
+        name, phone, email = name.strip(), phone.strip(), email.strip()
+        error = validate_contact(name, phone, email)
+        if error:
+            raise ContactError(error)
+        if name in self.contacts:
+            raise ContactError(f"Contact '{name}' already exists!")
+        self.commit(put_record(name, phone, email, normalize_tags(tags)), label=f"Add '{name}'")
+        return name
+
+    def edit(self, old_name, new_name, phone, email, tags=None): # Update details, renaming keeps the pin (and the tags if None)
+        new_name, phone, email = new_name.strip(), phone.strip(), email.strip()
+        if old_name not in self.contacts:
+            raise ContactError(f"Contact '{old_name}' does not exist!")
+        error = validate_contact(new_name, phone, email)
+        if error:
+            raise ContactError(error)
+        # If name changed, check if new name already exists
+        if new_name != old_name and new_name in self.contacts:
+            raise ContactError(f"Contact '{new_name}' already exists!")
+
+        records = []
+        if new_name != old_name:
+            records.append({'op': 'rename', 'old': old_name, 'new': new_name})
+        tags = self.contacts[old_name].tags if tags is None else normalize_tags(tags)
+        records.append(put_record(new_name, phone, email, tags))
+        self.commit(*records, label=f"Edit '{new_name}'")
+        return new_name
+
+    def delete(self, name): # Also removes it from the pinned contacts
+        if name not in self.contacts:
+            raise ContactError(f"Contact '{name}' does not exist!")
+        self.commit({'op': 'delete', 'name': name}, label=f"Delete '{name}'")
+
+    def pin(self, name):
+        if name not in self.contacts:
+            raise ContactError(f"Contact '{name}' does not exist!")
+        if name in self.pinned:
+            return
+        # Check if limit reached
+        if len(self.pinned) >= self.MAX_PINNED:
+            raise ContactError(f"You can only pin up to {self.MAX_PINNED} contacts! Please unpin a contact first.")
+        self.commit({'op': 'pin', 'name': name}, label=f"Pin '{name}'")
+
+    def unpin(self, name):
+        if name in self.pinned:
+            self.commit({'op': 'unpin', 'name': name}, label=f"Unpin '{name}'")
+
+    def toggle_pin(self, name): # Returns True if the contact is pinned afterwards
+        if name in self.pinned:
+            self.unpin(name)
+            return False
+        self.pin(name)
+        return True
+
+    ## Kontak ganda
+    def build_key_index(self): # The phone/email key index, built here on first use (the GUI does it after loading)
+        with self.lock:
+            if self.key_index is None:
+                index = ContactKeyIndex(self.country_code)
+                index.build(self.contacts)
+                self.key_index = index
+            return self.key_index
+
+    def build_indexes(self): # Indexes otherwise built on first use, the GUI builds them in the background after loading
+        for name, build in (('key_index', self.build_key_index), ('tag_index', self._tags)):
+            start = time.perf_counter()
+            build()
+            self.stats.record(f'build_{name}', time.perf_counter() - start)
+
+    def collisions(self, phone='', email='', exclude=None): # (field, name) of contacts with the same normalized phone or email
+        with self.lock:
+            return self.build_key_index().collisions(phone, email, exclude)
+
+    def find_duplicates(self, progress=None, cancelled=None): # Merge suggestions for contacts that look like the same person
+        # Runs on a copy, so a background scan doesn't hold the lock while it goes through the book
+        with self.lock:
+            contacts, pinned = self.contacts.copy(), set(self.pinned)
+        start = time.perf_counter()
+        groups = find_duplicate_groups(contacts, self.country_code, progress, cancelled)
+        suggestions = [merge_suggestion(names, fields, contacts, pinned) for names, fields in groups]
+        suggestions.sort(key=lambda suggestion: (not suggestion['pinned'], SortedNameList.sort_key(suggestion['keep'])))
+        self.stats.record('find_duplicates', time.perf_counter() - start)
+        return suggestions
+
+    def merge_contacts(self, keep, others, phone=None, email=None): # Fold others into keep with one commit, returns keep
+        others = [name for name in others if name != keep]
+        for name in [keep] + others:
+            if name not in self.contacts:
+                raise ContactError(f"Contact '{name}' does not exist!")
+        # Unless given, empty fields of the kept contact are filled from the others
+        merged = [self.contacts[name] for name in [keep] + others]
+        phone = next((contact.phone for contact in merged if contact.phone), '') if phone is None else phone.strip()
+        email = next((contact.email for contact in merged if contact.email), '') if email is None else email.strip()
+        error = validate_contact(keep, phone, email)
+        if error:
+            raise ContactError(error)
+
+        records = [{'op': 'delete', 'name': name} for name in others]
+        records.append(put_record(keep, phone, email, normalize_tags(tag for contact in merged for tag in contact.tags)))
+        if keep not in self.pinned and any(name in self.pinned for name in others):
+            # The deletes free the pin slot it takes over, so the limit can't be exceeded
+            records.append({'op': 'pin', 'name': keep})
+        self.commit(*records, label=f"Merge into '{keep}'")
+        return keep
+
+    ## Import/Export
+    def import_file(self, path, on_duplicate="skip"): # One storage commit for the whole file, returns the report
+        records, report = plan_import(read_contacts_file(path), self.contacts, on_duplicate)
+        if records:
+            self.commit(*records, label=f"Import '{os.path.basename(path)}'")
+        return report
+
+    def export_file(self, path): # All contacts in display order, returns how many were written
+        write_contacts_file(path, ((name, self.contacts[name].phone, self.contacts[name].email)
+                                   for name in self.order))
+        return len(self.contacts)
+
+## Mode command line (tanpa GUI)
+def run_cli(argv): # Headless contact book commands, returns the process exit code
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="contact_book", description="Contact Book command line")
+    parser.add_argument("--data-dir", default=None, help="folder with contacts.json and settings")
+    parser.add_argument("--storage", choices=list(STORAGE_BACKENDS), default=None,
+                        help="storage backend (default: the one chosen in the app)")
+    parser.add_argument("--server", metavar="ADDRESS", default=None,
+                        help="use the book of a running contact server (host:port or unix:/path) instead of the files")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="list contacts, pinned first")
+    list_parser.add_argument("--pinned", action="store_true", help="only pinned contacts")
+
+    search_parser = commands.add_parser("search", help="search by name, phone or email")
+    search_parser.add_argument("term")
+    search_parser.add_argument("--fuzzy", action="store_true", help="tolerate typos, best matches first")
+
+    for tag_parser in (list_parser, search_parser):
+        tag_parser.add_argument("--tag", action="append", default=[], help="only contacts with this tag (repeatable)")
+        tag_parser.add_argument("--without", action="append", default=[], help="leave out contacts with this tag (repeatable)")
+    commands.add_parser("tags", help="list tags and how many contacts have each")
+
+    phone_parser = commands.add_parser("phone", help="look up a phone number in any format (caller ID)")
+    phone_parser.add_argument("number")
+    match_group = phone_parser.add_mutually_exclusive_group()
+    match_group.add_argument("--prefix", action="store_true", help="numbers starting with NUMBER")
+    match_group.add_argument("--suffix", action="store_true", help="numbers ending with the digits of NUMBER")
+
+    add_parser = commands.add_parser("add", help="add a contact")
+    add_parser.add_argument("name")
+    add_parser.add_argument("--phone", default="")
+    add_parser.add_argument("--email", default="")
+    add_parser.add_argument("--tags", default="", help="comma-separated, e.g. \"work, family\"")
+
+    edit_parser = commands.add_parser("edit", help="edit a contact, unspecified fields stay the same")
+    edit_parser.add_argument("name")
+    edit_parser.add_argument("--new-name")
+    edit_parser.add_argument("--phone")
+    edit_parser.add_argument("--email")
+    edit_parser.add_argument("--tags", help="comma-separated, replaces the current tags (\"\" removes them)")
+
+    for command in ("delete", "pin", "unpin"):
+        commands.add_parser(command, help=f"{command} a contact").add_argument("name")
+
+    commands.add_parser("duplicates", help="list contacts that share a name, phone number or email")
+    merge_parser = commands.add_parser("merge", help="merge contacts into one, empty fields are filled from the others")
+    merge_parser.add_argument("name", help="contact to keep (stays pinned if any of them was)")
+    merge_parser.add_argument("others", nargs="+")
+
+    import_parser = commands.add_parser("import", help="import contacts from a CSV, vCard or JSON file")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--on-duplicate", choices=DUPLICATE_POLICIES, default="skip")
+
+    export_parser = commands.add_parser("export", help="export contacts to a CSV, vCard or JSON file")
+    export_parser.add_argument("file")
+
+    serve_parser = commands.add_parser("serve", help="keep the book open for GUIs and scripts that connect with --server")
+    serve_parser.add_argument("--address", default=DEFAULT_SERVER_ADDRESS, help="host:port, or unix:/path for a Unix socket")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        from contact_server import run_server
+        try:
+            return run_server(args.data_dir, args.address, args.storage)
+        except (ContactStorageError, OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+
+    store = ContactStore(args.data_dir, args.storage, server=args.server)
+    try:
+        store.load()
+        if args.command in ("list", "search", "phone"):
+            names = store.order.pinned if args.command == "list" and args.pinned else store.order
+            if args.command == "search":
+                names = store.search(args.term, fuzzy=args.fuzzy, include_tags=args.tag, exclude_tags=args.without) or []
+            elif args.command == "list" and (args.tag or args.without):
+                names = [name for name in store.search("", include_tags=args.tag, exclude_tags=args.without)
+                         if not args.pinned or name in store.pinned]
+            elif args.command == "phone":
+                if args.prefix:
+                    names = store.find_phone_prefix(args.number)
+                elif args.suffix:
+                    names = store.find_phone_suffix(args.number)
+                else:
+                    names = store.find_phone(args.number)
+            for name in names:
+                contact = store.contacts[name]
+                marker = "* " if name in store.pinned else ""
+                tags = f"\t{', '.join(contact.tags)}" if contact.tags else ""
+                print(f"{marker}{name}\t{contact.phone}\t{contact.email}{tags}")
+        elif args.command == "tags":
+            for tag, count in store.tag_counts():
+                print(f"{tag}\t{count}")
+        elif args.command == "add":
+            name = store.add(args.name, args.phone, args.email, args.tags)
+            print(f"Contact '{name}' added successfully!")
+            for field, other in store.collisions(args.phone, args.email, exclude=name):
+                print(f"Warning: '{other}' has the same {field}, see the duplicates command", file=sys.stderr)
+        elif args.command == "edit":
+            contact = store.contacts.get(args.name, Contact())
+            new_name = store.edit(
+                args.name,
+                args.new_name if args.new_name is not None else args.name,
+                args.phone if args.phone is not None else contact.phone,
+                args.email if args.email is not None else contact.email,
+                args.tags
+            )
+            print(f"Contact '{new_name}' updated successfully!")
+        elif args.command == "delete":
+            store.delete(args.name)
+            print(f"Contact '{args.name}' deleted successfully!")
+        elif args.command == "pin":
+            store.pin(args.name)
+            print(f"Contact '{args.name}' pinned to top!")
+        elif args.command == "unpin":
+            store.unpin(args.name)
+            print(f"Contact '{args.name}' unpinned!")
+        elif args.command == "duplicates":
+            for suggestion in store.find_duplicates():
+                marker = "* " if suggestion['pinned'] else ""
+                others = ", ".join(suggestion['others'])
+                print(f"{marker}{suggestion['keep']}\t<- {others}\t(same {', '.join(suggestion['fields'])})")
+        elif args.command == "merge":
+            print(f"Merged {len(args.others)} contacts into '{store.merge_contacts(args.name, args.others)}'")
+        elif args.command == "import":
+            print(format_import_report(store.import_file(args.file, args.on_duplicate)))
+        elif args.command == "export":
+            print(f"Exported {store.export_file(args.file)} contacts to {args.file}")
+    except (ContactError, ContactStorageError, OSError, csv.Error, UnicodeDecodeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        store.close(compact=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run_cli(sys.argv[1:]))